@@ -0,0 +1,569 @@
+import hashlib
+import os
+import struct
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Set, Tuple
+
+# A folder archive starts with this line, the version of the format is after the comma
+ARCHIVE_MAGIC = b'ARC'
+ARCHIVE_VERSION = 1
+ARCHIVE_START = f'ARC,{ARCHIVE_VERSION}\r\n'.encode()
+# Each entry of the table of contents: the method, where the compressed data starts in the archive,
+# the compressed size, the original size and the size of the name, followed by the name in utf-8
+TOC_ENTRY = struct.Struct('<3sQQQH')
+# The archive ends with where the table of contents starts, how many entries it has and TOC_MAGIC
+TOC_FOOTER = struct.Struct('<QQ6s')
+TOC_MAGIC = b'ARCTOC'
+# The method of an entry that is a folder, a folder has no data
+FOLDER_METHOD = b'DIR'
+# The method of a file that is cut into chunks, its data is CHUNKED_METHOD,{file type}\r\n{original size},{chunks}\r\n
+# and a CHUNK_REF for each chunk: where its compressed data starts, its compressed size, its original size and
+# the sha256 digest of its content. The data of each chunk is written once in the archive before the first file
+# with it, without an entry of its own
+CHUNKED_METHOD = b'CDC'
+CHUNK_REF = struct.Struct('<QQQ32s')
+# The method of a file that is huffman coded with a code that is shared by a few files of the archive, its data is
+# SOLID_METHOD,{file type}\r\n{original size},{where the code table is}\r\n and the huffman coded data.
+# The code table is the code lengths and \r\n, written once before the first file with it, without an entry of its own
+SOLID_METHOD = b'HUS'
+CODE_TABLE_MAX_SIZE = 256 + 2
+# How many bytes of compressed data are copied from another archive at a time
+COPY_SIZE = 2 ** 20
+# The first two lines of a compressed file are never longer than this
+MAX_HEAD_SIZE = 2 ** 12
+
+
+class ArchiveEntry:
+    """
+    One entry in the table of contents of a folder archive, a file or a folder.
+    The name is the path of the entry inside the archive, the folders are separated by '/'.
+    """
+    def __init__(self, name: str, method: bytes, offset: int = 0, compressed_size: int = 0,
+                 original_size: int = 0) -> None:
+        """
+        A constructor for an ArchiveEntry object.
+        :param name: The path of the entry inside the archive.
+        :param method: The compression method of the entry, the first 3 bytes of its compressed data.
+        :param offset: Where the compressed data of the entry starts in the archive.
+        :param compressed_size: The size of the compressed data.
+        :param original_size: The size of the original file.
+        """
+        self.__name: str = name
+        self.__method: bytes = method
+        self.__offset: int = offset
+        self.__compressed_size: int = compressed_size
+        self.__original_size: int = original_size
+
+    @property
+    def name(self) -> str:
+        return self.__name
+
+    @property
+    def method(self) -> bytes:
+        return self.__method
+
+    @property
+    def offset(self) -> int:
+        return self.__offset
+
+    @property
+    def compressed_size(self) -> int:
+        return self.__compressed_size
+
+    @property
+    def original_size(self) -> int:
+        return self.__original_size
+
+    @property
+    def end(self) -> int:
+        return self.__offset + self.__compressed_size
+
+    @property
+    def is_folder(self) -> bool:
+        return self.__method == FOLDER_METHOD
+
+    def pack(self) -> bytes:
+        """
+        :return: the entry as it is written in the table of contents
+        """
+        name: bytes = self.__name.encode()
+        return TOC_ENTRY.pack(self.__method, self.__offset, self.__compressed_size, self.__original_size,
+                              len(name)) + name
+
+    @classmethod
+    def unpack_from(cls, toc: bytes, position: int) -> Tuple["ArchiveEntry", int]:
+        """
+        Read one entry of a table of contents.
+
+        Args:
+            toc (bytes): The table of contents, any object that supports the buffer protocol.
+            position (int): Where the entry starts in the table of contents.
+
+        Returns:
+            Tuple[ArchiveEntry, int]: The entry, and where the next entry starts.
+        """
+        if position + TOC_ENTRY.size > len(toc):
+            raise ValueError("the table of contents is cut")
+        method, offset, compressed_size, original_size, name_size = TOC_ENTRY.unpack_from(toc, position)
+        position += TOC_ENTRY.size
+        if position + name_size > len(toc):
+            raise ValueError("the table of contents is cut")
+        name: str = bytes(toc[position: position + name_size]).decode()
+        return cls(check_entry_name(name), method, offset, compressed_size, original_size), position + name_size
+
+
+class ArchiveWriter:
+    """
+    Writes a folder archive: the compressed data of each entry right when it is added, and the table of contents last,
+    so the memory used depends only on the biggest entry.
+    """
+    def __init__(self, archive_file: BinaryIO, entries: Optional[List[ArchiveEntry]] = None) -> None:
+        """
+        A constructor for an ArchiveWriter object, the archive starts at the current position of the file.
+        :param archive_file: An open binary file to write the archive to.
+        :param entries: The entries of an archive that is continued, the file must be right after their data.
+        """
+        self.__file: BinaryIO = archive_file
+        # Where the writer started writing, see discard
+        self.__start: int = archive_file.tell()
+        self.__entries: List[ArchiveEntry] = []
+        self.__names: Set[str] = set()
+        # Where each chunk that was written starts, its compressed size and its original size, by its hash
+        self.__chunks: Dict[bytes, Tuple[int, int, int]] = dict()
+        # Where each code table that was written starts, by its content
+        self.__code_tables: Dict[bytes, int] = dict()
+        if entries is None:
+            archive_file.write(ARCHIVE_START)
+        else:
+            self.__entries = list(entries)
+            self.__names = {entry.name for entry in entries}
+
+    @classmethod
+    def append_to(cls, archive_file: BinaryIO) -> "ArchiveWriter":
+        """
+        Continue a folder archive: the new entries are written after its footer, and finish writes the table of
+        contents again with the new entries after them. Nothing of the archive is written over, so until the new
+        footer is written the old one can still be found by discard, which cuts the archive back to it.
+
+        Args:
+            archive_file (BinaryIO): A folder archive open for reading and writing, it starts at the start of the file.
+
+        Returns:
+            ArchiveWriter: A writer of the archive.
+        """
+        entries: List[ArchiveEntry] = read_toc(archive_file)
+        archive_file.seek(0, os.SEEK_END)
+        return cls(archive_file, entries)
+
+    @property
+    def entries(self) -> List[ArchiveEntry]:
+        return self.__entries
+
+    def add_folder(self, name: str) -> ArchiveEntry:
+        """
+        Add a folder, it must be added before the entries inside it.
+
+        Args:
+            name (str): The path of the folder inside the archive.
+
+        Returns:
+            ArchiveEntry: The new entry.
+        """
+        return self.__add_entry(ArchiveEntry(check_entry_name(name), FOLDER_METHOD, self.__file.tell()))
+
+    def add_file(self, name: str, compressed_data: bytes, original_size: int) -> ArchiveEntry:
+        """
+        Write the compressed data of a file to the archive.
+
+        Args:
+            name (str): The path of the file inside the archive.
+            compressed_data (bytes): The compressed file, with the header of its compression method.
+            original_size (int): The size of the original file.
+
+        Returns:
+            ArchiveEntry: The new entry.
+        """
+        entry: ArchiveEntry = ArchiveEntry(check_entry_name(name), compressed_data[:3], self.__file.tell(),
+                                           len(compressed_data), original_size)
+        self.__file.write(compressed_data)
+        return self.__add_entry(entry)
+
+    def write_file(self, name: str, original_size: int, write_data: Callable[[BinaryIO], Any]) -> ArchiveEntry:
+        """
+        Write the compressed data of a file to the archive while it is produced, so it is never kept in memory.
+        The archive file must be open for reading too, the method is read back from the start of the data.
+
+        Args:
+            name (str): The path of the file inside the archive.
+            original_size (int): The size of the original file.
+            write_data (Callable[[BinaryIO], Any]): A function that writes the compressed file, with the header of
+                its compression method, to the file it gets.
+
+        Returns:
+            ArchiveEntry: The new entry.
+        """
+        check_entry_name(name)
+        offset: int = self.__file.tell()
+        write_data(self.__file)
+        end: int = self.__file.tell()
+        self.__file.seek(offset)
+        method: bytes = self.__file.read(min(3, end - offset))
+        self.__file.seek(end)
+        return self.__add_entry(ArchiveEntry(name, method, offset, end - offset, original_size))
+
+    def add_copy(self, name: str, stored: ArchiveEntry) -> ArchiveEntry:
+        """
+        Add a file with the same content as a file that is already in the archive,
+        the new entry points to the data of the stored file and nothing is written.
+
+        Args:
+            name (str): The path of the file inside the archive.
+            stored (ArchiveEntry): The entry of the file with the same content.
+
+        Returns:
+            ArchiveEntry: The new entry.
+        """
+        return self.__add_entry(ArchiveEntry(check_entry_name(name), stored.method, stored.offset,
+                                             stored.compressed_size, stored.original_size))
+
+    def has_chunk(self, chunk_hash: bytes) -> bool:
+        """
+        :param chunk_hash: the hash of the content of a chunk
+        :return: True if a chunk with this content was already written by this writer
+        """
+        return chunk_hash in self.__chunks
+
+    def add_chunk(self, chunk_hash: bytes, compressed_data: bytes, original_size: int) -> None:
+        """
+        Write the compressed data of a chunk of a file, the chunk has no entry, only the files with it point to it.
+
+        Args:
+            chunk_hash (bytes): The hash of the content of the chunk.
+            compressed_data (bytes): The compressed chunk, with the header of its compression method.
+            original_size (int): The size of the original chunk.
+        """
+        if chunk_hash not in self.__chunks:
+            self.__chunks[chunk_hash] = (self.__file.tell(), len(compressed_data), original_size)
+            self.__file.write(compressed_data)
+
+    def add_chunked_file(self, name: str, file_type: str, chunk_hashes: List[bytes], original_size: int) \
+            -> ArchiveEntry:
+        """
+        Add a file that is made of chunks that were already written, the file points to each of its chunks.
+
+        Args:
+            name (str): The path of the file inside the archive.
+            file_type (str): The type of the file, written in the header like in any compressed file.
+            chunk_hashes (List[bytes]): The hash of each chunk of the file, in order.
+            original_size (int): The size of the original file.
+
+        Returns:
+            ArchiveEntry: The new entry.
+        """
+        chunk_refs: List[Tuple[int, int, int]] = [self.__chunks[chunk_hash] for chunk_hash in chunk_hashes]
+        if sum(chunk_ref[2] for chunk_ref in chunk_refs) != original_size:
+            raise ValueError(f"the chunks of {name} are not the size of the file")
+        chunks_table: bytes = b''.join([CHUNK_REF.pack(*chunk_ref, chunk_hash)
+                                        for chunk_ref, chunk_hash in zip(chunk_refs, chunk_hashes)])
+        file_head: bytes = f'{CHUNKED_METHOD.decode()},{file_type}\r\n{original_size},{len(chunk_refs)}\r\n'.encode()
+        return self.add_file(name, file_head + chunks_table, original_size)
+
+    def has_code_table(self, code_table: bytes) -> bool:
+        """
+        :param code_table: the code lengths and b'\\r\\n'
+        :return: True if this code table was already written by this writer
+        """
+        return code_table in self.__code_tables
+
+    def add_code_table(self, code_table: bytes) -> int:
+        """
+        Write a code table that is shared by a few files, a code table that was already written is not written again.
+
+        Args:
+            code_table (bytes): The code lengths and b'\\r\\n'.
+
+        Returns:
+            int: Where the code table starts in the archive.
+        """
+        if code_table not in self.__code_tables:
+            self.__code_tables[code_table] = self.__file.tell()
+            self.__file.write(code_table)
+        return self.__code_tables[code_table]
+
+    def copy_entry(self, entry: ArchiveEntry, source_file: BinaryIO) -> ArchiveEntry:
+        """
+        Copy an entry of another folder archive without extracting it, the compressed data is copied as it is.
+        The chunks of a file that is cut into chunks and the code table of a file with a shared code are copied too,
+        each one once.
+
+        Args:
+            entry (ArchiveEntry): The entry in the other archive.
+            source_file (BinaryIO): The other archive, open for reading.
+
+        Returns:
+            ArchiveEntry: The new entry, with the same name.
+        """
+        if entry.is_folder:
+            return self.add_folder(entry.name)
+        if entry.method == CHUNKED_METHOD:
+            source_file.seek(entry.offset)
+            file_type, original_size, chunk_refs = unpack_chunked_file(source_file.read(entry.compressed_size))
+            for offset, compressed_size, chunk_size, chunk_hash in chunk_refs:
+                if chunk_hash not in self.__chunks:
+                    self.__chunks[chunk_hash] = (self.__file.tell(), compressed_size, chunk_size)
+                    copy_section(source_file, offset, compressed_size, self.__file)
+            return self.add_chunked_file(entry.name, file_type, [chunk_ref[3] for chunk_ref in chunk_refs],
+                                         original_size)
+        if entry.method == SOLID_METHOD:
+            source_file.seek(entry.offset)
+            format_line, sizes_line, _ = source_file.read(min(entry.compressed_size, MAX_HEAD_SIZE)).split(b'\r\n', 2)
+            original_size, table_offset = [int(number) for number in sizes_line.split(b',')]
+            source_file.seek(table_offset)
+            code_table: bytes = source_file.read(CODE_TABLE_MAX_SIZE)
+            new_table_offset: int = self.add_code_table(code_table[:code_table.index(b'\r\n') + 2])
+            # The header points to the code table in this archive, the huffman coded data is copied as it is
+            file_head: bytes = format_line + f'\r\n{original_size},{new_table_offset}\r\n'.encode()
+            head_size: int = len(format_line) + len(sizes_line) + 4
+            new_entry: ArchiveEntry = ArchiveEntry(check_entry_name(entry.name), entry.method, self.__file.tell(),
+                                                   len(file_head) + entry.compressed_size - head_size,
+                                                   entry.original_size)
+            self.__file.write(file_head)
+            copy_section(source_file, entry.offset + head_size, entry.compressed_size - head_size, self.__file)
+            return self.__add_entry(new_entry)
+        new_entry = ArchiveEntry(check_entry_name(entry.name), entry.method, self.__file.tell(),
+                                 entry.compressed_size, entry.original_size)
+        copy_section(source_file, entry.offset, entry.compressed_size, self.__file)
+        return self.__add_entry(new_entry)
+
+    def __add_entry(self, entry: ArchiveEntry) -> ArchiveEntry:
+        """
+        Add an entry to the table of contents, it replaces an entry with the same name.
+
+        Args:
+            entry (ArchiveEntry): The new entry.
+
+        Returns:
+            ArchiveEntry: The new entry.
+        """
+        if entry.name in self.__names:
+            self.__entries = [old_entry for old_entry in self.__entries if old_entry.name != entry.name]
+        self.__names.add(entry.name)
+        self.__entries.append(entry)
+        return entry
+
+    def order_entries(self, names: List[str]) -> None:
+        """
+        Put the entries in the table of contents in the order of the names, the data stays where it was written.
+
+        Args:
+            names (List[str]): The names of all the entries in the new order.
+        """
+        entries_by_name: Dict[str, ArchiveEntry] = {entry.name: entry for entry in self.__entries}
+        if sorted(names) != sorted(entries_by_name):
+            raise ValueError("the names must be the names of the entries")
+        self.__entries = [entries_by_name[name] for name in names]
+
+    def finish(self) -> None:
+        """ write the table of contents and the footer after the data of the entries """
+        toc_offset: int = self.__file.tell()
+        self.__file.write(b''.join([entry.pack() for entry in self.__entries]))
+        self.__file.write(TOC_FOOTER.pack(toc_offset, len(self.__entries), TOC_MAGIC))
+
+    def discard(self) -> None:
+        """ remove everything the writer wrote, a continued archive is left as it was before it was continued """
+        self.__file.seek(self.__start)
+        self.__file.truncate()
+
+
+def check_entry_name(name: str) -> str:
+    """
+    Check that the name of an entry stays inside the folder the archive is extracted to.
+
+    Args:
+        name (str): The path of the entry inside the archive.
+
+    Returns:
+        str: The name, if it is valid.
+    """
+    parts: List[str] = name.split("/")
+    if name == "" or name.startswith("/") or "\\" in name or any(part in ["", ".", ".."] for part in parts):
+        raise ValueError(f"wrong entry name {name!r}")
+    return name
+
+
+def copy_section(source_file: BinaryIO, offset: int, size: int, target_file: BinaryIO) -> None:
+    """
+    Copy a section of a file to the current position of another file, one part at a time.
+
+    Args:
+        source_file (BinaryIO): The file to copy from, open for reading.
+        offset (int): Where the section starts.
+        size (int): The size of the section.
+        target_file (BinaryIO): The file to copy to, open for writing.
+    """
+    source_file.seek(offset)
+    while size > 0:
+        data: bytes = source_file.read(min(size, COPY_SIZE))
+        if data == b'':
+            raise ValueError("the data is outside the archive")
+        target_file.write(data)
+        size -= len(data)
+
+
+def unpack_chunked_file(compressed_data: bytes) -> Tuple[str, int, List[Tuple[int, int, int, bytes]]]:
+    """
+    Read the data of a file that is cut into chunks.
+
+    Args:
+        compressed_data (bytes): The data of the entry of the file.
+
+    Returns:
+        Tuple[str, int, List[Tuple[int, int, int, bytes]]]: The type of the file, its original size,
+            and the CHUNK_REF fields of each of its chunks.
+    """
+    format_line, sizes_line, chunks_table = compressed_data.split(b'\r\n', 2)
+    method, file_type = format_line.decode().split(",", 1)
+    original_size, chunks_amount = [int(number) for number in sizes_line.split(b',')]
+    if method.encode() != CHUNKED_METHOD or len(chunks_table) != chunks_amount * CHUNK_REF.size:
+        raise ValueError("wrong chunks table")
+    return file_type, original_size, list(CHUNK_REF.iter_unpack(chunks_table))
+
+
+def toc_digest(archive_file: BinaryIO) -> bytes:
+    """
+    Hash the table of contents and the footer of a folder archive, any change to the entries of the archive
+    changes the digest.
+
+    Args:
+        archive_file (BinaryIO): An open folder archive, it starts at the start of the file.
+
+    Returns:
+        bytes: The sha256 digest.
+    """
+    toc_offset, _ = read_footer(archive_file)
+    archive_file.seek(toc_offset)
+    return hashlib.sha256(archive_file.read()).digest()
+
+
+def read_toc(archive_file: BinaryIO) -> List[ArchiveEntry]:
+    """
+    Read the table of contents of a folder archive, only the start line, the footer and the table are read,
+    so it takes the same time for any size of data.
+
+    Args:
+        archive_file (BinaryIO): An open folder archive, it starts at the start of the file.
+
+    Returns:
+        List[ArchiveEntry]: The entries in the order they were added.
+    """
+    toc_offset, entries_amount = read_footer(archive_file)
+    # The footer was the last part that was read
+    toc_size: int = archive_file.tell() - TOC_FOOTER.size - toc_offset
+    archive_file.seek(toc_offset)
+    return unpack_toc(archive_file.read(toc_size), entries_amount, toc_offset)
+
+
+def read_footer(archive_file: BinaryIO) -> Tuple[int, int]:
+    """
+    Check the start line of a folder archive and read its footer.
+
+    Args:
+        archive_file (BinaryIO): An open folder archive, it starts at the start of the file.
+
+    Returns:
+        Tuple[int, int]: Where the table of contents starts, and how many entries it has.
+    """
+    archive_size: int = archive_file.seek(0, os.SEEK_END)
+    if archive_size < len(ARCHIVE_START) + TOC_FOOTER.size:
+        raise ValueError("the archive is too short")
+    archive_file.seek(0)
+    check_archive_start(archive_file.read(len(ARCHIVE_START)))
+    archive_file.seek(archive_size - TOC_FOOTER.size)
+    return unpack_footer(archive_file.read(TOC_FOOTER.size), archive_size)
+
+
+def read_toc_buffer(archive: Any) -> List[ArchiveEntry]:
+    """
+    Read the table of contents of a folder archive that is in memory or mapped to memory, without copying it.
+
+    Args:
+        archive (Any): The whole archive, any object that supports the buffer protocol, like bytes or mmap.
+
+    Returns:
+        List[ArchiveEntry]: The entries in the order they were added.
+    """
+    archive_size: int = len(archive)
+    if archive_size < len(ARCHIVE_START) + TOC_FOOTER.size:
+        raise ValueError("the archive is too short")
+    check_archive_start(archive[:len(ARCHIVE_START)])
+    toc_offset, entries_amount = unpack_footer(archive[archive_size - TOC_FOOTER.size:], archive_size)
+    with memoryview(archive) as archive_view:
+        return unpack_toc(archive_view[toc_offset: archive_size - TOC_FOOTER.size], entries_amount, toc_offset)
+
+
+def check_archive_start(archive_start: bytes) -> None:
+    """
+    Check the start line of a folder archive.
+
+    Args:
+        archive_start (bytes): The first bytes of the archive, at least the size of ARCHIVE_START.
+    """
+    if archive_start[:len(ARCHIVE_START)] != ARCHIVE_START:
+        raise ValueError("not a folder archive of this version")
+
+
+def unpack_footer(footer: bytes, archive_size: int) -> Tuple[int, int]:
+    """
+    Read the footer at the end of a folder archive.
+
+    Args:
+        footer (bytes): The last TOC_FOOTER.size bytes of the archive.
+        archive_size (int): The size of the whole archive.
+
+    Returns:
+        Tuple[int, int]: Where the table of contents starts, and how many entries it has.
+    """
+    toc_offset, entries_amount, magic = TOC_FOOTER.unpack(footer)
+    if magic != TOC_MAGIC or not len(ARCHIVE_START) <= toc_offset <= archive_size - TOC_FOOTER.size:
+        raise ValueError("missing table of contents")
+    return toc_offset, entries_amount
+
+
+def unpack_toc(toc: bytes, entries_amount: int, data_end: int) -> List[ArchiveEntry]:
+    """
+    Read all the entries of a table of contents in one pass.
+
+    Args:
+        toc (bytes): The table of contents, any object that supports the buffer protocol.
+        entries_amount (int): The number of entries, from the footer.
+        data_end (int): Where the data of the entries ends, the data of every entry must be before it.
+
+    Returns:
+        List[ArchiveEntry]: The entries in the order they were added.
+    """
+    entries: List[ArchiveEntry] = []
+    position: int = 0
+    for _ in range(entries_amount):
+        entry, position = ArchiveEntry.unpack_from(toc, position)
+        if entry.offset < len(ARCHIVE_START) or entry.end > data_end:
+            raise ValueError(f"the data of {entry.name} is outside the archive")
+        entries.append(entry)
+    if position != len(toc):
+        raise ValueError("wrong number of entries")
+    return entries
+
+
+def is_archive(data: bytes) -> str:
+    """
+    Check if the provided byte string is a folder archive.
+
+    Args:
+        data (bytes): The byte string to be checked.
+
+    Returns:
+        str: An error message if it is not a folder archive, otherwise an empty string.
+    """
+    try:
+        read_toc_buffer(data)
+    except (ValueError, UnicodeDecodeError, struct.error) as e:
+        return f"folder not in compressed format: {e}"
+    return ""
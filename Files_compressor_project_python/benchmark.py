@@ -0,0 +1,281 @@
+import argparse
+import hashlib
+import io
+import os
+import random
+import time
+from typing import Dict, List, Tuple
+from chunking import iter_chunks
+from compressor import Compressor
+from huffman import HuffmanEncoder, code_table, ENCODE_CHUNK_SIZE
+from rle import encode_blocks, decode_blocks, parse_sizes, ENCODE_CHUNK_SIZE as RLE_CHUNK_SIZE
+
+MEGA = 10 ** 6
+ALPHABET_SIZES = [16, 256, 1024, 4096, 16384, 65536]
+ENCODE_SIZES_MB = [1, 16, 64]
+LEGACY_ENCODE_SIZE = 64 * 10 ** 3
+RLE_REPEAT_SIZES = [1, 3]
+RLE_ENCODE_SIZE_MB = 16
+CHUNK_VERSIONS = 8
+CHUNK_VERSION_SIZE_MB = 2
+CHUNK_EDITS = 4
+TEXT_LIKE_CHARS = b'eeeeeeeetttttaaaaoooiiinnnsssrrhhlldcumfpgwybvkxjqz      \n,.'
+
+
+def bench_huf_tree(alphabet_sizes: List[int], repeats: int = 3) -> List[Tuple[int, float]]:
+    """
+    Measure how long it takes to build a Huffman tree for different alphabet sizes.
+
+    Args:
+        alphabet_sizes (List[int]): The numbers of distinct symbols to build trees for.
+        repeats (int, optional): How many times to build each tree, the best time is kept. Defaults to 3.
+
+    Returns:
+        List[Tuple[int, float]]: A list of (alphabet size, seconds) tuples.
+    """
+    results: List[Tuple[int, float]] = []
+    rand = random.Random(0)
+    for size in alphabet_sizes:
+        # Symbols wider than one byte let us go past the 256 symbols of a byte alphabet
+        chars_lst: List[Tuple[bytes, int]] = sorted([(i.to_bytes(4, "big"), rand.randint(1, 10 ** 6))
+                                                     for i in range(size)], key=lambda x: x[1])
+        best: float = float("inf")
+        for _ in range(repeats):
+            start_time: float = time.perf_counter()
+            Compressor.huf_tree(list(chars_lst))
+            best = min(best, time.perf_counter() - start_time)
+        results.append((size, best))
+    return results
+
+
+def text_like_data(size: int, seed: int = 0) -> bytes:
+    """
+    Create random data with the skewed byte frequencies of english text.
+
+    Args:
+        size (int): The size of the data in bytes.
+        seed (int, optional): The seed of the random data. Defaults to 0.
+
+    Returns:
+        bytes: The random data.
+    """
+    rand = random.Random(seed)
+    translate_table: bytes = bytes(rand.choice(TEXT_LIKE_CHARS) for _ in range(256))
+    return os.urandom(size).translate(translate_table)
+
+
+def legacy_huf_data(original_data: bytes, huf_map: Dict[bytes, bytes]) -> bytes:
+    """
+    The encoder that create_huf_data used before the bit-packing encoder, kept to compare the speed.
+
+    Args:
+        original_data (bytes): The original data to be encoded.
+        huf_map (Dict[bytes, bytes]): A dictionary mapping each byte character to its corresponding Huffman code.
+
+    Returns:
+        bytes: Huffman encoded data.
+    """
+    compressed_data: bytes = b''
+    bits_str: str = ""
+    for byte in original_data:
+        bits_str += (huf_map[bytes([byte])]).decode()
+    rest_of_bits: int = len(bits_str) % 8
+    bits_str += (8 - rest_of_bits) * "0"
+    for i in range(0, len(bits_str), 8):
+        b: bytearray = bytearray()
+        b.append(int(bits_str[i: i + 8], 2))
+        compressed_data += bytes(b)
+    return compressed_data + str(8 - rest_of_bits).encode()
+
+
+def text_like_huf_map(block: bytes) -> Dict[bytes, bytes]:
+    """
+    Build the Huffman map of the given data.
+
+    Args:
+        block (bytes): The data to build the map for.
+
+    Returns:
+        Dict[bytes, bytes]: A dictionary mapping each byte character to its corresponding Huffman code.
+    """
+    huf_tree = Compressor.huf_tree(Compressor.sorted_chars_repeats(block))[0]
+    return Compressor.create_huf_map(Compressor.__new__(Compressor), huf_tree, dict())
+
+
+def bench_huf_encode(sizes_mb: List[int], use_numpy: bool) -> List[Tuple[int, float]]:
+    """
+    Measure the throughput of the Huffman bit-packing encoder.
+    One block of text-like data is encoded again and again until the wanted size is reached,
+    so even 1 GB can be measured without holding it in memory.
+
+    Args:
+        sizes_mb (List[int]): The sizes of the data to encode, in MB.
+        use_numpy (bool): Use the numpy encoder.
+
+    Returns:
+        List[Tuple[int, float]]: A list of (size in MB, MB per second) tuples.
+    """
+    block: bytes = text_like_data(16 * ENCODE_CHUNK_SIZE)
+    codes: List[str] = code_table(text_like_huf_map(block))
+    block_view: memoryview = memoryview(block)
+    results: List[Tuple[int, float]] = []
+    for size_mb in sizes_mb:
+        encoder: HuffmanEncoder = HuffmanEncoder(codes, use_numpy)
+        left: int = size_mb * MEGA
+        start_time: float = time.perf_counter()
+        while left > 0:
+            for i in range(0, min(left, len(block)), ENCODE_CHUNK_SIZE):
+                encoder.encode(block_view[i: min(i + ENCODE_CHUNK_SIZE, left)])
+            left -= len(block)
+        encoder.flush()
+        results.append((size_mb, size_mb / (time.perf_counter() - start_time)))
+    return results
+
+
+def bench_legacy_huf_encode(size: int) -> float:
+    """
+    Measure the throughput of the encoder that create_huf_data used before.
+
+    Args:
+        size (int): The size of the data to encode in bytes, the old encoder is quadratic so keep it small.
+
+    Returns:
+        float: MB per second.
+    """
+    block: bytes = text_like_data(size)
+    huf_map: Dict[bytes, bytes] = text_like_huf_map(block)
+    start_time: float = time.perf_counter()
+    legacy_huf_data(block, huf_map)
+    return size / MEGA / (time.perf_counter() - start_time)
+
+
+def runs_like_data(size: int, seed: int = 0) -> bytes:
+    """
+    Create random data made of short runs of the same byte.
+
+    Args:
+        size (int): The size of the data in bytes.
+        seed (int, optional): The seed of the random data. Defaults to 0.
+
+    Returns:
+        bytes: The random data.
+    """
+    rand = random.Random(seed)
+    runs: List[bytes] = []
+    while size > 0:
+        runs.append(bytes([rand.choice(TEXT_LIKE_CHARS)]) * min(rand.randint(1, 8), size))
+        size -= len(runs[-1])
+    return b''.join(runs)
+
+
+def bench_rle_encode(size_mb: int, repeat_size: int, use_numpy: bool) -> float:
+    """
+    Measure the throughput of the run-length encoder.
+
+    Args:
+        size_mb (int): The size of the data to encode, in MB.
+        repeat_size (int): The size of the repeated chunks.
+        use_numpy (bool): Find the runs with numpy.
+
+    Returns:
+        float: MB per second.
+    """
+    block: bytes = runs_like_data(RLE_CHUNK_SIZE)
+    start_time: float = time.perf_counter()
+    for _ in range(size_mb * MEGA // RLE_CHUNK_SIZE):
+        encode_blocks(block, repeat_size, use_numpy)
+    return size_mb / (time.perf_counter() - start_time)
+
+
+def bench_rle_decode(size_mb: int, repeat_size: int, use_numpy: bool) -> float:
+    """
+    Measure the throughput of the run-length decoder.
+
+    Args:
+        size_mb (int): The size of the original data, in MB.
+        repeat_size (int): The size of the repeated chunks.
+        use_numpy (bool): Expand the runs with numpy.
+
+    Returns:
+        float: MB of original data per second.
+    """
+    chunks, sizes = encode_blocks(runs_like_data(RLE_CHUNK_SIZE), repeat_size)
+    start_time: float = time.perf_counter()
+    for _ in range(size_mb * MEGA // RLE_CHUNK_SIZE):
+        decode_blocks(chunks, parse_sizes(sizes[:-1], use_numpy), repeat_size, use_numpy)
+    return size_mb / (time.perf_counter() - start_time)
+
+
+def bench_chunking(versions: int, version_size_mb: int, use_numpy: bool) -> Tuple[float, float]:
+    """
+    Measure the throughput of the content-defined chunking and how much of the data is stored once,
+    on a few versions of a dump, each version with a few small insertions in random places.
+
+    Args:
+        versions (int): The number of versions of the dump.
+        version_size_mb (int): The size of each version, in MB.
+        use_numpy (bool): Find the hashes with numpy.
+
+    Returns:
+        Tuple[float, float]: MB per second, and the size of all the versions divided by the size of the
+            distinct chunks.
+    """
+    rand = random.Random(0)
+    dump: bytes = text_like_data(version_size_mb * MEGA)
+    dumps: List[bytes] = []
+    for version in range(versions):
+        edited: bytearray = bytearray(dump)
+        for _ in range(CHUNK_EDITS):
+            position: int = rand.randrange(len(edited))
+            edited[position: position] = f'version {version}'.encode()
+        dumps.append(bytes(edited))
+
+    distinct_chunks: Dict[bytes, int] = dict()
+    start_time: float = time.perf_counter()
+    for data in dumps:
+        for chunk in iter_chunks(io.BytesIO(data), use_numpy=use_numpy):
+            distinct_chunks[hashlib.sha256(chunk).digest()] = len(chunk)
+    seconds: float = time.perf_counter() - start_time
+    total_size: int = sum(len(data) for data in dumps)
+    return total_size / MEGA / seconds, total_size / sum(distinct_chunks.values())
+
+
+def main() -> None:
+    """ run the benchmarks and print the results """
+    parser = argparse.ArgumentParser(description="Benchmarks for the file compressor")
+    parser.add_argument("--alphabet-sizes", type=int, nargs="+", default=ALPHABET_SIZES)
+    parser.add_argument("--encode-sizes", type=int, nargs="+", default=ENCODE_SIZES_MB,
+                        help="sizes in MB for the Huffman encoder benchmark, up to 1024")
+    args = parser.parse_args()
+
+    print("Huffman tree build time by alphabet size")
+    for size, seconds in bench_huf_tree(args.alphabet_sizes):
+        print(f"{size:>8} symbols: {seconds * 1000:10.3f} ms")
+
+    print("Huffman encoder throughput")
+    legacy_speed: float = bench_legacy_huf_encode(LEGACY_ENCODE_SIZE)
+    print(f"  old string encoder, {LEGACY_ENCODE_SIZE // 1000} KB: {legacy_speed:10.3f} MB/s")
+    for use_numpy in [False, True]:
+        name: str = "numpy" if use_numpy else "python"
+        for size_mb, speed in bench_huf_encode(args.encode_sizes, use_numpy):
+            print(f"  {name:>6} encoder, {size_mb:>5} MB: {speed:10.3f} MB/s ({speed / legacy_speed:.0f}x)")
+
+    print("Run-length encoder and decoder throughput")
+    for repeat_size in RLE_REPEAT_SIZES:
+        for use_numpy in [False, True]:
+            name = "numpy" if use_numpy else "python"
+            speed = bench_rle_encode(RLE_ENCODE_SIZE_MB, repeat_size, use_numpy)
+            print(f"  {name:>6} encoder, {RLE_ENCODE_SIZE_MB} MB, repeat size {repeat_size}: {speed:10.3f} MB/s")
+            speed = bench_rle_decode(RLE_ENCODE_SIZE_MB, repeat_size, use_numpy)
+            print(f"  {name:>6} decoder, {RLE_ENCODE_SIZE_MB} MB, repeat size {repeat_size}: {speed:10.3f} MB/s")
+
+    print("Content-defined chunking throughput and deduplication")
+    for use_numpy in [False, True]:
+        name = "numpy" if use_numpy else "python"
+        speed, dedup_ratio = bench_chunking(CHUNK_VERSIONS, CHUNK_VERSION_SIZE_MB, use_numpy)
+        print(f"  {name:>6} chunking, {CHUNK_VERSIONS} versions of {CHUNK_VERSION_SIZE_MB} MB: {speed:10.3f} MB/s, "
+              f"dedup ratio {dedup_ratio:.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+import math
+from collections import Counter
+from typing import BinaryIO, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, Counter is used instead
+    np = None
+
+CHUNK_SIZE = 2 ** 20
+
+
+class ByteCounter:
+    """
+    Counts how many times each of the 256 byte values appears in some data.
+    The data can be given in chunks, so files bigger than the memory can be counted too.
+    """
+    def __init__(self) -> None:
+        self.__histogram: List[int] = [0] * 256
+        self.__first_seen: List[int] = [-1] * 256
+        self.__size: int = 0
+
+    @classmethod
+    def from_file(cls, file_name: str, chunk_size: int = CHUNK_SIZE) -> "ByteCounter":
+        """
+        Count the bytes of a file, reading it one chunk at a time.
+
+        Args:
+            file_name (str): The path of the file to count.
+            chunk_size (int, optional): How many bytes to read each time. Defaults to CHUNK_SIZE.
+
+        Returns:
+            ByteCounter: A counter with the histogram of the whole file.
+        """
+        with open(file_name, 'rb') as file_to_count:
+            return cls.from_stream(file_to_count, chunk_size)
+
+    @classmethod
+    def from_stream(cls, file_to_count: BinaryIO, chunk_size: int = CHUNK_SIZE) -> "ByteCounter":
+        """
+        Count the bytes of an open binary file from its current position to its end, one chunk at a time.
+
+        Args:
+            file_to_count (BinaryIO): An open binary file or any object with a read method, like io.BytesIO.
+            chunk_size (int, optional): How many bytes to read each time. Defaults to CHUNK_SIZE.
+
+        Returns:
+            ByteCounter: A counter with the histogram of the rest of the file.
+        """
+        counter: ByteCounter = cls()
+        chunk: bytes = file_to_count.read(chunk_size)
+        while chunk != b'':
+            counter.update(chunk)
+            chunk = file_to_count.read(chunk_size)
+        return counter
+
+    @property
+    def histogram(self) -> List[int]:
+        return self.__histogram
+
+    @property
+    def first_seen(self) -> List[int]:
+        return self.__first_seen
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def update(self, chunk: bytes) -> None:
+        """
+        Add the bytes of the next chunk to the histogram.
+
+        Args:
+            chunk (bytes): The next chunk of the data.
+
+        Example:
+            update(b'AABBBCCCC') -> histogram[65] == 2, histogram[66] == 3, histogram[67] == 4
+        """
+        counts: List[int]
+        if np is not None:
+            counts = np.bincount(np.frombuffer(chunk, dtype=np.uint8), minlength=256).tolist()
+        else:
+            counts = [0] * 256
+            for byte, count in Counter(chunk).items():
+                counts[byte] = count
+
+        for byte in range(256):
+            if counts[byte] == 0:
+                continue
+            # Remember where each byte first appears, it breaks ties between equal frequencies
+            if self.__histogram[byte] == 0:
+                self.__first_seen[byte] = self.__size + chunk.find(bytes([byte]))
+            self.__histogram[byte] += counts[byte]
+        self.__size += len(chunk)
+
+    def sorted_chars(self) -> List[Tuple[bytes, int]]:
+        """
+        Sort the bytes that appear in the data by their frequencies.
+        Bytes with the same frequency keep the order in which they first appear in the data.
+
+        Returns:
+            List[Tuple[bytes, int]]: A list of tuples where each tuple contains a character and its frequency,
+            sorted by frequency in ascending order.
+
+        Example:
+            sorted_chars() -> [(b'A', 2), (b'B', 3), (b'C', 4)] for the data b'AABBBCCCC'
+        """
+        present: List[int] = [byte for byte in range(256) if self.__histogram[byte] > 0]
+        present.sort(key=lambda byte: (self.__histogram[byte], self.__first_seen[byte]))
+        return [(bytes([byte]), self.__histogram[byte]) for byte in present]
+
+    def entropy(self) -> float:
+        """
+        Calculate the Shannon entropy of the data.
+
+        Returns:
+            float: The average number of bits needed for each byte, between 0 and 8.
+        """
+        if self.__size == 0:
+            return 0.0
+        entropy: float = 0.0
+        for count in self.__histogram:
+            if count > 0:
+                probability: float = count / self.__size
+                entropy -= probability * math.log2(probability)
+        return entropy
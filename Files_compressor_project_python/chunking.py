@@ -0,0 +1,208 @@
+import hashlib
+from bisect import bisect_left
+from typing import BinaryIO, Iterator, List, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the rolling hash is rolled with python ints instead
+    np = None
+
+# The files are cut after a byte where the gear hash of the last HASH_BITS bytes has its top CHUNK_MASK_BITS bits
+# zero, so a cut depends only on the content right before it, and an insertion moves only the cuts near it.
+# A chunk is at least CHUNK_MIN_SIZE and at most CHUNK_MAX_SIZE bytes, about CHUNK_MIN_SIZE + 2 ** CHUNK_MASK_BITS
+CHUNK_MIN_SIZE = 2 ** 12
+CHUNK_MASK_BITS = 14
+CHUNK_MAX_SIZE = 2 ** 16
+HASH_BITS = 64
+HASH_MASK = 2 ** HASH_BITS - 1
+CUT_MASK = (2 ** CHUNK_MASK_BITS - 1) << (HASH_BITS - CHUNK_MASK_BITS)
+# A random 64-bit number for each byte value, the same on every machine so the same content is cut the same way
+GEAR: List[int] = [int.from_bytes(hashlib.sha256(bytes([byte])).digest()[:8], 'little') for byte in range(256)]
+GEAR_ARRAY = np.array(GEAR, dtype=np.uint64) if np is not None else None
+# How many bytes are read and cut at a time
+READ_SIZE = 2 ** 20
+MEGA = 10 ** 6
+
+
+class ChunkingStats:
+    """
+    How many bytes were cut into chunks, how many of them are in distinct chunks, and how long the cutting took.
+    """
+    def __init__(self) -> None:
+        """
+        A constructor for a ChunkingStats object, with nothing cut yet.
+        """
+        self.__total_size: int = 0
+        self.__distinct_size: int = 0
+        self.__seconds: float = 0.0
+
+    @property
+    def total_size(self) -> int:
+        return self.__total_size
+
+    @property
+    def distinct_size(self) -> int:
+        return self.__distinct_size
+
+    @property
+    def seconds(self) -> float:
+        return self.__seconds
+
+    def add(self, total_size: int, distinct_size: int, seconds: float) -> None:
+        """
+        Count files that were cut into chunks.
+        :param total_size: The size of the files.
+        :param distinct_size: The size of the distinct chunks of the files.
+        :param seconds: How long cutting and hashing the files took.
+        """
+        self.__total_size += total_size
+        self.__distinct_size += distinct_size
+        self.__seconds += seconds
+
+    def dedup_ratio(self) -> float:
+        """
+        :return: the size of the files divided by the size of their distinct chunks, 1 if nothing was cut
+        """
+        if self.__distinct_size == 0:
+            return 1.0
+        return self.__total_size / self.__distinct_size
+
+    def throughput(self) -> float:
+        """
+        :return: how many MB were cut and hashed each second, 0 if nothing was cut
+        """
+        if self.__seconds == 0:
+            return 0.0
+        return self.__total_size / MEGA / self.__seconds
+
+
+def gear_hashes(data: bytes) -> "np.ndarray":
+    """
+    Find the gear hash after each byte of the data with numpy. The hash after a byte is the sum of the GEAR number
+    of each of the last HASH_BITS bytes shifted left by its distance from the byte, so the hashes of all the bytes
+    are built by doubling the number of bytes in the sums, in log2(HASH_BITS) steps.
+
+    Args:
+        data (bytes): The data, the bytes before it count as zeros.
+
+    Returns:
+        np.ndarray: The 64-bit hash after each byte.
+    """
+    hashes = GEAR_ARRAY[np.frombuffer(data, dtype=np.uint8)]
+    width: int = 1
+    while width < HASH_BITS:
+        # Add the sums of the bytes before these bytes, shifted to their place, the additions wrap like the hash.
+        # The shifted sums are a new array, so they are all taken before any sum changes
+        hashes[width:] += hashes[:-width] << np.uint64(width)
+        width *= 2
+    return hashes
+
+
+def next_cut_python(data: bytes, start: int, stop: int) -> int:
+    """
+    Find the first cut of a chunk that starts at start by rolling the gear hash with python ints.
+
+    Args:
+        data (bytes): The data.
+        start (int): Where the chunk starts.
+        stop (int): The furthest place the chunk can end.
+
+    Returns:
+        int: Where the chunk ends, or -1 if there is no cut until stop.
+    """
+    # The hash of a cut only depends on the last HASH_BITS bytes, and there is no cut before CHUNK_MIN_SIZE
+    position: int = max(start + CHUNK_MIN_SIZE - HASH_BITS, start)
+    rolling_hash: int = 0
+    for byte in data[position: stop]:
+        rolling_hash = ((rolling_hash << 1) + GEAR[byte]) & HASH_MASK
+        position += 1
+        if not rolling_hash & CUT_MASK and position - start >= CHUNK_MIN_SIZE:
+            return position
+    return -1
+
+
+def find_cuts(data: bytes, final: bool = True, use_numpy: bool = True) -> List[int]:
+    """
+    Find where to cut the data into chunks, the first chunk starts at the start of the data.
+
+    Args:
+        data (bytes): The data.
+        final (bool, optional): The data is the end of the file, so the last chunk ends with it. Defaults to True.
+            Otherwise the bytes after the last cut are left for the next data.
+        use_numpy (bool, optional): Find the hashes with numpy when it is installed. Defaults to True.
+
+    Returns:
+        List[int]: The end of each chunk.
+    """
+    candidates: List[int] = []
+    if use_numpy and np is not None:
+        # The end of every chunk that has the right hash, whatever its size
+        candidates = (np.flatnonzero((gear_hashes(data) & np.uint64(CUT_MASK)) == 0) + 1).tolist()
+    cuts: List[int] = []
+    start: int = 0
+    while start < len(data):
+        stop: int = min(start + CHUNK_MAX_SIZE, len(data))
+        cut: int = -1
+        if use_numpy and np is not None:
+            index: int = bisect_left(candidates, start + CHUNK_MIN_SIZE)
+            if index < len(candidates) and candidates[index] <= stop:
+                cut = candidates[index]
+        else:
+            cut = next_cut_python(data, start, stop)
+        if cut == -1:
+            if start + CHUNK_MAX_SIZE <= len(data):
+                cut = start + CHUNK_MAX_SIZE
+            elif final:
+                cut = len(data)
+            else:
+                # More data may still have a cut for this chunk
+                break
+        cuts.append(cut)
+        start = cut
+    return cuts
+
+
+def iter_chunks(file: BinaryIO, read_size: int = READ_SIZE, use_numpy: bool = True) -> Iterator[bytes]:
+    """
+    Cut an open binary file into content-defined chunks, reading it one part at a time.
+
+    Args:
+        file (BinaryIO): An open binary file, it is read from its current position to its end.
+        read_size (int, optional): How many bytes to read each time. Defaults to READ_SIZE.
+        use_numpy (bool, optional): Find the hashes with numpy when it is installed. Defaults to True.
+
+    Returns:
+        Iterator[bytes]: The chunks, an empty file has no chunks.
+    """
+    pending: bytes = b''
+    while True:
+        new_data: bytes = file.read(read_size)
+        final: bool = new_data == b''
+        pending += new_data
+        start: int = 0
+        for cut in find_cuts(pending, final, use_numpy):
+            yield pending[start: cut]
+            start = cut
+        pending = pending[start:]
+        if final:
+            return
+
+
+def hash_chunks(file_path: str) -> List[Tuple[bytes, int, int]]:
+    """
+    Cut a file into content-defined chunks and hash each chunk.
+    This is a module function so it can be sent to the processes of a pool.
+
+    Args:
+        file_path (str): The path to the file.
+
+    Returns:
+        List[Tuple[bytes, int, int]]: The sha256 digest, the start in the file and the size of each chunk.
+    """
+    chunks: List[Tuple[bytes, int, int]] = []
+    start: int = 0
+    with open(file_path, 'rb') as file:
+        for chunk in iter_chunks(file):
+            chunks.append((hashlib.sha256(chunk).digest(), start, len(chunk)))
+            start += len(chunk)
+    return chunks
@@ -1,8 +1,33 @@
+import io
 import os
-from typing import List, Tuple, Union, Dict, Any
+import heapq
+import hashlib
+import time
+from typing import List, Tuple, Union, Dict, Any, Optional, BinaryIO, Iterator, Set
 from treenode import TreeNode
+from bytecounter import ByteCounter
+from huffman import HuffmanEncoder, code_table, code_lengths, canonical_codes, encode_code_lengths, ENCODE_CHUNK_SIZE, \
+    HUF_BLOCK_SIZE, BLOCK_INDEX_DIGITS
+from parallel import ordered_map
+from rle import find_runs, encode_varints, choose_parameters, pack_bits, \
+    predicted_size, ENCODE_CHUNK_SIZE as RLE_CHUNK_SIZE, AUTO_WINDOWS, AUTO_WINDOW_SIZE
+from archive import ArchiveEntry, ArchiveWriter, read_toc
+from chunking import ChunkingStats, hash_chunks
+from manifest import FileRecord, read_manifest, write_manifest
 
 KILO = 1000
+# RLE - run-length encoding, HUF - Huffman coding, PKB - run-length encoding of runs and literal spans (PackBits)
+COMPRESS_METHODS = ["RLE", "HUF", "PKB"]
+# STO - the data as it is, for files that no method makes smaller
+STORE_METHOD = "STO"
+# AUTO - each file of a folder gets the method that is predicted to compress it the best, see choose_method
+AUTO_METHOD = "AUTO"
+# AUTO stores a file when the best method is predicted to save less than this part of it
+AUTO_MIN_SAVING = 0.05
+# A repeat size of 0 lets run-length encoding choose the repeat size and the block size
+AUTO_REPEAT_SIZE = 0
+# In solid mode the files up to this size share one huffman code with the other files of their type
+SOLID_MAX_FILE_SIZE = 2 ** 16
 
 
 class Compressor:
@@ -13,31 +38,51 @@ class Compressor:
         folder to save the compressed file
         the compression efficiency
     """
-    def __init__(self, file_name: str, compression_method: str) -> None:
+    def __init__(self, file_name: str, compression_method: str, data: Optional[bytes] = None) -> None:
         """
         A constructor for a Compressor object.
         :param file_name: A file name that is going to be compressed.
         :param compression_method: A string of what compression method are we using.
+        :param data: Data to compress instead of the content of the file, like a chunk of it,
+            then the file name is used only for the file type.
         """
         # check if the file exists
         if file_name[-1] == ".":
             raise FileNotFoundError("the file path doesnt exists")
-        if not os.path.exists(file_name):
+        if data is None and not os.path.exists(file_name):
             raise FileNotFoundError("the file path doesnt exists")
         # check the compression method
-        if compression_method != "RLE" and compression_method != "HUF":
-            raise ValueError("compression method can be only RLE or HUF")
+        if compression_method not in COMPRESS_METHODS + [STORE_METHOD]:
+            raise ValueError("compression method can be only RLE, HUF, PKB or STO")
 
         self.__file_name = file_name
         self.__compression_method = compression_method
         self.__compression_efficiency: int = 0
         self.__size: int = 0
-        # check for problems in the reading of the file
+        self.__data: Optional[bytes] = data
+        # check for problems in the reading of the file, without reading all of it
         try:
-            self.read_binary_file()
+            with self.open_original():
+                pass
         except Exception as e:
             raise Exception(f"there is a problem with the given file: {e}")
 
+    def open_original(self) -> BinaryIO:
+        """
+        :return: the original data open for reading, the file or the data that was given instead of it
+        """
+        if self.__data is not None:
+            return io.BytesIO(self.__data)
+        return open(self.__file_name, 'rb')
+
+    def original_size(self) -> int:
+        """
+        :return: the size of the original data
+        """
+        if self.__data is not None:
+            return len(self.__data)
+        return os.path.getsize(self.__file_name)
+
     def compress_huf(self) -> bytes:
         """
         Compresses the file using Huffman coding.
@@ -45,30 +90,135 @@ class Compressor:
         Returns:
             bytes: Compressed data.
         """
-        # Read the original file data
-        original_file_data: bytes = self.read_binary_file()
-        # Create Huffman tree
-        huf_tree: Union[TreeNode, Tuple[bytes, int]] = self.create_huf_tree(original_file_data)
-        # create map for each char in the original data
-        empty_dict: Dict[bytes, bytes] = dict()
-        huf_map: Dict[bytes, bytes] = self.create_huf_map(huf_tree, empty_dict)
+        compressed_file: io.BytesIO = io.BytesIO()
+        self.compress_huf_to_file(compressed_file)
+        return compressed_file.getvalue()
 
-        if len(huf_map) == 1:
-            for item in huf_map:
-                huf_map[item] = b'1'
+    def compress_huf_to_file(self, compressed_file: BinaryIO) -> None:
+        """
+        Compresses the file using Huffman coding and writes the compressed data while it is produced.
+        The file is read twice in chunks, once to count the chars and once to encode them,
+        so the memory used does not depend on the size of the file.
 
-        # Compress the file format and add it to the compressed bytes
-        compressed_bytes: bytes = self.compress_format(self.__file_name.split(".")[-1], tree_node=huf_tree)
+        Args:
+            compressed_file (BinaryIO): An open binary file to write the compressed data to.
+        """
+        # First pass: count the chars of the file
+        with self.open_original() as file_to_count:
+            counter: ByteCounter = ByteCounter.from_stream(file_to_count, ENCODE_CHUNK_SIZE)
+        # create a canonical code for each char in the original data
+        huf_map: Dict[bytes, bytes] = dict()
+        if counter.size > 0:
+            huf_tree: Union[TreeNode, Tuple[bytes, int]] = self.create_huf_tree(counter)
+            huf_map = self.create_canonical_huf_map(huf_tree)
+
+        # Write the file format
+        file_head: bytes = self.compress_format(self.__file_name.split(".")[-1], huf_map=huf_map,
+                                                original_size=counter.size)
+        compressed_file.write(file_head)
+        compressed_size: int = len(file_head)
+
+        # Second pass: encode the file one chunk at a time
+        if counter.size > 0:
+            encoder: HuffmanEncoder = HuffmanEncoder(code_table(huf_map))
+            read_size: int = 0
+            with self.open_original() as file_to_compress:
+                chunk: bytes = file_to_compress.read(ENCODE_CHUNK_SIZE)
+                while chunk != b'':
+                    read_size += len(chunk)
+                    packed: bytes = encoder.encode(chunk)
+                    compressed_file.write(packed)
+                    compressed_size += len(packed)
+                    chunk = file_to_compress.read(ENCODE_CHUNK_SIZE)
+            if read_size != counter.size:
+                raise Exception(f"{self.__file_name} changed while it was compressed")
+            last_bytes: bytes = encoder.flush()
+            compressed_file.write(last_bytes)
+            compressed_size += len(last_bytes)
+
+        # Check if compression resulted in a positive outcome and update the size of the compressed data
+        self.is_positive_compress_size(compressed_size)
+        self.__size = compressed_size
+
+    def compress_huf_blocks_to_file(self, compressed_file: BinaryIO, block_size: int = HUF_BLOCK_SIZE,
+                                    jobs: int = 1) -> None:
+        """
+        Compresses the file using Huffman coding in blocks, every block with its own canonical code.
+        The blocks are encoded on a pool of processes and written in order. After them comes an index of the
+        compressed size of every block and the position of the index, so the blocks can be extracted in parallel.
 
-        # Compress the original file data using Huffman coding and add it to the compressed bytes
-        compressed_bytes += self.create_huf_data(original_file_data, huf_map)
+        Args:
+            compressed_file (BinaryIO): An open binary file to write the compressed data to.
+            block_size (int, optional): The size of each block of the original data. Defaults to HUF_BLOCK_SIZE.
+            jobs (int, optional): The number of processes, 0 for one process for each core.
+        """
+        if block_size < 1:
+            raise ValueError("wrong block size")
+        original_size: int = self.original_size()
+
+        # Write the file format
+        file_head: bytes = self.compress_format(self.__file_name.split(".")[-1], original_size=original_size,
+                                                block_size=block_size)
+        compressed_file.write(file_head)
+        compressed_size: int = len(file_head)
+
+        # Encode the blocks, only a few of them are read ahead of the one that is written
+        blocks_sizes: List[bytes] = []
+        read_size: int = 0
+        with self.open_original() as file_to_compress:
+            def read_blocks() -> Iterator[Tuple[bytes]]:
+                nonlocal read_size
+                block: bytes = file_to_compress.read(block_size)
+                while block != b'':
+                    read_size += len(block)
+                    yield (block,)
+                    block = file_to_compress.read(block_size)
+
+            for compressed_block in ordered_map(compress_huf_block, read_blocks(), jobs):
+                compressed_file.write(compressed_block)
+                blocks_sizes.append(str(len(compressed_block)).encode())
+                compressed_size += len(compressed_block)
+        if read_size != original_size:
+            raise Exception(f"{self.__file_name} changed while it was compressed")
+
+        # Write the index of the blocks and where it starts
+        blocks_index: bytes = (b','.join(blocks_sizes) + b'\r\n'
+                               + str(compressed_size).zfill(BLOCK_INDEX_DIGITS).encode())
+        compressed_file.write(blocks_index)
+        compressed_size += len(blocks_index)
+
+        # Check if compression resulted in a positive outcome and update the size of the compressed data
+        self.is_positive_compress_size(compressed_size)
+        self.__size = compressed_size
+
+    def compress_huf_solid(self, lengths: List[int], table_offset: int) -> bytes:
+        """
+        Compresses the file using Huffman coding with a canonical code that is shared by a few files.
+        The code lengths are written once in the folder archive, so the header only says where they are.
 
-        # Check if compression resulted in a positive outcome
-        self.is_positive_compress(compressed_bytes)
+        Args:
+            lengths (List[int]): The code length of each byte value, every byte of the file must have a code.
+            table_offset (int): Where the code table is in the folder archive.
 
-        # Update the size of the compressed data
+        Returns:
+            bytes: Compressed data.
+        """
+        codes: List[str] = canonical_codes(lengths)
+        with self.open_original() as file_to_compress:
+            original_data: bytes = file_to_compress.read()
+        if any(codes[byte] == "" for byte in set(original_data)):
+            raise ValueError(f"the shared huffman code has no code for a byte of {self.__file_name}")
+
+        compressed_parts: List[bytes] = [self.compress_format(self.__file_name.split(".")[-1],
+                                                              original_size=len(original_data),
+                                                              table_offset=table_offset)]
+        if original_data != b'':
+            encoder: HuffmanEncoder = HuffmanEncoder(codes)
+            compressed_parts += [encoder.encode(original_data), encoder.flush()]
+        compressed_bytes: bytes = b''.join(compressed_parts)
+        # check the efficiency of the compress
+        self.is_positive_compress(compressed_bytes)
         self.__size = len(compressed_bytes)
-
         return compressed_bytes
 
     @staticmethod
@@ -83,18 +233,19 @@ class Compressor:
         Returns:
             bytes: Huffman encoded data.
         """
-        compressed_data: bytes = b''  # Initialize an empty bytes object to store the compressed data
-        bits_str: str = ""
-        for byte in original_data:  # Iterate through each byte in the original data
-            bits_str += (huf_map[bytes([byte])]).decode()  # Append the Huffman code for the byte to the compressed data
-        rest_of_bits: int = len(bits_str) % 8
-        bits_str += (8 - rest_of_bits) * "0"
-        for i in range(0, len(bits_str), 8):
-            b: bytearray = bytearray()
-            eight_bits: str = bits_str[i: i + 8]
-            b.append(int(eight_bits, 2))
-            compressed_data += bytes(b)
-        return compressed_data + str(8 - rest_of_bits).encode()  # Return the compressed data
+        encoder: HuffmanEncoder = HuffmanEncoder(code_table(huf_map))
+        counter: ByteCounter = ByteCounter()
+        counter.update(original_data)
+        # The size of the output is known, the last byte and the padding digit always take two more bytes
+        compressed_data: bytearray = bytearray(encoder.encoded_bits(counter.histogram) // 8 + 2)
+        position: int = 0
+        data_view: memoryview = memoryview(original_data)
+        for i in range(0, len(original_data), ENCODE_CHUNK_SIZE):
+            packed: bytes = encoder.encode(data_view[i: i + ENCODE_CHUNK_SIZE])
+            compressed_data[position: position + len(packed)] = packed
+            position += len(packed)
+        compressed_data[position:] = encoder.flush()
+        return bytes(compressed_data)  # Return the compressed data
 
     def create_huf_map(self, huf_tree: Union[TreeNode, Tuple[bytes, int]], huf_map: Dict[bytes, bytes], path: str = "")\
             -> Dict[bytes, bytes]:
@@ -125,12 +276,31 @@ class Compressor:
             huf_map = self.create_huf_map(new_huf.left, huf_map, path + "0")  # Recursively traverse the left subtree
         return huf_map  # Return the updated Huffman map
 
-    def create_huf_tree(self, original_data: bytes) -> Union[TreeNode, Tuple[bytes, int]]:
+    @staticmethod
+    def create_canonical_huf_map(huf_tree: Union[TreeNode, Tuple[bytes, int]]) -> Dict[bytes, bytes]:
+        """
+        Create a map of canonical Huffman codes, with the same code lengths as in the Huffman tree.
+        Only the code lengths need to be saved in the header to build these codes again.
+
+        Args:
+            huf_tree (TreeNode): The Huffman tree.
+
+        Returns:
+            Dict[bytes, bytes]: A dictionary mapping each byte character to its canonical Huffman code.
+
+        Example:
+            create_canonical_huf_map(huffman_tree) -> {b'A': b'0', b'B': b'10', b'C': b'110', b'D': b'111'}
+        """
+        codes: List[str] = canonical_codes(code_lengths(huf_tree))
+        return {bytes([byte]): codes[byte].encode() for byte in range(256) if codes[byte] != ""}
+
+    def create_huf_tree(self, original_data: Union[bytes, ByteCounter]) -> Union[TreeNode, Tuple[bytes, int]]:
         """
         Create a Huffman tree from the given original data.
 
         Args:
-            original_data (bytes): The original data to construct the Huffman tree from.
+            original_data (Union[bytes, ByteCounter]): The original data to construct the Huffman tree from,
+            or a ByteCounter that already counted it.
 
         Returns:
             TreeNode: The root node of the Huffman tree.
@@ -140,95 +310,45 @@ class Compressor:
         huf_tree: Union[TreeNode, Tuple[bytes, int]] = self.huf_tree(sorted_chars_lst)[0]  # Generate the Huffman tree
         return huf_tree  # Return the root node of the Huffman tree
 
-    def huf_tree(self, sorted_chars_lst: List[Union[TreeNode, Tuple[bytes, int]]]) -> List[
+    @staticmethod
+    def huf_tree(sorted_chars_lst: List[Union[TreeNode, Tuple[bytes, int]]]) -> List[
             Union[TreeNode, Tuple[bytes, int]]]:
         """
         Construct a Huffman tree from the sorted list of characters and their frequencies.
 
+        The nodes are kept in a priority queue keyed by (frequency, position). Popping twice gives the lowest
+        and second-lowest nodes, and the merged node takes the position of the right one, so ties are broken
+        exactly like a left-to-right scan of the list and the tree (and the compressed output) stays the same.
+
         Args:
             sorted_chars_lst (List[Union[TreeNode, Tuple[bytes, int]]]): Sorted list of characters and their frequencies
 
         Returns:
             List[Union[TreeNode, Tuple[bytes, int]]]: List containing the root node of the Huffman tree.
 
+        Example:
+            huf_tree([(b'A', 1), (b'B', 1), (b'C', 2)])[0].tree_str() -> b'4,2,Al,Bl,Cl,'
         """
+        heap: List[Tuple[int, int, TreeNode]] = []
         for i in range(len(sorted_chars_lst)):
             new_node = TreeNode(sorted_chars_lst[i])
             sorted_chars_lst[i] = new_node
+            heap.append((Compressor.node_or_tuple_value(new_node), i, new_node))
+        heapq.heapify(heap)
+
+        while len(heap) > 1:
+            # Pop the lowest and second-lowest frequency nodes
+            first_value, first_index, first_node = heapq.heappop(heap)
+            second_value, second_index, second_node = heapq.heappop(heap)
+            # The node that came first in the list is the left child
+            if first_index < second_index:
+                new_node = TreeNode(first_value + second_value, first_node, second_node)
+            else:
+                new_node = TreeNode(first_value + second_value, second_node, first_node)
+            # The new node replaces the right child position
+            heapq.heappush(heap, (first_value + second_value, max(first_index, second_index), new_node))
 
-        while len(sorted_chars_lst) > 1:
-            # Find the indices of the lowest and second-lowest frequency characters
-            first_add_index: int = self.find_lowest_index(sorted_chars_lst)
-            second_add_index: int = self.find_second_lowest_index(sorted_chars_lst, first_add_index)
-            # Combine the frequencies of the lowest and second-lowest characters to create a new node
-            new_data: int = (self.node_or_tuple_value(sorted_chars_lst[first_add_index]) +
-                             self.node_or_tuple_value(sorted_chars_lst[second_add_index]))
-            left: int = min(first_add_index, second_add_index)
-            right: int = max(first_add_index, second_add_index)
-            new_node = TreeNode(new_data, sorted_chars_lst[left], sorted_chars_lst[right])
-
-            # Replace the second-lowest character with the new node and remove the lowest character
-            sorted_chars_lst[right] = new_node
-            del sorted_chars_lst[left]
-
-        return sorted_chars_lst
-
-    def find_lowest_index(self, sorted_chars_lst: List[Union[TreeNode, Tuple[bytes, int]]]) -> int:
-        """
-        Find the index of the lowest frequency character in the sorted list.
-
-        Args:
-            sorted_chars_lst (List[Union[TreeNode, Tuple[bytes, int]]]): Sorted list of characters and their frequencies
-
-        Returns:
-            int: Index of the lowest frequency character.
-
-        Example:
-            find_lowest_index([(b'A', 2), (b'B', 3), (b'C', 4)]) -> 0
-        """
-        lowest_index: int = 0
-        lowest_value: int = self.node_or_tuple_value(sorted_chars_lst[0])
-
-        # Iterate through the sorted list to find the index of the lowest frequency character
-        for i in range(len(sorted_chars_lst)):
-            if self.node_or_tuple_value(sorted_chars_lst[i]) < lowest_value:
-                lowest_value = self.node_or_tuple_value(sorted_chars_lst[i])
-                lowest_index = i
-
-        return lowest_index
-
-    def find_second_lowest_index(self, sorted_chars_lst: List[Union[TreeNode, Tuple[bytes, int]]],
-                                 lowest_index: int) -> int:
-        """
-        Find the index of the second-lowest frequency character in the sorted list.
-
-        Args:
-            sorted_chars_lst (List[Union[TreeNode, Tuple[bytes, int]]]): Sorted list of characters and their frequencies
-            lowest_index (int): Index of the lowest frequency character.
-
-        Returns:
-            int: Index of the second-lowest frequency character.
-
-        Example:
-            find_second_lowest_index([(b'A', 2), (b'B', 3), (b'C', 4)], 0) -> 1
-        """
-        second_lowest_index: int = 0
-        second_lowest_value: int = self.node_or_tuple_value(sorted_chars_lst[0])
-
-        # If lowest_index is 0, set second_lowest_index to 1
-        if lowest_index == 0:
-            second_lowest_index = 1
-            second_lowest_value = self.node_or_tuple_value(sorted_chars_lst[1])
-
-        # Iterate through the sorted list to find the index of the second-lowest frequency character
-        for i in range(len(sorted_chars_lst)):
-            if i == lowest_index:
-                continue
-            if self.node_or_tuple_value(sorted_chars_lst[i]) < second_lowest_value:
-                second_lowest_value = self.node_or_tuple_value(sorted_chars_lst[i])
-                second_lowest_index = i
-
-        return second_lowest_index
+        return [node for _, _, node in heap]
 
     @staticmethod
     def node_or_tuple_value(item: Union[TreeNode, Tuple[bytes, int]]) -> Any:
@@ -248,12 +368,14 @@ class Compressor:
         else:
             return 0
 
-    def sorted_chars_repeats(self, original_data: bytes) -> List[Tuple[bytes, int]]:
+    @staticmethod
+    def sorted_chars_repeats(original_data: Union[bytes, ByteCounter]) -> List[Tuple[bytes, int]]:
         """
         Sort characters in original data by their frequencies.
 
         Args:
-            original_data (bytes): Original data containing bytes characters.
+            original_data (Union[bytes, ByteCounter]): Original data containing bytes characters,
+            or a ByteCounter that already counted it.
 
         Returns:
             List[Tuple[bytes, int]]: A list of tuples where each tuple contains a character and its frequency,
@@ -262,128 +384,118 @@ class Compressor:
         Example:
             sorted_chars_repeats(b'AABBBCCCC') -> [(b'A', 2), (b'B', 3), (b'C', 4)]
         """
-        sorted_chars_lst: List[Tuple[bytes, int]] = []
-        chars_dict: Dict[bytes, int] = self.count_each_char(original_data)
-
-        # Convert the dictionary items to tuples and add them to the list
-        for item in chars_dict.keys():
-            sorted_chars_lst.append((bytes([item[0]]), chars_dict[item]))
-
-        # Sort the list of tuples based on the frequency (second element in the tuple)
-        return sorted(sorted_chars_lst, key=lambda x: x[1])
-
-    @staticmethod
-    def count_each_char(original_data: bytes) -> Dict[bytes, int]:
-        """
-        Count the frequency of each character in the original data.
-
-        Args:
-            original_data (bytes): Original data containing bytes characters.
-
-        Returns:
-            Dict[bytes, int]: A dictionary where keys are bytes characters and values are their frequencies.
+        if isinstance(original_data, ByteCounter):
+            return original_data.sorted_chars()
+        counter: ByteCounter = ByteCounter()
+        counter.update(original_data)
+        return counter.sorted_chars()
 
-        Example:
-            count_each_char(b'AABBBCCCC') -> {b'A': 2, b'B': 3, b'C': 4}
-        """
-        chars_dict: Dict[bytes, int] = dict()
-
-        # Iterate over each byte in the original data
-        for item in original_data:
-            # Convert the byte to bytes type and check if it exists in the dictionary
-            if bytes([item]) not in chars_dict.keys():
-                # If the byte is not in the dictionary, add it with frequency 1
-                chars_dict[bytes([item])] = 1
-            else:
-                # If the byte is already in the dictionary, increment its frequency by 1
-                chars_dict[bytes([item])] += 1
-
-        return chars_dict
-
-    def compress_rle(self, repeat_size: int = 1) -> bytes:
+    def compress_rle(self, repeat_size: int = 1, block_size: int = KILO) -> bytes:
         """
         run-length encoding compress of the file
         calculate the efficiency of the compression
+        the file is read and encoded in chunks of whole blocks, each block is encoded alone in one pass
+        the number of repeats of the runs are written as varints before the chunks of the runs
         repeat_size (int, optional): The size of the repeated chunks to be compressed. Defaults to 1.
+            AUTO_REPEAT_SIZE tries a few repeat sizes and block sizes on samples of the file and uses the best.
+        block_size (int, optional): The size of the blocks that are encoded alone. Defaults to KILO.
         :return: bytes of rle compress
         """
-        # the original data from the file
-        original_file_data: bytes = self.read_binary_file()
-        # starting the compress bytes with the compress format
-        compressed_bytes: bytes = self.compress_format(self.__file_name.split(".")[-1], repeat_size)
-        compressed_bytes_without_head: bytes = b''
+        if repeat_size == AUTO_REPEAT_SIZE:
+            # The chosen sizes are written in the header like any other sizes
+            repeat_size, block_size = choose_parameters(self.read_samples(), self.original_size())
+        if repeat_size < 1 or block_size < 1:
+            raise ValueError("wrong repeat size or block size")
+        compressed_bytes: bytes = b''
         if self.__compression_method == "RLE":
-            sizes: bytes = b''
-            # compress each kb of data
-            while original_file_data != b'':
-                one_kb: bytes = original_file_data[:KILO]
-                compressed_data, sizes = self.compress_rle_kb(one_kb, sizes, repeat_size)
-                compressed_bytes_without_head += compressed_data
-                # slice the compressed kb from the original data
-                original_file_data = original_file_data[KILO:]
-            compressed_bytes += sizes[:-1] + b'\r\n'
-            compressed_bytes += compressed_bytes_without_head
+            data_parts: List[bytes] = []
+            sizes_parts: List[bytes] = []
+            # compress each chunk of blocks of data
+            read_size: int = block_size * max(1, RLE_CHUNK_SIZE // block_size)
+            with self.open_original() as file_to_compress:
+                chunk: bytes = file_to_compress.read(read_size)
+                while chunk != b'':
+                    compressed_data, sizes = find_runs(chunk, repeat_size, block_size=block_size)
+                    data_parts.append(compressed_data)
+                    sizes_parts.append(encode_varints(sizes))
+                    chunk = file_to_compress.read(read_size)
+            runs_table: bytes = b''.join(sizes_parts)
+            # starting the compress bytes with the compress format
+            file_head: bytes = self.compress_format(self.__file_name.split(".")[-1], repeat_size,
+                                                    block_size=block_size, table_size=len(runs_table))
+            compressed_bytes = b''.join([file_head, runs_table] + data_parts)
         # check the efficiency of the compress
         self.is_positive_compress(compressed_bytes)
         self.__size = len(compressed_bytes)
         return compressed_bytes
 
-    @staticmethod
-    def compress_rle_kb(kb_data: bytes, sizes: bytes, repeat_size: int = 1) -> Tuple[bytes, bytes]:
+    def compress_pkb(self) -> bytes:
+        """
+        PackBits compress of the file, runs of a byte are written as a count and the byte
+        and the bytes between them as literal spans, so data without runs grows by less than 1%.
+        calculate the efficiency of the compression
+        :return: bytes of PackBits compress
+        """
+        data_parts: List[bytes] = []
+        # compress each chunk of data, a run or a literal span may be cut at the end of a chunk
+        with self.open_original() as file_to_compress:
+            chunk: bytes = file_to_compress.read(RLE_CHUNK_SIZE)
+            while chunk != b'':
+                data_parts.append(pack_bits(chunk))
+                chunk = file_to_compress.read(RLE_CHUNK_SIZE)
+        # starting the compress bytes with the compress format
+        file_head: bytes = self.compress_format(self.__file_name.split(".")[-1],
+                                                original_size=self.original_size())
+        compressed_bytes: bytes = b''.join([file_head] + data_parts)
+        # check the efficiency of the compress
+        self.is_positive_compress(compressed_bytes)
+        self.__size = len(compressed_bytes)
+        return compressed_bytes
+
+    def compress_sto(self) -> bytes:
+        """
+        store the file as it is after the header, for data that does not get smaller
+        :return: bytes of the stored file
         """
-        Compresses a byte string using run-length encoding (RLE) with a specified repeat size.
+        with self.open_original() as file_to_compress:
+            original_data: bytes = file_to_compress.read()
+        # starting the compress bytes with the compress format
+        file_head: bytes = self.compress_format(self.__file_name.split(".")[-1],
+                                                original_size=len(original_data))
+        compressed_bytes: bytes = file_head + original_data
+        # check the efficiency of the compress, it is the size of the header below zero
+        self.is_positive_compress(compressed_bytes)
+        self.__size = len(compressed_bytes)
+        return compressed_bytes
+
+    def read_samples(self, windows: int = AUTO_WINDOWS, window_size: int = AUTO_WINDOW_SIZE) -> List[bytes]:
+        """
+        Read a few parts of the file, spread evenly from its start to its end.
 
         Args:
-            kb_data (bytes): The input byte string to be compressed.
-            sizes (bytes): a bytes string of how many numbers used for each chunk of bytes repetition
-            repeat_size (int, optional): The size of the repeated chunks to be compressed. Defaults to 1.
+            windows (int, optional): How many parts to read. Defaults to AUTO_WINDOWS.
+            window_size (int, optional): The size of each part. Defaults to AUTO_WINDOW_SIZE.
 
         Returns:
-            Tuple[bytes, bytes]: The compressed byte string, sizes
-
-        Notes:
-            - This function performs run-length encoding (RLE) compression on the input byte string.
-            - The repeat_size parameter specifies the number of bytes in each repeated chunk to be compressed.
-            - If the input byte string is empty or if the repeat_size is greater than or equal to the length of the
-              line, the original byte string is returned without compression.
-            - The compression algorithm iterates through the byte string, identifying repeated chunks of bytes.
-            - For each repeated chunk, the algorithm replaces it with a byte indicating the number of repetitions
-              followed by the repeated bytes.
-        """
-
-        # Check if repeat_size is bigger than the line length
-        if repeat_size >= len(kb_data):
-            return kb_data, sizes + b'1'
-
-        # Initialize variables
-        new_compressed_chunk: bytes = b''
-        current_bytes: bytes = kb_data[0: repeat_size]
-        counter: int = 1
-        line_counter: int = repeat_size
-
-        # Iterate through the byte string
-        while line_counter < len(kb_data) + repeat_size:
-            # Check if the current chunk is repeated
-            if current_bytes == kb_data[line_counter: line_counter + repeat_size] and counter < 10 ** 9:
-                counter += 1
-                current_bytes = kb_data[line_counter: line_counter + repeat_size]
-                line_counter += repeat_size
-            else:
-                # add the number of repeats and the repeated bytes to the compressed line
-                sizes += (str(counter) + ",").encode("utf-8")
-                new_compressed_chunk += current_bytes
-                current_bytes = kb_data[line_counter: line_counter + repeat_size]
-                line_counter += repeat_size
-                counter = 1
-
-        return new_compressed_chunk, sizes
+            List[bytes]: The parts, or the whole file if it is not bigger than all the parts together.
+        """
+        original_size: int = self.original_size()
+        with self.open_original() as file_to_compress:
+            if original_size <= windows * window_size:
+                return [file_to_compress.read()]
+            samples: List[bytes] = []
+            for i in range(windows):
+                # The first part starts the file and the last part ends it
+                file_to_compress.seek(i * (original_size - window_size) // max(windows - 1, 1))
+                samples.append(file_to_compress.read(window_size))
+        return samples
 
     def read_binary_file(self) -> bytes:
         """
         read the file in the object as binary
         :return: a list of bytes of the data in the file
         """
-        with open(self.__file_name, 'rb') as file_to_compress:
+        with self.open_original() as file_to_compress:
             original_file_data: bytes = file_to_compress.read()
         return original_file_data
 
@@ -397,11 +509,20 @@ class Compressor:
         Returns:
             bool: True if compression reduced file size, False otherwise.
         """
-        # Get the size of the original file
-        original_size = os.path.getsize(self.__file_name)
+        return self.is_positive_compress_size(len(compressed_bytes))
+
+    def is_positive_compress_size(self, compress_size: int) -> bool:
+        """
+        Check if compression resulted in a reduction in file size, for compressed data that was already written.
 
-        # Calculate the total size of compressed bytes
-        compress_size = len(compressed_bytes)
+        Args:
+            compress_size (int): The size of the compressed data.
+
+        Returns:
+            bool: True if compression reduced file size, False otherwise.
+        """
+        # Get the size of the original file
+        original_size = self.original_size()
 
         # Calculate compression efficiency
         self.__compression_efficiency = original_size - compress_size
@@ -432,14 +553,21 @@ class Compressor:
         new_file_name = f'/{file_name_and_type_lst[0]}_{self.__compression_method}.txt'
         return new_file_name
 
-    def compress_format(self, file_type: str, repeat_size: int = 1, tree_node: Any = None) -> bytes:
+    def compress_format(self, file_type: str, repeat_size: int = 1, huf_map: Optional[Dict[bytes, bytes]] = None,
+                        original_size: int = 0, block_size: int = 0, table_size: int = 0,
+                        table_offset: Optional[int] = None) -> bytes:
         """
         Generate the header information for the compressed file.
 
         Args:
             file_type (str): the file type.
             repeat_size (int, optional): The repeat size for compression. Defaults to 1.
-            tree_node (optional): the tree node of the huffman code.
+            huf_map (Dict[bytes, bytes], optional): the canonical huffman code of each char.
+            original_size (int, optional): the size of the original data, saved in the huffman, PackBits and
+                stored headers.
+            block_size (int, optional): the size of the blocks, for huffman 0 is one huffman code for the whole file.
+            table_size (int, optional): the size of the table of the number of repeats of the runs.
+            table_offset (Optional[int], optional): where the shared huffman code table is in the folder archive.
 
         Returns:
             bytes: A list containing the header information as byte strings.
@@ -452,18 +580,44 @@ class Compressor:
 
         # Check if the compression method is RLE
         if self.__compression_method == "RLE":
-            # Append the compression method to the header list followed by a newline character
-            file_head += f'RLE,{file_type}\r\n'.encode()
-            # Append the repeat size to the header list followed by a newline character
-            file_head += f'{repeat_size}\r\n'.encode()
-
-        if self.__compression_method == "HUF":
-            if tree_node.left is None and tree_node.right is None:
-                tree_node = TreeNode(tree_node.data[1], tree_node, tree_node)
-            # Append the compression method to the header list followed by a newline character
-            file_head += f'HUF,{file_type}\r\n'.encode()
-            # Append the huffman code tree to the header list followed by a newline character
-            file_head += tree_node.tree_str() + b'\r\n'
+            # Append the compression method with runs tables of varints followed by a newline character
+            file_head += f'RLV,{file_type}\r\n'.encode()
+            # Append the repeat size, the block size and the size of the runs table followed by a newline character
+            file_head += f'{repeat_size},{block_size},{table_size}\r\n'.encode()
+
+        if self.__compression_method == "PKB":
+            # Append the PackBits format followed by a newline character
+            file_head += f'PKB,{file_type}\r\n'.encode()
+            # Append the original size followed by a newline character
+            file_head += f'{original_size}\r\n'.encode()
+
+        if self.__compression_method == STORE_METHOD:
+            # Append the stored format followed by a newline character
+            file_head += f'{STORE_METHOD},{file_type}\r\n'.encode()
+            # Append the original size followed by a newline character
+            file_head += f'{original_size}\r\n'.encode()
+
+        if self.__compression_method == "HUF" and block_size > 0:
+            # Append the huffman blocks format, every block has its own code lengths
+            file_head += f'HUB,{file_type}\r\n'.encode()
+            # Append the original size and the size of the blocks followed by a newline character
+            file_head += f'{original_size},{block_size}\r\n'.encode()
+
+        elif self.__compression_method == "HUF" and table_offset is not None:
+            # Append the shared huffman code format, the code lengths are written once in the archive
+            file_head += f'HUS,{file_type}\r\n'.encode()
+            # Append the original size and where the code table is followed by a newline character
+            file_head += f'{original_size},{table_offset}\r\n'.encode()
+
+        elif self.__compression_method == "HUF":
+            lengths: List[int] = [0] * 256
+            if huf_map is not None:
+                for char, code in huf_map.items():
+                    lengths[char[0]] = len(code)
+            # Append the canonical huffman format to the header list followed by a newline character
+            file_head += f'HUC,{file_type}\r\n'.encode()
+            # Append the original size and the code length of each char followed by a newline character
+            file_head += f'{original_size},'.encode() + encode_code_lengths(lengths) + b'\r\n'
 
         return file_head
 
@@ -474,14 +628,49 @@ class Compressor:
         return self.__size
 
 
-def main_compressor(path: str, comp_method: str, repeat_size: int = 1) -> Tuple[Union[str, None], int]:
+def compress_huf_block(block: bytes) -> bytes:
+    """
+    Compress one block of a file with its own canonical Huffman code.
+    This is a module function so it can be sent to the processes of a pool.
+
+    Args:
+        block (bytes): The block of the original data.
+
+    Returns:
+        bytes: The code lengths of the block, b'\\r\\n', and the Huffman encoded data.
+    """
+    counter: ByteCounter = ByteCounter()
+    counter.update(block)
+    huf_tree: Union[TreeNode, Tuple[bytes, int]] = Compressor.huf_tree(counter.sorted_chars())[0]
+    lengths: List[int] = code_lengths(huf_tree)
+    codes: List[str] = canonical_codes(lengths)
+    huf_map: Dict[bytes, bytes] = {bytes([byte]): codes[byte].encode() for byte in range(256) if codes[byte] != ""}
+    return encode_code_lengths(lengths) + b'\r\n' + Compressor.create_huf_data(block, huf_map)
+
+
+def main_compressor(path: str, comp_method: str, repeat_size: int = 1, block_size: int = 0,
+                    jobs: int = 1, chunking: bool = False, incremental: bool = False,
+                    solid: bool = False, chunking_stats: Optional[ChunkingStats] = None) \
+        -> Tuple[Union[str, None], int]:
     """
     Main function for compressing files or folders.
 
     Args:
         path (str): The path to the file or folder to be compressed.
-        comp_method (str): The compression method to be used (e.g., "RLE").
-        repeat_size (int, optional): The repeat size for compression. Defaults to 1.
+        comp_method (str): The compression method to be used (e.g., "RLE"), AUTO_METHOD to choose it for each file.
+        repeat_size (int, optional): The repeat size for compression, AUTO_REPEAT_SIZE to choose it. Defaults to 1.
+        block_size (int, optional): Huffman coding of a single file in blocks of this size, every block with its
+            own code, on a pool of processes. Defaults to 0, one code for the whole file.
+        jobs (int, optional): The number of processes for the blocks or for the files of a folder,
+            0 for one for each core.
+        chunking (bool, optional): Cut the files of a folder into content-defined chunks and store each distinct
+            chunk once. Defaults to False.
+        incremental (bool, optional): Compress again only the files of a folder that changed since the last time
+            it was compressed, the other files are copied from the archive of the last time. Defaults to False.
+        solid (bool, optional): Huffman coding of the small files of a folder with one code for each type of file.
+            Defaults to False.
+        chunking_stats (Optional[ChunkingStats], optional): Counts how much of the files is in distinct chunks
+            and how fast they are cut, with chunking. Defaults to None.
 
     Returns:
         Union[str, None]: Error message if compression fails, None otherwise.
@@ -489,13 +678,23 @@ def main_compressor(path: str, comp_method: str, repeat_size: int = 1) -> Tuple[
     # Check if the compression method is valid
     path = path.replace("\\", "/")
     efficiency: int = 0
-    if comp_method != "RLE" and comp_method != "HUF":
+    if comp_method not in COMPRESS_METHODS + [AUTO_METHOD]:
         return "wrong compress method", 0
 
     # Check if the repeat size is valid
-    if repeat_size < 1 or repeat_size % 1 != 0:
+    if repeat_size < AUTO_REPEAT_SIZE or repeat_size % 1 != 0:
         return "wrong repeat size", 0
 
+    # Check if the block size is valid
+    if block_size < 0:
+        return "wrong block size", 0
+
+    # Check if solid mode can be used
+    if solid and comp_method != "HUF":
+        return "solid mode is only for huffman coding", 0
+    if solid and chunking:
+        return "solid mode cant be used with chunks", 0
+
     # Check the type of path provided
     path_type: str = check_path(path)
     if path_type == "path doesnt exists":
@@ -507,6 +706,8 @@ def main_compressor(path: str, comp_method: str, repeat_size: int = 1) -> Tuple[
     file_name: str = folder_name.split("/")[-1]
     # Compress a single file
     if path_type == "path is file":
+        if comp_method == AUTO_METHOD:
+            comp_method = choose_method(Compressor(path, STORE_METHOD).read_samples(), os.path.getsize(path))
         comp = Compressor(path, comp_method)
         if path.split("/")[-1].find('.') == -1:
             folder_name = "/".join(path.split("/")[:-1])
@@ -517,22 +718,41 @@ def main_compressor(path: str, comp_method: str, repeat_size: int = 1) -> Tuple[
             efficiency = comp.get_efficiency()
             new_file_name = f'{file_name}_RLE.txt'
 
-        if comp_method == "HUF":
-            data = comp.compress_huf()
+        if comp_method == "PKB":
+            data = comp.compress_pkb()
             efficiency = comp.get_efficiency()
+            new_file_name = f'{file_name}_PKB.txt'
+
+        if comp_method == STORE_METHOD:
+            data = comp.compress_sto()
+            efficiency = comp.get_efficiency()
+            new_file_name = f'{file_name}_STO.txt'
+
+        if comp_method == "HUF":
             new_file_name = f'{file_name}_HUF.txt'
+            create_folder(folder_name)
+            # Huffman coding writes the compressed data to the new file while it is produced
+            with open(f'{folder_name}/{new_file_name}', "wb") as compressed_file:
+                if block_size > 0:
+                    comp.compress_huf_blocks_to_file(compressed_file, block_size, jobs)
+                else:
+                    comp.compress_huf_to_file(compressed_file)
+            return None, comp.get_efficiency()
 
         new_path: str = f'{folder_name}/{new_file_name}'
         create_folder(folder_name)
-    # Compress a folder
+    # Compress a folder into a folder archive, each file is written to it when it is compressed
     if path_type == "path is folder":
-        data, data_no_head, efficiency = compress_folder(path, comp_method, repeat_size)
-        data += b'\r\n' + data_no_head
-        if comp_method == "RLE":
-            new_path = f'{path}_RLE.txt'
-
-        if comp_method == "HUF":
-            new_path = f'{path}_HUF.txt'
+        new_path = f'{path}_{comp_method}.txt'
+        try:
+            efficiency = compress_folder_to_archive(path, comp_method, new_path, repeat_size, jobs, chunking,
+                                                    incremental, solid, chunking_stats)
+        except Exception as e:
+            # Dont leave half of an archive behind, an incremental compression keeps the archive of the last time
+            if os.path.exists(new_path) and not incremental:
+                os.remove(new_path)
+            return f"{e} problem compress {path}", 0
+        return None, efficiency
 
     try:
         # Write the compressed data to a new file
@@ -543,173 +763,491 @@ def main_compressor(path: str, comp_method: str, repeat_size: int = 1) -> Tuple[
     return None, efficiency
 
 
-def compress_folder(folder_path: str, compress_method: str, repeat_size: int = 1) -> Tuple[bytes, bytes, int]:
+def compress_file(file_path: str, compress_method: str, repeat_size: int = 1, data: Optional[bytes] = None) \
+        -> Tuple[bytes, int]:
     """
-    Compresses the contents of a folder using the specified compression method.
+    Compress one file of a folder.
 
     Args:
-        folder_path (str): The path to the folder to be compressed.
+        file_path (str): The path to the file.
+        compress_method (str): The compression method to be used (e.g., "RLE"), AUTO_METHOD to choose it from
+            samples of the file.
+        repeat_size (int, optional): The repeat size for compression. Defaults to 1.
+        data (Optional[bytes], optional): Data to compress instead of the content of the file, like a chunk of it.
+
+    Returns:
+        Tuple[bytes, int]: The compressed file with its header, and the compression efficiency.
+    """
+    if compress_method == AUTO_METHOD:
+        probe: Compressor = Compressor(file_path, STORE_METHOD, data)
+        compress_method = choose_method(probe.read_samples(), probe.original_size())
+    comp: Compressor = Compressor(file_path, compress_method, data)
+    compressed_data: bytes = b''
+    if compress_method == "RLE":
+        compressed_data = comp.compress_rle(repeat_size)
+    if compress_method == "HUF":
+        compressed_data = comp.compress_huf()
+    if compress_method == "PKB":
+        compressed_data = comp.compress_pkb()
+    if compress_method == STORE_METHOD:
+        compressed_data = comp.compress_sto()
+    return compressed_data, comp.get_efficiency()
+
+
+def choose_method(samples: List[bytes], original_size: int) -> str:
+    """
+    Choose how to compress a file from a few samples of it, without compressing it.
+    Huffman coding takes about the entropy of the byte histogram of the samples for each byte, and the code table.
+    Run-length encoding takes a chunk for each run of the samples and the number of repeats of the run,
+    so it wins only when the runs are long. A file that neither method makes AUTO_MIN_SAVING smaller, like a file
+    that is already compressed, is stored as it is.
+
+    Args:
+        samples (List[bytes]): Parts of the file, see Compressor.read_samples.
+        original_size (int): The size of the whole file.
+
+    Returns:
+        str: "RLE", "HUF" or STORE_METHOD.
+
+    Example:
+        choose_method([b'a' * 5000], 5000) -> "RLE"
+    """
+    counter: ByteCounter = ByteCounter()
+    for sample in samples:
+        counter.update(sample)
+    if counter.size == 0:
+        return STORE_METHOD
+    # The code table has a code length for each byte value up to the last byte value in the file
+    table_size: int = max(byte for byte in range(256) if counter.histogram[byte] > 0) + 1
+    huf_size: float = original_size * counter.entropy() / 8 + table_size
+    rle_size: float = original_size * predicted_size(samples, 1, KILO) / counter.size
+    method, best_size = ("RLE", rle_size) if rle_size <= huf_size else ("HUF", huf_size)
+    if best_size > original_size * (1 - AUTO_MIN_SAVING):
+        return STORE_METHOD
+    return method
+
+
+def compress_chunk(file_path: str, start: int, size: int, compress_method: str, repeat_size: int = 1) -> bytes:
+    """
+    Compress one chunk of a file, the chunk is read from the file so only its place is sent to the pool.
+
+    Args:
+        file_path (str): The path to the file.
+        start (int): Where the chunk starts in the file.
+        size (int): The size of the chunk.
         compress_method (str): The compression method to be used (e.g., "RLE").
         repeat_size (int, optional): The repeat size for compression. Defaults to 1.
 
     Returns:
-        Tuple[bytes, bytes]: A tuple containing the compressed header bytes and the compressed data bytes.
+        bytes: The compressed chunk with its header.
     """
-    first_line = b''  # Initialize variable to store the compressed header bytes
-    data: bytes = b''  # Initialize variable to store the compressed data bytes
-    efficiency: int = 0
-    all_path_content: List[str] = [file for file in os.listdir(folder_path)]  # Get all contents of the folder
-    only_files_lst: List[str] = [file for file in os.listdir(folder_path)
-                                 if os.path.isfile(os.path.join(folder_path, file))]  # Get only files
-    all_files: bool = True
-    for file in all_path_content:
-        if not os.path.isfile(os.path.join(folder_path, file)):
-            all_files = False
-
-    # Check if all contents are files
-    if all_files:
-        # Compress folder contents with only files
-        new_first_line, new_data, efficiency1 = compress_folder_only_files(folder_path, compress_method)
-        efficiency += efficiency1
-        # Check and modify the last character of the header
-        if new_first_line[-1] == 44:  # Check if the last character is comma (',')
-            new_first_line = new_first_line[:-1]  # Remove the last comma
-        new_first_line += b"],"  # Append closing bracket to the header
-        return new_first_line, new_data, efficiency  # Return the compressed header and data
-
-    # Compress folder contents with subfolders
-    new_first_line, new_data, efficiency1 = compress_folder_only_files(folder_path, compress_method, repeat_size)
-    efficiency += efficiency1
-    first_line += new_first_line  # Append compressed header of current folder
-    data += new_data  # Append compressed data of current folder
-
-    # Compress contents of each subfolder recursively
-    for folder in all_path_content:
-        if folder not in only_files_lst:
-            new_first_line, new_data, efficiency1 = compress_folder(f'{folder_path}/{folder}', compress_method)
-            efficiency += efficiency1
-            first_line += new_first_line  # Append compressed header of subfolder
-            data += new_data  # Append compressed data of subfolder
-
-    # Check and modify the last character of the header
-    if first_line[-1] == 44:  # Check if the last character is comma (',')
-        first_line = first_line[:-1]  # Remove the last comma
-    first_line += b"]"  # Append closing bracket to the header
-
-    return first_line, data, efficiency  # Return the compressed header and data
+    with open(file_path, 'rb') as file:
+        file.seek(start)
+        chunk: bytes = file.read(size)
+    if len(chunk) != size:
+        raise Exception(f"{file_path} changed while it was compressed")
+    return compress_file(file_path, compress_method, repeat_size, chunk)[0]
 
 
-def create_folder(folder: str) -> None:
+def file_type_of(file_path: str) -> str:
     """
-      Create a folder if it does not exist.
+    :param file_path: the path to a file
+    :return: the type of the file that is written in the header, txt for a file without a type
+    """
+    file_name: str = file_path.split("/")[-1]
+    return file_name.split(".")[-1] if "." in file_name else "txt"
 
-      Args:
-          folder (str): The path of the folder to create.
 
-      Returns:
-          None
-      """
-    if not os.path.isdir(folder):
-        os.mkdir(folder)
+def hash_file(file_path: str) -> bytes:
+    """
+    Hash the content of a file, it is read in chunks.
 
+    Args:
+        file_path (str): The path to the file.
 
-def check_path(path: str) -> str:
+    Returns:
+        bytes: The sha256 digest of the content.
     """
-    Check if the given path is a file, a folder, or if it doesn't exist.
+    content_hash = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(ENCODE_CHUNK_SIZE), b''):
+            content_hash.update(chunk)
+    return content_hash.digest()
+
+
+def find_duplicates(files: List[Tuple[str, str, int]], jobs: int = 1,
+                    known_hashes: Optional[Dict[str, bytes]] = None) -> Dict[str, str]:
+    """
+    Find the files with the same content. Only the files that have the same size as another file are hashed.
 
     Args:
-        path (str): The path to check.
+        files (List[Tuple[str, str, int]]): The path inside the archive, the path and the size of each file.
+        jobs (int, optional): The number of processes, 0 for one for each core.
+        known_hashes (Optional[Dict[str, bytes]], optional): The hashes that are already known, by the path
+            inside the archive, these files are not hashed again.
 
     Returns:
-        str: A string indicating the type of the path ("path is file", "path is folder", or "path doesn't exist").
+        Dict[str, str]: For each file that is a copy, the path inside the archive of the first file in the list
+            with the same content.
     """
-    if os.path.isdir(path):
-        return "path is folder"
+    sizes: Dict[int, int] = dict()
+    for _, _, size in files:
+        sizes[size] = sizes.get(size, 0) + 1
+    same_size: List[Tuple[str, str, int]] = [file for file in files if sizes[file[2]] > 1]
+
+    if known_hashes is None:
+        known_hashes = dict()
+    to_hash: List[Tuple[str, str, int]] = [file for file in same_size if file[0] not in known_hashes]
+    new_hashes: Dict[str, bytes] = dict(zip([file[0] for file in to_hash], ordered_map(
+        hash_file, [(file_path,) for _, file_path, _ in to_hash], jobs)))
+
+    duplicates: Dict[str, str] = dict()
+    first_by_content: Dict[Tuple[int, bytes], str] = dict()
+    for name, _, size in same_size:
+        content_hash: bytes = known_hashes[name] if name in known_hashes else new_hashes[name]
+        first: str = first_by_content.setdefault((size, content_hash), name)
+        if first != name:
+            duplicates[name] = first
+    return duplicates
+
+
+def compress_folder_to_archive(folder_path: str, compress_method: str, archive_path: str, repeat_size: int = 1,
+                               jobs: int = 1, chunking: bool = False, incremental: bool = False,
+                               solid: bool = False, chunking_stats: Optional[ChunkingStats] = None) -> int:
+    """
+    Compresses a folder and everything inside it into a folder archive, the files are compressed on a pool of
+    processes. The biggest files are compressed first so no process is left with a big file at the end,
+    and the compressed files are written in this order, so the archive is the same for any number of processes.
+    The entries are named from the folder itself, so the archive is extracted next to it.
+    Files with the same content are compressed and written once, the entries of the copies point to the same data.
+    With chunking, the chunks that are in a few files are compressed and written once too.
+    In solid mode the small files of each type share one huffman code, see add_solid_files.
+    With AUTO_METHOD each file, or each chunk, gets the method choose_method predicts for it, and the method is the
+    method of its entry in the table of contents.
+    An incremental compression keeps a manifest of the size, the modification time and the hash of each file next to
+    the archive. The files that did not change since the last archive are copied from it without extracting them,
+    so only the files that changed are compressed, and the new archive replaces the last one when it is done.
 
-    if os.path.isfile(path):
-        return "path is file"
+    Args:
+        folder_path (str): The path to the folder to be compressed.
+        compress_method (str): The compression method to be used (e.g., "RLE").
+        archive_path (str): The path of the new folder archive.
+        repeat_size (int, optional): The repeat size for compression. Defaults to 1.
+        jobs (int, optional): The number of processes, 0 for one for each core.
+        chunking (bool, optional): Cut the files into content-defined chunks and write each distinct chunk once.
+            Defaults to False.
+        incremental (bool, optional): Copy the files that did not change from the last archive. Defaults to False.
+        solid (bool, optional): Huffman coding of the small files with one code for each type of file.
+            Defaults to False.
+        chunking_stats (Optional[ChunkingStats], optional): Counts the chunks of the files, with chunking.
+            Defaults to None.
 
-    return "path doesnt exists"
+    Returns:
+        int: The compression efficiency of all the files.
+    """
+    folders: List[str] = []
+    files: List[Tuple[str, str, int]] = []
+    list_folder(folder_path, os.path.basename(os.path.normpath(folder_path)), folders, files)
+    # The biggest files first, files of the same size by name
+    by_size: List[Tuple[str, str, int]] = sorted(files, key=lambda file: (-file[2], file[0]))
+
+    # The manifest is used only if it was written for this archive with the same settings
+    settings: Dict[str, Any] = {"method": compress_method, "repeat_size": repeat_size, "chunking": chunking,
+                                "solid": solid}
+    records: Dict[str, FileRecord] = dict()
+    unchanged: Set[str] = set()
+    old_entries: Dict[str, ArchiveEntry] = dict()
+    known_hashes: Optional[Dict[str, bytes]] = None
+    if incremental:
+        previous: Dict[str, FileRecord] = read_manifest(archive_path, settings)
+        if len(previous) > 0:
+            with open(archive_path, 'rb') as old_archive:
+                old_entries = {entry.name: entry for entry in read_toc(old_archive)}
+        records, unchanged = check_files(by_size, previous, old_entries, jobs)
+        known_hashes = {name: record.content_hash for name, record in records.items()}
+
+    duplicates: Dict[str, str] = find_duplicates(by_size, jobs, known_hashes)
+    unique: List[Tuple[str, str, int]] = [file for file in by_size if file[0] not in duplicates]
+    changed: List[Tuple[str, str, int]] = [file for file in unique if file[0] not in unchanged]
 
+    efficiency: int = 0
+    # The last archive is read while the new one is written
+    new_path: str = f'{archive_path}.new' if incremental else archive_path
+    try:
+        with open(new_path, 'wb') as archive_file:
+            writer: ArchiveWriter = ArchiveWriter(archive_file)
+            for folder_name in folders:
+                writer.add_folder(folder_name)
+            stored: Dict[str, ArchiveEntry] = dict()
+            if len(unchanged) > 0:
+                with open(archive_path, 'rb') as old_archive:
+                    for name, _, original_size in unique:
+                        if name in unchanged:
+                            start: int = archive_file.tell()
+                            stored[name] = writer.copy_entry(old_entries[name], old_archive)
+                            efficiency += original_size - (archive_file.tell() - start)
+            if chunking:
+                new_stored, new_efficiency = add_chunked_files(writer, changed, compress_method, repeat_size, jobs,
+                                                               chunking_stats)
+            elif solid:
+                new_stored, new_efficiency = add_solid_files(writer, changed, jobs)
+            else:
+                new_stored, new_efficiency = add_compressed_files(writer, changed, compress_method, repeat_size, jobs)
+            stored.update(new_stored)
+            efficiency += new_efficiency
+            # A copy takes no space in the archive
+            for name, first in duplicates.items():
+                efficiency += writer.add_copy(name, stored[first]).original_size
+            # The table of contents lists the entries in the order of the folder tree
+            writer.order_entries(sorted(folders + [file[0] for file in files], key=lambda name: name.split("/")))
+            writer.finish()
+    except Exception:
+        if incremental and os.path.exists(new_path):
+            os.remove(new_path)
+        raise
+    if incremental:
+        os.replace(new_path, archive_path)
+        write_manifest(archive_path, settings, records)
+    return efficiency
+
+
+def check_files(files: List[Tuple[str, str, int]], previous: Dict[str, FileRecord],
+                old_entries: Dict[str, ArchiveEntry], jobs: int = 1) \
+        -> Tuple[Dict[str, FileRecord], Set[str]]:
+    """
+    Find the files that did not change since the last archive. A file with the size and the modification time of
+    the manifest did not change, the other files are hashed, on a pool of processes, and a file with the hash of
+    the manifest did not change either.
 
-def line_of_files_in_folder(folder_path: str, folder_content: List[str]) -> bytes:
+    Args:
+        files (List[Tuple[str, str, int]]): The path inside the archive, the path and the size of each file.
+        previous (Dict[str, FileRecord]): The records of the manifest of the last archive.
+        old_entries (Dict[str, ArchiveEntry]): The entries of the last archive by their names.
+        jobs (int, optional): The number of processes, 0 for one for each core.
+
+    Returns:
+        Tuple[Dict[str, FileRecord], Set[str]]: The new record of each file, and the paths inside the archive of
+            the files that did not change.
+    """
+    stats: Dict[str, os.stat_result] = {name: os.stat(file_path) for name, file_path, _ in files}
+    # A file can be copied only if it is a file of the same size in the last archive
+    in_archive: Set[str] = {name for name, _, size in files if name in previous and name in old_entries
+                            and not old_entries[name].is_folder and old_entries[name].original_size == size
+                            and previous[name].size == size}
+    to_hash: List[Tuple[str, str, int]] = [file for file in files if file[0] not in in_archive
+                                           or previous[file[0]].mtime_ns != stats[file[0]].st_mtime_ns]
+    new_hashes: Dict[str, bytes] = dict(zip([file[0] for file in to_hash], ordered_map(
+        hash_file, [(file_path,) for _, file_path, _ in to_hash], jobs)))
+
+    records: Dict[str, FileRecord] = dict()
+    unchanged: Set[str] = set()
+    for name, _, size in files:
+        if name in new_hashes:
+            records[name] = FileRecord(size, stats[name].st_mtime_ns, new_hashes[name])
+        else:
+            records[name] = previous[name]
+        if name in in_archive and records[name].content_hash == previous[name].content_hash:
+            unchanged.add(name)
+    return records, unchanged
+
+
+def add_compressed_files(writer: ArchiveWriter, files: List[Tuple[str, str, int]], compress_method: str,
+                         repeat_size: int = 1, jobs: int = 1) -> Tuple[Dict[str, ArchiveEntry], int]:
     """
-    Creates a byte string representing the contents of a folder.
+    Compress the files on a pool of processes and write each one to the archive, in the order of the list.
 
     Args:
-        folder_path (str): The path to the folder.
-        folder_content (List[str]): the folder content
+        writer (ArchiveWriter): The writer of the archive.
+        files (List[Tuple[str, str, int]]): The path inside the archive, the path and the size of each file.
+        compress_method (str): The compression method to be used (e.g., "RLE").
+        repeat_size (int, optional): The repeat size for compression. Defaults to 1.
+        jobs (int, optional): The number of processes, 0 for one for each core.
 
     Returns:
-        bytes: Byte string representing the contents of the folder.
+        Tuple[Dict[str, ArchiveEntry], int]: The entry of each file by its path inside the archive,
+            and the compression efficiency of all the files.
     """
-    # Initialize the folder line string
-    folder_line_str: str = f"{folder_path}["
+    stored: Dict[str, ArchiveEntry] = dict()
+    efficiency: int = 0
+    compressed_files: Iterator[Tuple[bytes, int]] = ordered_map(
+        compress_file, [(file_path, compress_method, repeat_size) for _, file_path, _ in files], jobs)
+    for (name, _, original_size), (compressed_data, file_efficiency) in zip(files, compressed_files):
+        stored[name] = writer.add_file(name, compressed_data, original_size)
+        efficiency += file_efficiency
+    return stored, efficiency
 
-    # Append each file name to the folder line string
-    for file in folder_content:
-        folder_line_str += file + ","
-    return folder_line_str.encode()
 
+def compress_solid_file(file_path: str, lengths: List[int], table_offset: int) -> Tuple[bytes, int]:
+    """
+    Compress one file of a folder with a huffman code that is shared by a few files.
+    This is a module function so it can be sent to the processes of a pool.
+
+    Args:
+        file_path (str): The path to the file.
+        lengths (List[int]): The code length of each byte value.
+        table_offset (int): Where the code table is in the folder archive.
 
-def compress_folder_only_files(folder_path: str, compress_method: str, repeat_size: int = 1)\
-        -> Tuple[bytes, bytes, int]:
+    Returns:
+        Tuple[bytes, int]: The compressed file with its header, and the compression efficiency.
     """
-    Compresses only the files in the given folder using the specified compression method.
+    comp: Compressor = Compressor(file_path, "HUF")
+    compressed_data: bytes = comp.compress_huf_solid(lengths, table_offset)
+    return compressed_data, comp.get_efficiency()
+
+
+def add_solid_files(writer: ArchiveWriter, files: List[Tuple[str, str, int]], jobs: int = 1) \
+        -> Tuple[Dict[str, ArchiveEntry], int]:
+    """
+    Huffman coding of the small files with one canonical code for each type of file. The code is built from the
+    chars of all the files of the type together and its code lengths are written once, so a small file does not
+    spend more on its header than it saves, and no tree is built for each file.
+    The files bigger than SOLID_MAX_FILE_SIZE get their own code.
+
+    Args:
+        writer (ArchiveWriter): The writer of the archive.
+        files (List[Tuple[str, str, int]]): The path inside the archive, the path and the size of each file.
+        jobs (int, optional): The number of processes, 0 for one for each core.
+
+    Returns:
+        Tuple[Dict[str, ArchiveEntry], int]: The entry of each file by its path inside the archive,
+            and the compression efficiency of all the files.
+    """
+    stored, efficiency = add_compressed_files(writer, [file for file in files if file[2] > SOLID_MAX_FILE_SIZE],
+                                              "HUF", jobs=jobs)
+    groups: Dict[str, List[Tuple[str, str, int]]] = dict()
+    for file in files:
+        if file[2] <= SOLID_MAX_FILE_SIZE:
+            groups.setdefault(file_type_of(file[1]), []).append(file)
+
+    solid_files: List[Tuple[str, str, int]] = []
+    tasks: List[Tuple[str, List[int], int]] = []
+    for group in groups.values():
+        # Count the chars of all the files of the type together
+        counter: ByteCounter = ByteCounter()
+        for _, file_path, _ in group:
+            with open(file_path, 'rb') as file:
+                counter.update(file.read())
+        lengths: List[int] = [0] * 256
+        if counter.size > 0:
+            lengths = code_lengths(Compressor.huf_tree(counter.sorted_chars())[0])
+        code_table: bytes = encode_code_lengths(lengths) + b'\r\n'
+        # A code table that is already in the archive is shared, it takes no more space
+        if not writer.has_code_table(code_table):
+            efficiency -= len(code_table)
+        table_offset: int = writer.add_code_table(code_table)
+        solid_files += group
+        tasks += [(file_path, lengths, table_offset) for _, file_path, _ in group]
+
+    for (name, _, original_size), (compressed_data, file_efficiency) in zip(
+            solid_files, ordered_map(compress_solid_file, tasks, jobs)):
+        stored[name] = writer.add_file(name, compressed_data, original_size)
+        efficiency += file_efficiency
+    return stored, efficiency
+
+
+def add_chunked_files(writer: ArchiveWriter, files: List[Tuple[str, str, int]], compress_method: str,
+                      repeat_size: int = 1, jobs: int = 1, chunking_stats: Optional[ChunkingStats] = None) \
+        -> Tuple[Dict[str, ArchiveEntry], int]:
+    """
+    Cut the files into content-defined chunks and write each distinct chunk to the archive once, compressed alone,
+    then add each file as the list of its chunks. The files are cut and hashed on a pool of processes first,
+    so only the distinct chunks are compressed, on the pool too.
 
     Args:
-        folder_path (str): The path to the folder containing the files to compress.
-        compress_method (str): The compression method to use.
+        writer (ArchiveWriter): The writer of the archive.
+        files (List[Tuple[str, str, int]]): The path inside the archive, the path and the size of each file.
+        compress_method (str): The compression method of the chunks (e.g., "RLE").
         repeat_size (int, optional): The repeat size for compression. Defaults to 1.
+        jobs (int, optional): The number of processes, 0 for one for each core.
+        chunking_stats (Optional[ChunkingStats], optional): Counts the size of the files, the size of their distinct
+            chunks and how long cutting them took. Defaults to None.
 
     Returns:
-        Tuple[bytes, bytes]: A tuple containing the header information and the compressed data without header.
+        Tuple[Dict[str, ArchiveEntry], int]: The entry of each file by its path inside the archive,
+            and the compression efficiency of all the files.
     """
+    start_time: float = time.perf_counter()
+    files_chunks: List[List[Tuple[bytes, int, int]]] = list(
+        ordered_map(hash_chunks, [(file_path,) for _, file_path, _ in files], jobs))
+    if chunking_stats is not None:
+        # The size of each distinct chunk, a chunk that is in a few files is counted once
+        distinct_sizes: Dict[bytes, int] = {chunk[0]: chunk[2] for chunks in files_chunks for chunk in chunks}
+        chunking_stats.add(sum(chunk[2] for chunks in files_chunks for chunk in chunks), sum(distinct_sizes.values()),
+                           time.perf_counter() - start_time)
+    # Where each distinct chunk is found first
+    new_chunks: Dict[bytes, Tuple[str, int, int]] = dict()
+    for (_, file_path, _), chunks in zip(files, files_chunks):
+        for chunk_hash, start, size in chunks:
+            if chunk_hash not in new_chunks and not writer.has_chunk(chunk_hash):
+                new_chunks[chunk_hash] = (file_path, start, size)
+
     efficiency: int = 0
-    only_files_lst: List[str] = [file for file in os.listdir(folder_path)
-                                 if os.path.isfile(os.path.join(folder_path, file))]
-    if compress_method == "HUF":
-        helper_lst: List[str] = []
-        for file in only_files_lst:
-            if os.path.getsize(os.path.join(folder_path, file)) > 3 * 10 ** 6 and compress_method == "HUF":
-                continue
-            if (os.path.getsize(os.path.join(folder_path, file)) > 4 * 10 ** 5 / repeat_size
-                    and compress_method == "RLE"):
-                continue
-            if os.path.getsize(os.path.join(folder_path, file)) == 0 and compress_method == "HUF":
-                continue
-            helper_lst.append(file)
-        only_files_lst = helper_lst
-
-    for i in range(len(only_files_lst)):
-        only_files_lst[i] = only_files_lst[i].split("/")[-1]
-
-    files_and_sizes_lst: List[str] = []
-    folder_compress_data_no_header: bytes = b''
-
-    for file in only_files_lst:
-        try:
-            comp = Compressor(f"{folder_path}/{file}", compress_method)
-        except Exception as e:
-            # If there's an error compressing the file, append the filename and the error message to the list
-            files_and_sizes_lst.append(f'{file}({e})')
-            files_and_sizes_lst.append("-1")
-            break
+    compressed_chunks: Iterator[bytes] = ordered_map(
+        compress_chunk, [(file_path, start, size, compress_method, repeat_size)
+                         for file_path, start, size in new_chunks.values()], jobs)
+    for (chunk_hash, (_, _, size)), compressed_data in zip(new_chunks.items(), compressed_chunks):
+        writer.add_chunk(chunk_hash, compressed_data, size)
+        efficiency -= len(compressed_data)
+
+    stored: Dict[str, ArchiveEntry] = dict()
+    for (name, file_path, original_size), chunks in zip(files, files_chunks):
+        stored[name] = writer.add_chunked_file(name, file_type_of(file_path), [chunk[0] for chunk in chunks],
+                                               original_size)
+        efficiency += original_size - stored[name].compressed_size
+    return stored, efficiency
+
+
+def list_folder(folder_path: str, folder_name: str, folders: List[str], files: List[Tuple[str, str, int]]) -> None:
+    """
+    Lists a folder and everything inside it recursively.
 
-        if compress_method == "RLE":
-            folder_compress_data_no_header += comp.compress_rle(repeat_size)
-            efficiency += comp.get_efficiency()
+    Args:
+        folder_path (str): The path to the folder.
+        folder_name (str): The path of the folder inside the archive.
+        folders (List[str]): The list to append the path inside the archive of each folder to.
+        files (List[Tuple[str, str, int]]): The list to append the path inside the archive, the path and the size
+            of each file to.
+    """
+    folders.append(folder_name)
+    for name in os.listdir(folder_path):
+        path: str = f'{folder_path}/{name}'
+        if os.path.isfile(path):
+            files.append((f'{folder_name}/{name}', path, os.path.getsize(path)))
+        elif os.path.isdir(path):
+            list_folder(path, f'{folder_name}/{name}', folders, files)
 
-        if compress_method == "HUF":
-            folder_compress_data_no_header += comp.compress_huf()
-            efficiency += comp.get_efficiency()
 
-        # Append the filename and its size to the list
-        files_and_sizes_lst.append(file)
-        files_and_sizes_lst.append(str(comp.get_size()))
+def create_folder(folder: str) -> None:
+    """
+      Create a folder if it does not exist.
+
+      Args:
+          folder (str): The path of the folder to create.
+
+      Returns:
+          None
+      """
+    if not os.path.isdir(folder):
+        os.mkdir(folder)
+
+
+def check_path(path: str) -> str:
+    """
+    Check if the given path is a file, a folder, or if it doesn't exist.
+
+    Args:
+        path (str): The path to check.
 
-    # Generate the header information for the compressed folder
-    return line_of_files_in_folder(folder_path, files_and_sizes_lst), folder_compress_data_no_header, efficiency
+    Returns:
+        str: A string indicating the type of the path ("path is file", "path is folder", or "path doesn't exist").
+    """
+    if os.path.isdir(path):
+        return "path is folder"
+
+    if os.path.isfile(path):
+        return "path is file"
+
+    return "path doesnt exists"
 
 
 def write_binary_file(compressed_bytes: bytes, path: str) -> None:
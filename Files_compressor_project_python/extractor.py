@@ -1,71 +1,98 @@
+import functools
+import io
+import mmap
 import os
-from typing import List, Tuple, Union, Dict, Any, Optional
+import re
+import shutil
+from typing import List, Tuple, Union, Dict, Any, Optional, BinaryIO, Iterator, Sequence
 from treenode import TreeNode
-from bitstring import bitarray
-
-KILO = 1000
-
-
-def main_extractor(path: str, new_name: str = "new") -> Union[str, None]:
+from huffman import HuffmanDecoder, canonical_tree, decode_code_lengths, BLOCK_INDEX_DIGITS
+from parallel import ordered_map
+from rle import RleDecoder, decode_blocks, decode_varints, parse_sizes, unpack_bits
+from archive import ArchiveEntry, read_toc_buffer, ARCHIVE_START, CHUNKED_METHOD, CHUNK_REF, SOLID_METHOD, \
+    CODE_TABLE_MAX_SIZE
+
+READ_SIZE = 2 ** 16
+# How many decoders of shared huffman codes are kept, with the lookup tables they already built
+SHARED_DECODERS = 16
+MAX_LINE_SIZE = 2 ** 16
+# The first line of a compressed file starts with one of these formats:
+# RLE - run-length encoding, RLV - run-length encoding with the numbers of repeats as varints,
+# HUF - huffman with the whole tree in the header,
+# HUC - huffman with canonical code lengths in the header, HUB - huffman in blocks with a code for each block,
+# PKB - run-length encoding of runs and literal spans (PackBits), STO - the data as it is
+FILE_METHODS = [b'RLE', b'RLV', b'HUF', b'HUC', b'HUB', b'PKB', b'STO']
+# A name in the header line of a compressed folder and the separator after it
+FOLDER_HEADER_TOKEN = re.compile(r'([^\[\],]*)([\[\],])')
+
+
+def main_extractor(path: str, new_name: str = "new", jobs: int = 1) -> Union[str, None]:
     """
     Main function for extracting compressed files.
+    A compressed file is extracted one chunk at a time straight into the new file.
 
     Args:
         path (str): The path to the compressed file.
         new_name (str, optional): The new name for the extracted file. Defaults to "_".
+        jobs (int, optional): The number of processes for files in blocks or for the files of a folder,
+            0 for one for each core.
 
     Returns:
         Union[str, None]: Error message if extraction fails, None otherwise.
     """
-    original_data: Union[bytes, str]
-
     # Check if the provided path is a file
     path_type: str = check_path(path)
     if path_type != "path is file":
         return "path must be file"
 
     try:
-        # Read the binary data from the compressed file
-        file_data: bytes = read_binary_file(path)
+        # Read only the beginning of the compressed file to find its format
+        with open(path, 'rb') as compressed_file:
+            file_start: bytes = compressed_file.read(4)
     except Exception as e:
         return f"{path} has {e}"
-    if len(file_data) <= 3:
+    if len(file_start) <= 3:
         return f"{path} not in compressed format"
     path = path.replace("\\", "/")
+    # Extract a folder archive next to it, each entry is found in its table of contents
+    if file_start == ARCHIVE_START[:4]:
+        return extract_archive(path, jobs=jobs)
+
     # Extract compressed data based on the compression method
-    if file_data[:3] in [b'RLE', b'HUF'] and file_data[3] != 91:
+    if file_start[:3] in FILE_METHODS and file_start[3] != 91:
         new_file_path: str
 
         # Check the format of the compressed file
-        if extractor_format_check(path) != "":
-            return extractor_format_check(path)
+        format_problem: str = extractor_format_check(path)
+        if format_problem != "":
+            return format_problem
 
         # Determine the compression method and create a new file name
-        extract_method: str = file_data.split(b'\r\n')[0].decode()
+        with open(path, 'rb') as compressed_file:
+            extract_method: str = SectionReader(compressed_file).read_line().decode()
         new_file_name: str = f'{new_name}.{extract_method[4:]}'
 
-        # Extract the data and write it to a new file
-        original_data = extractor(file_data)
-        if isinstance(original_data, str):
-            return original_data
         path_lst: List[str] = path.split("/")
         if len(path_lst) == 1:
             new_file_path = new_file_name
         else:
             new_file_path = "/".join(path_lst[:-1]) + "/" + new_file_name
 
-        write_binary_file(original_data, new_file_path, "")
-        return None
+        # Extract the data and write it to a new file
+        return extract_to_file(path, new_file_path, jobs)
 
-    elif file_data.find(b'[') and file_data.find(b']'):
-        # Extract folder data
-        extract_folder(file_data)
-    return None
+    try:
+        # Extract folder data, the compressed files are read straight from the compressed folder
+        return extract_folder(path, jobs)
+    except (ValueError, UnicodeDecodeError) as e:
+        return f"{path} not in compressed format: {e}"
+    except Exception as e:
+        return f"{path} has {e}"
 
 
 def extractor_format_check(file_name: str) -> str:
     """
-    Checks the format of the compressed file.
+    Checks the format of the compressed file, only its first line is read.
 
     Args:
         file_name (str): The name of the compressed file.
@@ -81,30 +108,711 @@ def extractor_format_check(file_name: str) -> str:
     if not os.path.exists(file_name):
         return "the file path doesnt exists"
 
-    # Attempt to read the compressed file data
+    # Attempt to read the first line of the compressed file, it must be followed by more lines
     try:
-        compressed_file_data: bytes = read_binary_file(file_name)
+        with open(file_name, 'rb') as compressed_file:
+            first_line: bytes = SectionReader(compressed_file).read_line()
+    except ValueError:
+        return f"{file_name} is not in a compressed format"
     except Exception as e:
         return f"there is a problem with {file_name}: {e}"
 
-    # Split the compressed file data by line breaks
-    format_len: int = len(compressed_file_data.split(b'\r\n'))
-
-    # Check if the file has at least two lines (header and compressed data)
-    if format_len < 2:
-        return f"{file_name} is not in a compressed format"
-
     # Attempt to decode the compression method from the header
     try:
-        compressed_file_data.split(b'\r\n')[0].decode()
+        first_line.decode()
     except UnicodeDecodeError:
         return f"{file_name} is not in a compressed format"
-    except SyntaxError:
-        return f"{file_name} is not in a compressed format"
 
     return ""
 
 
+def extract_to_file(path: str, new_file_path: str, jobs: int = 1) -> Union[str, None]:
+    """
+    Extracts a compressed file into a new file, one chunk at a time,
+    so the memory used does not depend on the size of the file.
+
+    Args:
+        path (str): The path to the compressed file.
+        new_file_path (str): The path of the new extracted file.
+        jobs (int, optional): The number of processes for files in blocks, 0 for one for each core.
+
+    Returns:
+        Union[str, None]: Error message if extraction fails, None otherwise.
+    """
+    with open(path, 'rb') as compressed_file:
+        return extract_section_to_file(compressed_file, new_file_path, jobs=jobs)
+
+
+def extract_section_to_file(compressed_file: BinaryIO, new_file_path: str, end: Optional[int] = None,
+                            jobs: int = 1) -> Union[str, None]:
+    """
+    Extracts the compressed data at the current position of an open file into a new file, one chunk at a time.
+
+    Args:
+        compressed_file (BinaryIO): An open file, the compressed data starts at its current position.
+        new_file_path (str): The path of the new extracted file.
+        end (Optional[int]): Where the compressed data ends in the file. Defaults to the end of the file.
+        jobs (int, optional): The number of processes for files in blocks, 0 for one for each core.
+
+    Returns:
+        Union[str, None]: Error message if extraction fails, None otherwise.
+    """
+    try:
+        with open(new_file_path, 'wb') as new_file:
+            for original_chunk in iter_extract(compressed_file, end, jobs):
+                new_file.write(original_chunk)
+    except (ValueError, IndexError, UnicodeDecodeError, AttributeError) as e:
+        # Dont leave half of a file behind
+        os.remove(new_file_path)
+        return f"file is not in a compressed format: {e}"
+    return None
+
+
+def extract_archive(path: str, folder: Optional[str] = None, jobs: int = 1) -> Union[str, None]:
+    """
+    Extracts a folder archive. The table of contents is read from the end of the archive,
+    and each file is extracted straight from where its data starts, so the time depends only on
+    the number of entries and the size of the data.
+    All the folders are created first, then the files are extracted on a pool of processes, the biggest first.
+    Files that share their data with another file are copied from it after it is extracted.
+
+    Args:
+        path (str): The path to the folder archive.
+        folder (Optional[str], optional): Where to extract the archive. Defaults to the folder of the archive.
+        jobs (int, optional): The number of processes, 0 for one for each core.
+
+    Returns:
+        Union[str, None]: Error message if extraction fails, None otherwise.
+    """
+    if folder is None:
+        folder = os.path.dirname(path)
+    try:
+        with ArchiveReader(path) as reader:
+            entries: List[ArchiveEntry] = reader.entries
+    except (ValueError, UnicodeDecodeError) as e:
+        return f"{path} not in compressed format: {e}"
+
+    # A folder is always before the entries inside it
+    for entry in entries:
+        if entry.is_folder:
+            os.makedirs(os.path.join(folder, entry.name), exist_ok=True)
+    # Files with the same content share their data, it is extracted once and copied to the other files
+    files: List[ArchiveEntry] = []
+    copies: List[Tuple[ArchiveEntry, ArchiveEntry]] = []
+    first_by_data: Dict[Tuple[int, int], ArchiveEntry] = dict()
+    for entry in entries:
+        if not entry.is_folder:
+            first: ArchiveEntry = first_by_data.setdefault((entry.offset, entry.compressed_size), entry)
+            if first is entry:
+                files.append(entry)
+            else:
+                copies.append((entry, first))
+    files.sort(key=lambda entry: -entry.compressed_size)
+    problems: Iterator[Union[str, None]] = ordered_map(
+        extract_archive_file, [(path, entry.offset, entry.end, os.path.join(folder, entry.name)) for entry in files],
+        jobs)
+    for entry, problem in zip(files, problems):
+        if problem is not None:
+            return f"{entry.name}: {problem}"
+    for entry, first in copies:
+        shutil.copyfile(os.path.join(folder, first.name), os.path.join(folder, entry.name))
+    return None
+
+
+def extract_archive_file(path: str, start: int, end: int, new_file_path: str) -> Union[str, None]:
+    """
+    Extracts one file of a folder archive or of a compressed folder into a new file.
+    This is a module function so it can be sent to the processes of a pool, the archive is opened in each call.
+
+    Args:
+        path (str): The path to the folder archive or to the compressed folder.
+        start (int): Where the compressed data of the file starts in the archive.
+        end (int): Where the compressed data of the file ends in the archive.
+        new_file_path (str): The path of the new extracted file.
+
+    Returns:
+        Union[str, None]: Error message if extraction fails, None otherwise.
+    """
+    with open(path, 'rb') as archive_file:
+        archive_file.seek(start)
+        # The files are already extracted in parallel
+        return extract_section_to_file(archive_file, new_file_path, end, 1)
+
+
+class ArchiveReader:
+    """
+    Reads a folder archive one entry at a time, only the entries that are asked for are extracted.
+    The archive is mapped to memory, so only the table of contents and the data of these entries are read from disk.
+
+    Example:
+        with ArchiveReader("tree_HUF.txt") as reader:
+            config: bytes = reader.read("tree/config.ini")
+    """
+    def __init__(self, path: str, jobs: int = 1) -> None:
+        """
+        A constructor for an ArchiveReader object, the table of contents is read right away.
+        :param path: The path to the folder archive.
+        :param jobs: The number of processes for files in blocks, 0 for one for each core.
+        """
+        self.__file: BinaryIO = open(path, 'rb')
+        try:
+            self.__map: mmap.mmap = mmap.mmap(self.__file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # An empty file cant be mapped
+            self.__file.close()
+            raise ValueError("the archive is too short")
+        try:
+            self.__entries: List[ArchiveEntry] = read_toc_buffer(self.__map)
+        except (ValueError, UnicodeDecodeError):
+            self.close()
+            raise
+        self.__entries_by_name: Dict[str, ArchiveEntry] = {entry.name: entry for entry in self.__entries}
+        self.__jobs: int = jobs
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def entries(self) -> List[ArchiveEntry]:
+        return self.__entries
+
+    def names(self) -> List[str]:
+        """
+        :return: the names of all the entries, files and folders, in the order they were added
+        """
+        return [entry.name for entry in self.__entries]
+
+    def entry(self, name: str) -> ArchiveEntry:
+        """
+        Find an entry by its name.
+
+        Args:
+            name (str): The path of the entry inside the archive.
+
+        Returns:
+            ArchiveEntry: The entry, with its method and sizes.
+        """
+        if name not in self.__entries_by_name:
+            raise KeyError(f"{name} is not in the archive")
+        return self.__entries_by_name[name]
+
+    def iter_read(self, name: str) -> Iterator[bytes]:
+        """
+        Extracts a file of the archive one chunk at a time.
+
+        Args:
+            name (str): The path of the file inside the archive.
+
+        Returns:
+            Iterator[bytes]: The chunks of the original file.
+        """
+        entry: ArchiveEntry = self.entry(name)
+        if entry.is_folder:
+            raise IsADirectoryError(f"{name} is a folder")
+        # The decoder reads from the current position, each chunk it reads seeks to its own place first
+        self.__map.seek(entry.offset)
+        yield from iter_extract(self.__map, entry.end, self.__jobs)
+
+    def read(self, name: str) -> bytes:
+        """
+        Extracts a file of the archive.
+
+        Args:
+            name (str): The path of the file inside the archive.
+
+        Returns:
+            bytes: The original file.
+        """
+        return b''.join(self.iter_read(name))
+
+    def extract(self, name: str, new_file_path: str) -> Union[str, None]:
+        """
+        Extracts a file of the archive into a new file, one chunk at a time.
+
+        Args:
+            name (str): The path of the file inside the archive.
+            new_file_path (str): The path of the new extracted file.
+
+        Returns:
+            Union[str, None]: Error message if extraction fails, None otherwise.
+        """
+        entry: ArchiveEntry = self.entry(name)
+        self.__map.seek(entry.offset)
+        return extract_section_to_file(self.__map, new_file_path, entry.end, self.__jobs)
+
+    def close(self) -> None:
+        """ unmap and close the archive """
+        self.__map.close()
+        self.__file.close()
+
+
+class SectionReader:
+    """
+    Reads a section of an open binary file through its own buffer.
+    Each reader keeps its own position, so a few readers can read different parts of the same file.
+    """
+    def __init__(self, file: BinaryIO, start: Optional[int] = None, end: Optional[int] = None,
+                 buffer_size: int = READ_SIZE) -> None:
+        """
+        A constructor for a SectionReader object.
+        :param file: An open binary file that supports seek.
+        :param start: Where the section starts. Defaults to the current position of the file.
+        :param end: Where the section ends. Defaults to the end of the file.
+        :param buffer_size: How many bytes to read from the file each time.
+        """
+        if start is None:
+            start = file.tell()
+        if end is None:
+            end = file.seek(0, os.SEEK_END)
+        self.__file: BinaryIO = file
+        self.__start: int = start
+        self.__end: int = end
+        self.__buffer_size: int = buffer_size
+        self.__buffer: bytes = b''
+        self.__offset: int = 0  # where the unread bytes start inside the buffer
+        self.__file_position: int = start  # where the buffer ends inside the file
+
+    @property
+    def position(self) -> int:
+        return self.__file_position - (len(self.__buffer) - self.__offset)
+
+    @property
+    def file(self) -> BinaryIO:
+        return self.__file
+
+    @property
+    def start(self) -> int:
+        return self.__start
+
+    @property
+    def end(self) -> int:
+        return self.__end
+
+    def remaining(self) -> int:
+        """
+        :return: how many bytes are left until the end of the section
+        """
+        return self.__end - self.position
+
+    def __fill(self, size: int) -> bool:
+        """
+        Read more bytes from the file into the buffer.
+
+        Args:
+            size (int): The minimum amount of bytes to read.
+
+        Returns:
+            bool: False if the section has no more bytes.
+        """
+        self.__file.seek(self.__file_position)
+        new_bytes: bytes = self.__file.read(min(max(size, self.__buffer_size), self.__end - self.__file_position))
+        self.__buffer = self.__buffer[self.__offset:] + new_bytes
+        self.__offset = 0
+        self.__file_position += len(new_bytes)
+        return len(new_bytes) > 0
+
+    def read(self, size: int = -1) -> bytes:
+        """
+        Read bytes from the section.
+
+        Args:
+            size (int, optional): How many bytes to read. Defaults to all the bytes left.
+
+        Returns:
+            bytes: The bytes that were read, fewer than size at the end of the section.
+        """
+        if size < 0:
+            size = self.remaining()
+        available: int = len(self.__buffer) - self.__offset
+        if available < size:
+            self.__fill(size - available)
+        data: bytes = self.__buffer[self.__offset: self.__offset + size]
+        self.__offset += len(data)
+        return data
+
+    def read_line(self, max_size: int = MAX_LINE_SIZE) -> bytes:
+        """
+        Read one line of the section, lines end with b'\\r\\n'.
+
+        Args:
+            max_size (int, optional): The longest line that can be read. Defaults to MAX_LINE_SIZE.
+
+        Returns:
+            bytes: The line without the b'\\r\\n'.
+        """
+        line_end: int = self.__buffer.find(b'\r\n', self.__offset)
+        while line_end == -1:
+            if len(self.__buffer) - self.__offset > max_size:
+                raise ValueError("line is too long")
+            if not self.__fill(self.__buffer_size):
+                raise ValueError("missing line end")
+            line_end = self.__buffer.find(b'\r\n', self.__offset)
+        line: bytes = self.__buffer[self.__offset: line_end]
+        self.__offset = line_end + 2
+        return line
+
+    def skip_line(self) -> int:
+        """
+        Skip a line of any length without keeping it in memory.
+
+        Returns:
+            int: The position in the file where the line ends, before the b'\\r\\n'.
+        """
+        line_end: int = self.__buffer.find(b'\r\n', self.__offset)
+        while line_end == -1:
+            # Keep the last byte, it may be the b'\\r' of the line end
+            self.__offset = max(self.__offset, len(self.__buffer) - 1)
+            if not self.__fill(self.__buffer_size):
+                raise ValueError("missing line end")
+            line_end = self.__buffer.find(b'\r\n', self.__offset)
+        self.__offset = line_end + 2
+        return self.position - 2
+
+
+def iter_extract(compressed_file: BinaryIO, end: Optional[int] = None, jobs: int = 1) \
+        -> Iterator[bytes]:
+    """
+    Extracts compressed data one chunk at a time.
+
+    Args:
+        compressed_file (BinaryIO): An open compressed file, the compressed data starts at its current position.
+        end (Optional[int]): Where the compressed data ends in the file. Defaults to the end of the file.
+        jobs (int): The number of processes for data in blocks, 0 for one for each core.
+
+    Returns:
+        Iterator[bytes]: The chunks of the original data.
+    """
+    reader: SectionReader = SectionReader(compressed_file, end=end)
+    extract_method: bytes = reader.read_line()[:3]
+    if extract_method == b'RLE':
+        yield from iter_extract_rle(reader)
+    elif extract_method == b'RLV':
+        yield from iter_extract_rlv(reader)
+    elif extract_method in [b'HUF', b'HUC']:
+        yield from iter_extract_huf(reader, extract_method)
+    elif extract_method == b'HUB':
+        yield from iter_extract_hub(reader, jobs)
+    elif extract_method == b'PKB':
+        yield from iter_extract_pkb(reader)
+    elif extract_method == b'STO':
+        yield from iter_extract_sto(reader)
+    elif extract_method == CHUNKED_METHOD:
+        yield from iter_extract_chunks(reader, jobs)
+    elif extract_method == SOLID_METHOD:
+        yield from iter_extract_hus(reader)
+    else:
+        raise ValueError("unknown compression method")
+
+
+def iter_extract_rle(reader: SectionReader) -> Iterator[bytes]:
+    """
+    Extracts RLE compressed data one chunk at a time.
+    The sizes line and the data after it are read at the same time by two readers, so none of them is kept whole.
+
+    Args:
+        reader (SectionReader): A reader of the compressed data, right after the first line.
+
+    Returns:
+        Iterator[bytes]: The chunks of the original data.
+    """
+    # second line is the repeat size
+    repeat_size: int = int(reader.read_line().decode())
+    if repeat_size < 1:
+        raise ValueError("wrong repeat size")
+    # third line is the sizes list, the data starts after it
+    sizes_start: int = reader.position
+    sizes_end: int = reader.skip_line()
+    if sizes_end == sizes_start:
+        return
+    sizes_reader: SectionReader = SectionReader(reader.file, sizes_start, sizes_end)
+
+    # Each batch of sizes is expanded with the chunks it needs, the chunks are read right after the sizes line
+    decoder: RleDecoder = RleDecoder(repeat_size)
+    for sizes in iter_rle_sizes(sizes_reader):
+        yield decoder.decode(sizes, reader.read)
+
+
+def iter_extract_rlv(reader: SectionReader) -> Iterator[bytes]:
+    """
+    Extracts RLV compressed data one chunk at a time.
+    The table of the numbers of repeats and the data after it are read at the same time by two readers.
+
+    Args:
+        reader (SectionReader): A reader of the compressed data, right after the first line.
+
+    Returns:
+        Iterator[bytes]: The chunks of the original data.
+    """
+    # second line is the repeat size, the block size and the size of the runs table
+    repeat_size, block_size, table_size = [int(size) for size in reader.read_line().split(b',')]
+    table_start: int = reader.position
+    if table_size < 0 or table_start + table_size > reader.end:
+        raise ValueError("wrong runs table size")
+    table_reader: SectionReader = SectionReader(reader.file, table_start, table_start + table_size)
+    data_reader: SectionReader = SectionReader(reader.file, table_start + table_size, reader.end)
+
+    decoder: RleDecoder = RleDecoder(repeat_size, block_size=block_size)
+    rest: bytes = b''
+    while table_reader.remaining() > 0:
+        varints: bytes = rest + table_reader.read(READ_SIZE)
+        # The last varint may continue in the next read
+        sizes, used = decode_varints(varints)
+        rest = varints[used:]
+        yield decoder.decode(sizes, data_reader.read)
+    if rest != b'':
+        raise ValueError("the runs table ends in the middle of a number")
+
+
+def iter_extract_pkb(reader: SectionReader) -> Iterator[bytes]:
+    """
+    Extracts PKB compressed data one chunk at a time.
+
+    Args:
+        reader (SectionReader): A reader of the compressed data, right after the first line.
+
+    Returns:
+        Iterator[bytes]: The chunks of the original data.
+    """
+    # second line is the original size
+    original_size: int = int(reader.read_line().decode())
+    extracted_size: int = 0
+    rest: bytes = b''
+    while reader.remaining() > 0:
+        packed: bytes = rest + reader.read(READ_SIZE)
+        # The last literal span or run may continue in the next read
+        original_data, used = unpack_bits(packed)
+        rest = packed[used:]
+        extracted_size += len(original_data)
+        yield original_data
+    if rest != b'':
+        raise ValueError("the data ends in the middle of a run")
+    if extracted_size != original_size:
+        raise ValueError("wrong original size")
+
+
+def iter_extract_sto(reader: SectionReader) -> Iterator[bytes]:
+    """
+    Extracts stored data one chunk at a time, the data is the original data.
+
+    Args:
+        reader (SectionReader): A reader of the compressed data, right after the first line.
+
+    Returns:
+        Iterator[bytes]: The chunks of the original data.
+    """
+    # second line is the original size
+    original_size: int = int(reader.read_line().decode())
+    if reader.remaining() != original_size:
+        raise ValueError("wrong original size")
+    while reader.remaining() > 0:
+        yield reader.read(READ_SIZE)
+
+
+def iter_extract_chunks(reader: SectionReader, jobs: int = 1) -> Iterator[bytes]:
+    """
+    Extracts a file of a folder archive that is cut into chunks, each chunk is extracted from where its compressed
+    data is in the archive, in the order of the chunks table.
+
+    Args:
+        reader (SectionReader): A reader of the compressed file in the archive, after the first line.
+        jobs (int): The number of processes for chunks in blocks, 0 for one for each core.
+
+    Returns:
+        Iterator[bytes]: The chunks of the original data.
+    """
+    original_size, chunks_amount = [int(number) for number in reader.read_line().split(b',')]
+    chunks_table: bytes = reader.read(chunks_amount * CHUNK_REF.size)
+    if len(chunks_table) != chunks_amount * CHUNK_REF.size or reader.remaining() != 0:
+        raise ValueError("wrong chunks table")
+    chunk_refs: List[Tuple[int, int, int, bytes]] = list(CHUNK_REF.iter_unpack(chunks_table))
+    if sum(chunk_ref[2] for chunk_ref in chunk_refs) != original_size:
+        raise ValueError("wrong original size")
+
+    for offset, compressed_size, chunk_size, _ in chunk_refs:
+        # The chunks are written before the files with them, so a chunk never points back to this file
+        if offset + compressed_size > reader.start:
+            raise ValueError("a chunk is outside the archive")
+        reader.file.seek(offset)
+        extracted_size: int = 0
+        for original_chunk in iter_extract(reader.file, offset + compressed_size, jobs):
+            extracted_size += len(original_chunk)
+            yield original_chunk
+        if extracted_size != chunk_size:
+            raise ValueError("wrong chunk size")
+
+
+def iter_rle_sizes(sizes_reader: SectionReader) -> Iterator[Sequence[int]]:
+    """
+    Reads the sizes line of an RLE file a batch of numbers at a time.
+
+    Args:
+        sizes_reader (SectionReader): A reader of the sizes line, without the line end.
+
+    Returns:
+        Iterator[Sequence[int]]: The number of repeats of each chunk.
+    """
+    rest: bytes = b''
+    while sizes_reader.remaining() > 0:
+        sizes_text: bytes = rest + sizes_reader.read(READ_SIZE)
+        # The last number may continue in the next read
+        last_comma: int = sizes_text.rfind(b',')
+        rest = sizes_text[last_comma + 1:]
+        if last_comma != -1:
+            yield parse_sizes(sizes_text[:last_comma])
+    yield parse_sizes(rest)
+
+
+def iter_extract_huf(reader: SectionReader, extract_method: bytes) -> Iterator[bytes]:
+    """
+    Extracts Huffman compressed data one chunk at a time.
+
+    Args:
+        reader (SectionReader): A reader of the compressed data, right after the first line.
+        extract_method (bytes): HUF for a header with the whole tree, HUC for canonical code lengths.
+
+    Returns:
+        Iterator[bytes]: The chunks of the original data.
+    """
+    header: bytes = reader.read_line()
+    if extract_method == b'HUF':
+        head_node: Optional[TreeNode] = extract_huf_tree(header)
+        if not isinstance(head_node, TreeNode):
+            raise ValueError("missing huffman tree")
+        original_size: int = int(head_node.data)
+    else:
+        original_size, lengths = extract_head_huc(header)
+        head_node = canonical_tree(lengths)
+    if reader.remaining() == 0 and (extract_method == b'HUF' or original_size == 0):
+        return
+    yield from iter_decode_huf(reader, HuffmanDecoder(head_node), original_size)
+
+
+def iter_extract_hus(reader: SectionReader) -> Iterator[bytes]:
+    """
+    Extracts a file of a folder archive that is Huffman coded with a code that is shared by a few files,
+    the code lengths are read from where the code table is in the archive.
+
+    Args:
+        reader (SectionReader): A reader of the compressed file in the archive, right after the first line.
+
+    Returns:
+        Iterator[bytes]: The chunks of the original data.
+    """
+    original_size, table_offset = [int(number) for number in reader.read_line().split(b',')]
+    if original_size == 0 and reader.remaining() == 0:
+        return
+    # The code table is written before the files with it
+    if table_offset >= reader.start:
+        raise ValueError("the code table is outside the archive")
+    table_reader: SectionReader = SectionReader(reader.file, table_offset, reader.start, CODE_TABLE_MAX_SIZE)
+    # The files with the same code share the lookup table of the decoder, each file has its own place in the tree
+    decoder: HuffmanDecoder = shared_decoder(table_reader.read_line(CODE_TABLE_MAX_SIZE)).copy()
+    yield from iter_decode_huf(reader, decoder, original_size)
+
+
+@functools.lru_cache(maxsize=SHARED_DECODERS)
+def shared_decoder(encoded_lengths: bytes) -> HuffmanDecoder:
+    """
+    Make a decoder of a huffman code that is shared by a few files, the decoder is kept for the next files.
+
+    Args:
+        encoded_lengths (bytes): The code lengths of the code table.
+
+    Returns:
+        HuffmanDecoder: The decoder, use a copy of it for each file.
+    """
+    return HuffmanDecoder(canonical_tree(decode_code_lengths(encoded_lengths)))
+
+
+def iter_decode_huf(reader: SectionReader, decoder: HuffmanDecoder, original_size: int) -> Iterator[bytes]:
+    """
+    Decodes Huffman coded data one chunk at a time.
+
+    Args:
+        reader (SectionReader): A reader of the compressed data, right at the start of the Huffman coded data.
+        decoder (HuffmanDecoder): A decoder of the Huffman code, at the start of the data.
+        original_size (int): The size of the original data.
+
+    Returns:
+        Iterator[bytes]: The chunks of the original data.
+    """
+    if reader.remaining() < 2:
+        raise ValueError("missing huffman data")
+
+    extracted_size: int = 0
+    # The last two bytes are the last packed byte and the number of padding bits
+    packed_size: int = reader.remaining() - 2
+    while packed_size > 0:
+        packed: bytes = reader.read(min(READ_SIZE, packed_size))
+        packed_size -= len(packed)
+        original_chunk: bytearray = bytearray()
+        extracted_size += decoder.decode_into(packed, original_chunk, 0)
+        yield original_chunk
+    last_bytes: bytes = reader.read(2)
+    rest_bits: int = int(last_bytes[1:].decode())
+    original_chunk = bytearray()
+    extracted_size += decoder.decode_last_bits(last_bytes[0], 8 - rest_bits, original_chunk, 0)
+    if extracted_size != original_size:
+        raise ValueError("the data doesnt match the huffman tree")
+    yield original_chunk
+
+
+def iter_extract_hub(reader: SectionReader, jobs: int = 1) -> Iterator[bytes]:
+    """
+    Extracts data that was Huffman coded in blocks, the blocks are extracted in parallel on a pool of processes.
+
+    Args:
+        reader (SectionReader): A reader of the compressed data, right after the first line.
+        jobs (int): The number of processes, 0 for one for each core.
+
+    Returns:
+        Iterator[bytes]: The original data of each block.
+    """
+    # second line is the original size and the size of the blocks
+    original_size, block_size = [int(size) for size in reader.read_line().split(b',')]
+    if block_size < 1:
+        raise ValueError("wrong block size")
+    blocks_start: int = reader.position
+
+    # The data ends with the index of the blocks followed by the position of the index
+    index_end: int = reader.end - BLOCK_INDEX_DIGITS - 2
+    index_start: int = reader.start + int(SectionReader(reader.file, index_end + 2, reader.end).read())
+    if not blocks_start <= index_start <= index_end:
+        raise ValueError("wrong blocks index")
+    blocks_index: bytes = SectionReader(reader.file, index_start, index_end).read()
+    blocks_sizes: List[int] = [int(size) for size in blocks_index.split(b',')] if blocks_index != b'' else []
+    if sum(blocks_sizes) != index_start - blocks_start or len(blocks_sizes) != -(-original_size // block_size):
+        raise ValueError("the blocks index doesnt match the data")
+
+    def read_blocks() -> Iterator[Tuple[bytes, int]]:
+        for i in range(len(blocks_sizes)):
+            yield reader.read(blocks_sizes[i]), min(block_size, original_size - i * block_size)
+
+    yield from ordered_map(extract_huf_block, read_blocks(), jobs)
+
+
+def extract_huf_block(compressed_block: bytes, original_size: int) -> Union[bytes, str]:
+    """
+    Extracts one block of data that was Huffman coded in blocks.
+    This is a module function so it can be sent to the processes of a pool.
+
+    Args:
+        compressed_block (bytes): The code lengths of the block, b'\\r\\n', and the Huffman encoded data.
+        original_size (int): The size of the original block.
+
+    Returns:
+        Union[bytes, str]: The original data of the block.
+    """
+    line_end: int = compressed_block.find(b'\r\n')
+    if line_end == -1:
+        raise ValueError("missing code lengths")
+    head_node: TreeNode = canonical_tree(decode_code_lengths(compressed_block[:line_end]))
+    return extract_data_huf(compressed_block[line_end + 2:], head_node, original_size)
+
+
 def extractor(compressed_data: bytes) -> Union[bytes, str]:
     """
     Extracts the original data from compressed bytes.
@@ -143,17 +851,11 @@ def extractor(compressed_data: bytes) -> Union[bytes, str]:
 
             if repeat_size < 1 or repeat_size % 1 != 0:
                 return "wrong repeat size"
-            one_kb: bytes = b''
-            if isinstance(data[:KILO], bytes):
-                one_kb = data[:KILO]
-            # Decompress one kilobyte at a time
-            while one_kb != b'':
-                new_data_to_add, sizes = extract_one_kb_rle(one_kb, repeat_size, sizes)
-                if isinstance(original_data, bytes) and isinstance(new_data_to_add, bytes):
-                    original_data += new_data_to_add
-                if isinstance(data[:KILO], bytes):
-                    data = data[KILO:]
-                    one_kb = data[:KILO]
+            # Decompress all the runs in one pass
+            try:
+                original_data = decode_blocks(data, sizes, repeat_size)
+            except ValueError as e:
+                return f"file is not in a compressed format: {e}"
     elif extract_method[:3] == "HUF":
         if data_lines[2] == b'':
             original_data = b''
@@ -163,98 +865,99 @@ def extractor(compressed_data: bytes) -> Union[bytes, str]:
                 original_data = extract_data_huf(b'\r\n'.join(data_lines[2:]), head_node)
             except Exception as e:
                 return f"file is not in a compressed format: {e}"
+    elif extract_method[:3] == "HUC":
+        try:
+            original_size, lengths = extract_head_huc(data_lines[1])
+            if original_size == 0:
+                original_data = b''
+            else:
+                original_data = extract_data_huf(b'\r\n'.join(data_lines[2:]), canonical_tree(lengths),
+                                                 original_size)
+        except Exception as e:
+            return f"file is not in a compressed format: {e}"
+    elif extract_method[:3] in ["HUB", "RLV", "PKB", "STO"]:
+        try:
+            original_data = b''.join(iter_extract(io.BytesIO(compressed_data), jobs=1))
+        except Exception as e:
+            return f"file is not in a compressed format: {e}"
 
     return original_data
 
 
-def extract_data_huf(data: bytes, head_node: Optional[TreeNode]) -> Union[bytes, str]:
-    rest_bits: int = int(bytes([data[-1]]).decode())
-    bits_str: str = bits_str_from_bytes(data[:-1])
-    bits_str = bits_str[:-rest_bits]
-    original_data: bytes = b""
-    while bits_str != "":
-        bits_str, char_to_add = read_data_from_tree(bits_str, head_node)
-        original_data += char_to_add
-
-    return original_data
-
-
-def read_data_from_tree(bits: str, head_node: Optional[TreeNode]) -> Tuple[str, bytes]:
-    char_to_add: bytes = b""
-    if isinstance(head_node, TreeNode):
-        if head_node.left is None and head_node.right is None:
-            return bits, head_node.data
-        if bits[0] == "0":
-            bits, char_to_add = read_data_from_tree(bits[1:], head_node.left)
-        elif bits[0] == "1":
-            bits, char_to_add = read_data_from_tree(bits[1:], head_node.right)
-    return bits, char_to_add
+def extract_data_huf(data: bytes, head_node: Optional[TreeNode], original_size: Optional[int] = None) \
+        -> Union[bytes, str]:
+    """
+    Decodes Huffman compressed data.
 
+    Args:
+        data (bytes): The packed bits followed by a digit with the number of padding bits.
+        head_node (Optional[TreeNode]): The root node of the Huffman tree.
+        original_size (Optional[int]): The size of the original data. Defaults to the frequency in the root node.
 
-def bits_str_from_bytes(data: bytes) -> str:
-    bits_str: str = ""
-    bits_str += bitarray.BitArray(bytes=data).bin
-    return bits_str
+    Returns:
+        Union[bytes, str]: The decoded data.
+    """
+    if not isinstance(head_node, TreeNode):
+        raise ValueError("missing huffman tree")
+    if original_size is None:
+        # The root of the tree holds the sum of all the frequencies, which is the size of the original data
+        original_size = int(head_node.data)
+    rest_bits: int = int(bytes([data[-1]]).decode())
+    original_data: bytearray = bytearray(original_size)
+    decoder: HuffmanDecoder = HuffmanDecoder(head_node)
+    data_view: memoryview = memoryview(data)
+    position: int = decoder.decode_into(data_view[:-2], original_data, 0)
+    position = decoder.decode_last_bits(data[-2], 8 - rest_bits, original_data, position)
+    if position != len(original_data):
+        raise ValueError("the data doesnt match the huffman tree")
+    return bytes(original_data)
 
 
 def extract_huf_tree(header: bytes) -> Optional[TreeNode]:
+    """
+    Builds the Huffman tree from the header of an HUF file.
+    The header has the tree nodes in pre-order: an inner node is its frequency and a leaf is its char and "l".
 
-    nodes_lst: List[bytes] = header.split(b',')
-    i: int = 0
-    while i < len(nodes_lst):
-        if nodes_lst[i] == b'l':
-            nodes_lst[i] = b',l'
-        if nodes_lst[i] == b'':
-            del nodes_lst[i]
-            i -= 1
-        i += 1
-    return recursive_extract_huf_tree(nodes_lst)[0]
-
+    Args:
+        header (bytes): The second line of the compressed file.
 
-def recursive_extract_huf_tree(nodes_lst: List[bytes]) -> Tuple[Union[TreeNode, None], List[bytes]]:
+    Returns:
+        Optional[TreeNode]: The root node of the Huffman tree.
 
-    data: Union[int, bytes] = nodes_lst[0]
-    nodes_lst = nodes_lst[1:]
-    if isinstance(data, bytes):
-        if len(data) > 1:
-            if data[1] == 108:
-                data = data[0:1]
-                new_node: TreeNode = TreeNode(data)
-                return new_node, nodes_lst
-    new_left_node, nodes_lst = recursive_extract_huf_tree(nodes_lst)
-    new_right_node, nodes_lst = recursive_extract_huf_tree(nodes_lst)
-    new_node = TreeNode(data, new_left_node, new_right_node)
-    return new_node, nodes_lst
+    Example:
+        extract_huf_tree(b'4,2,Al,Bl,Cl,') -> TreeNode(b'4', TreeNode(b'2', A, B), C)
+    """
+    # A "," leaf is split into an empty item and "l"
+    nodes_lst: List[bytes] = [b',l' if node == b'l' else node for node in header.split(b',') if node != b'']
+    head_node: Optional[TreeNode] = None
+    # The inner nodes that are still missing a child
+    open_nodes: List[TreeNode] = []
+    for node in nodes_lst:
+        is_leaf: bool = len(node) > 1 and node[1] == 108
+        new_node: TreeNode = TreeNode(node[0:1]) if is_leaf else TreeNode(node)
+        if len(open_nodes) == 0:
+            head_node = new_node
+        elif open_nodes[-1].left is None:
+            open_nodes[-1].left = new_node
+        else:
+            open_nodes.pop().right = new_node
+        if not is_leaf:
+            open_nodes.append(new_node)
+    return head_node
 
 
-def extract_one_kb_rle(one_kb: bytes, repeat_size: int, sizes: List[int]) -> Tuple[Union[str, bytes], List[int]]:
+def extract_head_huc(header: bytes) -> Tuple[int, List[int]]:
     """
-    Extracts and decompresses one kilobyte of data compressed using the RLE method.
+    Reads the header of an HUC file.
 
     Args:
-        one_kb (bytes): One kilobyte of compressed data.
-        repeat_size (int): The size of the repeated chunks for compression.
-        sizes (List[int]): List containing the sizes of each repeated chunk.
+        header (bytes): The second line of the compressed file, the original size and the code lengths.
 
     Returns:
-        Union[str, bytes]: The decompressed data. If an error occurs, returns a string describing the issue.
-    """
-    original_data: bytes = b''
-    kb_chunk: bytes = one_kb[:]
-    delete_sizes: int = 0
-    # Iterate through the sizes list and decompress the data
-    for i in range(len(sizes)):
-        # Extract a chunk of data from the one kilobyte block
-        chunk_to_open: bytes = kb_chunk[:repeat_size]
-        # Add the decompressed chunk to the original data
-        original_data += chunk_to_open * sizes[i]
-        # Remove the decompressed chunk from the one kilobyte block
-        kb_chunk = kb_chunk[repeat_size:]
-        delete_sizes += 1
-        if kb_chunk == b'':
-            break
-
-    return original_data, sizes[delete_sizes:]
+        Tuple[int, List[int]]: The size of the original data, the code length of each byte value.
+    """
+    size_and_lengths: List[bytes] = header.split(b',', 1)
+    return int(size_and_lengths[0].decode()), decode_code_lengths(size_and_lengths[1])
 
 
 def write_binary_file(original_bytes: bytes, new_file_name: str, folder: str) -> None:
@@ -289,101 +992,107 @@ def read_binary_file(file_name: str) -> bytes:
     return compressed_file_data
 
 
-def extract_head_rle(data_list: List[bytes]) -> Tuple[int, List[int], bytes]:
+def extract_head_rle(data_list: List[bytes]) -> Tuple[int, Sequence[int], bytes]:
     """
     :param data_list: list of the bytes of the compressed data from the compressed file
     :return: repeat size, sizes of repeats, the data from the file
     """
     # second line is the repeat size
     repeat_size: int = int(data_list[1].decode())
-    # third line is the sizes list
-    sizes_str: List[str] = (data_list[2].decode()).split(",")
-    # make the list an integers list
-    sizes: List[int] = []
-    for num in sizes_str:
-        sizes.append(int(num))
+    # third line is the sizes list, parsed into integers
+    sizes: Sequence[int] = parse_sizes(data_list[2])
     # join all the remaining data
     data: bytes = b"\r\n".join(data_list[3:])
 
     return repeat_size, sizes, data
 
 
-def extract_folder(file_data: bytes) -> None:
+def extract_folder(path: str, jobs: int = 1) -> Union[str, None]:
     """
-    Extracts a folder from compressed file data.
+    Extracts a compressed folder with a text header line, like path[file,size,sub[...]].
+    The compressed folder is mapped to memory and only the header line is read from it, the header gives
+    where each compressed file is, and each file is extracted straight from there on a pool of processes,
+    so no compressed file is copied before it is extracted.
 
     Args:
-        file_data (bytes): The compressed data containing folder information.
+        path (str): The path to the compressed folder.
+        jobs (int, optional): The number of processes, 0 for one for each core.
 
     Returns:
-        None
+        Union[str, None]: Error message if extraction fails, None otherwise.
     """
-    # Split the file data into header and content
-    data_lst: List[bytes] = file_data.split(b"\r\n")
-    header: bytes = data_lst[0]
-    content: bytes = b"\r\n".join(data_lst[1:])
-
-    # Decode the header to extract folder information
-    extract_files(header.decode(), content)
+    with open(path, 'rb') as compressed_file, \
+            mmap.mmap(compressed_file.fileno(), 0, access=mmap.ACCESS_READ) as compressed_map:
+        header_end: int = compressed_map.find(b'\r\n')
+        if header_end == -1:
+            header_end = len(compressed_map)
+        folders, files = parse_folder_header(compressed_map[:header_end].decode())
+        data_size: int = len(compressed_map) - header_end - 2
+
+    if sum([size for _, _, size in files]) > max(data_size, 0):
+        raise ValueError("the files are bigger than the compressed folder")
+    # All the folders are created before the files in them
+    for folder in folders:
+        create_folder(folder)
+    # The compressed files are one after the other right after the header line, in the order of the header
+    files_to_extract: List[Tuple[str, int, int, str]] = []
+    position: int = header_end + 2
+    for file_name, folder, size in files:
+        files_to_extract.append((path, position, position + size, f'{folder}/{file_name}'))
+        position += size
+    for (_, _, _, file_path), problem in zip(files_to_extract,
+                                             ordered_map(extract_archive_file, files_to_extract, jobs)):
+        if problem is not None:
+            return f"{file_path}: {problem}"
+    return None
 
 
-def extract_files(header: str, content: bytes, folder: str = "") -> str:
+def parse_folder_header(header: str) -> Tuple[List[str], List[Tuple[str, str, int]]]:
     """
-    Extracts files from compressed data.
+    Reads the header line of a compressed folder in one pass.
 
     Args:
-        header (str): The header containing file information.
-        content (bytes): The content containing compressed file data.
-        folder (str, optional): The folder where files will be extracted. Defaults to "".
+        header (str): The header line, like path[file,size,path/sub[file,size]].
 
     Returns:
-        Union[str, None]: Error message if encountered, None otherwise.
-    """
-    # Initialize variables
-    header_pointer: int = 0
-    files_dict: Dict[Any, Any] = dict()
-    this_folder: str = folder
-
-    # Iterate through the header to extract files and folders
-    while header != "":
-        if header[header_pointer] == "]":
-            break
-        if header[header_pointer] == "[":
-            # Extract folder name and create folder
-            folder = header.split("[")[0]
-            create_folder(folder)
-            # Recursive call to extract files within this folder
-            header = extract_files(header[header_pointer + 1:], content, folder)
-            header_pointer = -1
-        elif header[header_pointer] == ",":
-            # Extract file name
-            file_name: str = header[:header_pointer]
-            header = header[header_pointer + 1:]
-            header_pointer = 0
-            num_bytes: str = ""
-            # Extract number of bytes for the file content
-            while header[header_pointer] != "," and header[header_pointer] != "]":
-                num_bytes += header[header_pointer]
-                header_pointer += 1
-            # Store file content in dictionary
-            files_dict[file_name] = content[:int(num_bytes)]
-            content = content[int(num_bytes):]
-            if header[header_pointer] == ']':
-                header_pointer += 1
-            header = header[header_pointer + 1:]
-
-            header_pointer = -1
-        header_pointer += 1
-
-    # Extracted files dictionary contains file content
-    # Extract each file data, recursively extract files within folders
-    for file in files_dict:
-        if type(file) is str:
-            file_data: Union[bytes, str] = extractor(files_dict[file])
-            if isinstance(file_data, bytes):
-                write_binary_file(file_data, file, this_folder)
-
-    return header
+        Tuple[List[str], List[Tuple[str, str, int]]]: The folders, and the name, the folder and the compressed size
+        of each file, in the order of the header.
+
+    Example:
+        parse_folder_header("a[x,3,a/b[y,4]]") -> (['a', 'a/b'], [('x', 'a', 3), ('y', 'a/b', 4)])
+    """
+    folders: List[str] = []
+    files: List[Tuple[str, str, int]] = []
+    open_folders: List[str] = []
+    file_name: Optional[str] = None
+    header_end: int = 0
+    for token in FOLDER_HEADER_TOKEN.finditer(header):
+        text, separator = token.group(1), token.group(2)
+        header_end = token.end()
+        if file_name is not None:
+            # The size of the file is after its name
+            if separator == "[" or len(open_folders) == 0:
+                raise ValueError("wrong folder header")
+            if int(text) < 0:
+                raise ValueError(f"wrong size of {file_name}")
+            files.append((file_name, open_folders[-1], int(text)))
+            file_name = None
+        elif separator == "[":
+            folders.append(text)
+            open_folders.append(text)
+        elif separator == ",":
+            # A comma right after a folder has no name before it
+            if text != "":
+                file_name = text
+        elif text != "":
+            raise ValueError("wrong folder header")
+        if separator == "]":
+            if len(open_folders) == 0:
+                raise ValueError("wrong folder header")
+            open_folders.pop()
+    if len(folders) == 0 or len(open_folders) > 0 or file_name is not None or header_end != len(header):
+        raise ValueError("wrong folder header")
+    return folders, files
 
 
 def create_folder(folder: str) -> None:
@@ -0,0 +1,399 @@
+from typing import Dict, List, Optional, Tuple
+from treenode import TreeNode
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the codes are packed with python ints instead
+    np = None
+
+ENCODE_CHUNK_SIZE = 2 ** 20
+# The size of each block of the original data when a file is Huffman coded in blocks
+HUF_BLOCK_SIZE = 2 ** 20
+# The index of the blocks ends with its position, written with this many digits
+BLOCK_INDEX_DIGITS = 20
+# A code length is written as the character with the value LENGTH_OFFSET + length, so it is never "," "\r" or "\n"
+LENGTH_OFFSET = 48
+MAX_CODE_LENGTH = 255 - LENGTH_OFFSET
+# numpy packs each code inside one 64-bit word together with up to 7 bits of offset
+NUMPY_MAX_CODE_LENGTH = 57
+
+
+def code_table(huf_map: Dict[bytes, bytes]) -> List[str]:
+    """
+    Turn a Huffman map into a table of 256 codes indexed by the byte value.
+
+    Args:
+        huf_map (Dict[bytes, bytes]): A dictionary mapping each byte character to its corresponding Huffman code.
+
+    Returns:
+        List[str]: The code of each byte value as a string of '0' and '1', or "" if the byte has no code.
+
+    Example:
+        code_table({b'A': b'0', b'B': b'1'})[65] -> '0'
+    """
+    codes: List[str] = [""] * 256
+    for char, code in huf_map.items():
+        codes[char[0]] = code.decode()
+    return codes
+
+
+def code_lengths(head_node: TreeNode) -> List[int]:
+    """
+    Find the length of the code of every byte value in a Huffman tree.
+
+    Args:
+        head_node (TreeNode): The root node of the Huffman tree.
+
+    Returns:
+        List[int]: The code length of each byte value, 0 if the byte is not in the tree.
+        A tree with only one leaf gives it a code of length 1.
+    """
+    lengths: List[int] = [0] * 256
+    nodes_to_visit: List[Tuple[TreeNode, int]] = [(head_node, 0)]
+    while nodes_to_visit:
+        node, depth = nodes_to_visit.pop()
+        if node.left is None and node.right is None:
+            char: bytes = node.data[0] if isinstance(node.data, tuple) else node.data
+            lengths[char[0]] = max(depth, 1)
+            continue
+        nodes_to_visit.append((node.left, depth + 1))
+        nodes_to_visit.append((node.right, depth + 1))
+    return lengths
+
+
+def canonical_codes(lengths: List[int]) -> List[str]:
+    """
+    Give every byte value its canonical Huffman code from the code lengths.
+    Shorter codes come first and codes of the same length are ordered by the byte value,
+    so the code lengths are all that is needed to build the same codes again.
+
+    Args:
+        lengths (List[int]): The code length of each byte value, 0 if the byte has no code.
+
+    Returns:
+        List[str]: The code of each byte value as a string of '0' and '1', or "" if the byte has no code.
+
+    Example:
+        canonical_codes([0] * 65 + [1, 2, 2] + [0] * 188)[65:68] -> ['0', '10', '11']
+    """
+    # Group the bytes by their code length, every group is already ordered by the byte value
+    chars_by_length: List[List[int]] = [[] for _ in range(max(lengths, default=0) + 1)]
+    for byte in range(256):
+        if lengths[byte] > 0:
+            chars_by_length[lengths[byte]].append(byte)
+
+    codes: List[str] = [""] * 256
+    code: int = 0
+    for length in range(1, len(chars_by_length)):
+        for byte in chars_by_length[length]:
+            codes[byte] = format(code, f'0{length}b')
+            code += 1
+        code <<= 1
+    return codes
+
+
+def encode_code_lengths(lengths: List[int]) -> bytes:
+    """
+    Write the code lengths as one character for each byte value, without the zeros at the end.
+
+    Args:
+        lengths (List[int]): The code length of each byte value, 0 if the byte has no code.
+
+    Returns:
+        bytes: The code lengths.
+
+    Example:
+        encode_code_lengths([0] * 65 + [1, 2, 2] + [0] * 188) -> b'000...000122' (65 zeros and then 1, 2, 2)
+    """
+    if max(lengths) > MAX_CODE_LENGTH:
+        raise ValueError(f"huffman codes can be up to {MAX_CODE_LENGTH} bits")
+    last_byte: int = max((byte for byte in range(256) if lengths[byte] > 0), default=-1)
+    return bytes(LENGTH_OFFSET + length for length in lengths[:last_byte + 1])
+
+
+def decode_code_lengths(encoded_lengths: bytes) -> List[int]:
+    """
+    Read the code lengths that were written by encode_code_lengths.
+
+    Args:
+        encoded_lengths (bytes): The code lengths.
+
+    Returns:
+        List[int]: The code length of each byte value, 0 if the byte has no code.
+    """
+    if len(encoded_lengths) > 256:
+        raise ValueError("too many code lengths")
+    lengths: List[int] = [char - LENGTH_OFFSET for char in encoded_lengths] + [0] * (256 - len(encoded_lengths))
+    if min(lengths) < 0:
+        raise ValueError("wrong code length")
+    return lengths
+
+
+def canonical_tree(lengths: List[int]) -> TreeNode:
+    """
+    Build the Huffman tree of the canonical codes, its leaves hold the byte characters.
+
+    Args:
+        lengths (List[int]): The code length of each byte value, 0 if the byte has no code.
+
+    Returns:
+        TreeNode: The root node of the tree.
+    """
+    codes: List[str] = canonical_codes(lengths)
+    head_node: TreeNode = TreeNode(0)
+    for byte in range(256):
+        if codes[byte] == "":
+            continue
+        node: TreeNode = head_node
+        for bit in codes[byte][:-1]:
+            if bit == "0":
+                if node.left is None:
+                    node.left = TreeNode(0)
+                node = node.left
+            else:
+                if node.right is None:
+                    node.right = TreeNode(0)
+                node = node.right
+        if codes[byte][-1] == "0":
+            node.left = TreeNode(bytes([byte]))
+        else:
+            node.right = TreeNode(bytes([byte]))
+    # A single character has the code "0", both children point to it like in the older tree header
+    if head_node.right is None:
+        head_node.right = head_node.left
+    return head_node
+
+
+class HuffmanEncoder:
+    """
+    Packs the Huffman codes of the data into bytes, one chunk at a time.
+    The last bits that do not fill a whole byte are kept for the next chunk.
+    """
+    def __init__(self, codes: List[str], use_numpy: bool = True) -> None:
+        """
+        A constructor for a HuffmanEncoder object.
+        :param codes: The code of each byte value, as returned by code_table.
+        :param use_numpy: Use numpy to pack the codes when it is installed.
+        """
+        self.__codes: List[str] = codes
+        self.__carry_value: int = 0
+        self.__carry_bits: int = 0
+        self.__use_numpy: bool = (use_numpy and np is not None
+                                  and max(len(code) for code in codes) <= NUMPY_MAX_CODE_LENGTH)
+        if self.__use_numpy:
+            self.__lengths = np.array([len(code) for code in codes], dtype=np.int64)
+            self.__values = np.array([int(code, 2) if code != "" else 0 for code in codes], dtype=np.uint64)
+
+    def encoded_bits(self, histogram: List[int]) -> int:
+        """
+        Calculate how many bits the encoded data is going to take.
+
+        Args:
+            histogram (List[int]): How many times each byte value appears in the data.
+
+        Returns:
+            int: The number of bits of the encoded data, without the padding.
+        """
+        return sum(histogram[byte] * len(self.__codes[byte]) for byte in range(256))
+
+    def encode(self, chunk: bytes) -> bytes:
+        """
+        Encode the next chunk of the data.
+
+        Args:
+            chunk (bytes): The next chunk of the original data.
+
+        Returns:
+            bytes: All the whole bytes that are ready, the rest of the bits wait for the next chunk.
+        """
+        if len(chunk) == 0:
+            return b''
+        if self.__use_numpy:
+            return self.__encode_numpy(chunk)
+
+        bits_str: str = ''.join(map(self.__codes.__getitem__, chunk))
+        if self.__carry_bits:
+            bits_str = format(self.__carry_value, f'0{self.__carry_bits}b') + bits_str
+        full_bits: int = len(bits_str) - len(bits_str) % 8
+        self.__carry_bits = len(bits_str) - full_bits
+        self.__carry_value = int(bits_str[full_bits:], 2) if self.__carry_bits else 0
+        if full_bits == 0:
+            return b''
+        return int(bits_str[:full_bits], 2).to_bytes(full_bits // 8, "big")
+
+    def __encode_numpy(self, chunk: bytes) -> bytes:
+        """
+        Encode the next chunk of the data with numpy.
+        Each code is shifted to its place inside a 64-bit word that starts at the code's first byte,
+        the words of codes that start at the same byte are merged, and then the words are merged into the output.
+
+        Args:
+            chunk (bytes): The next chunk of the original data.
+
+        Returns:
+            bytes: All the whole bytes that are ready, the rest of the bits wait for the next chunk.
+        """
+        chars = np.frombuffer(chunk, dtype=np.uint8)
+        lengths = self.__lengths[chars]
+        ends = np.cumsum(lengths) + self.__carry_bits
+        starts = ends - lengths
+        total_bits: int = int(ends[-1])
+        bytes_amount: int = (total_bits + 7) // 8
+
+        # Shift every code to its place inside a 64-bit word that starts at the byte where the code starts
+        words_values = self.__values[chars] << (64 - lengths - (starts & 7)).astype(np.uint64)
+        byte_index = starts >> 3
+        first_in_byte = np.flatnonzero(np.concatenate(([True], byte_index[1:] != byte_index[:-1])))
+        words = np.zeros(bytes_amount, dtype=np.uint64)
+        words[byte_index[first_in_byte]] = np.bitwise_or.reduceat(words_values, first_in_byte)
+
+        # Each word covers its own byte and the 7 after it, the codes never overlap so OR merges them
+        words_bytes = words.astype('>u8').view(np.uint8).reshape(bytes_amount, 8)
+        packed = np.zeros(bytes_amount + 8, dtype=np.uint8)
+        for i in range(8):
+            packed[i: i + bytes_amount] |= words_bytes[:, i]
+        if self.__carry_bits:
+            packed[0] |= self.__carry_value << (8 - self.__carry_bits)
+
+        full_bytes: int = total_bits // 8
+        self.__carry_bits = total_bits % 8
+        self.__carry_value = int(packed[full_bytes]) >> (8 - self.__carry_bits) if self.__carry_bits else 0
+        return packed[:full_bytes].tobytes()
+
+    def flush(self) -> bytes:
+        """
+        Finish the encoded data: pad the last bits with zeros to a whole byte and add the padding size.
+        When there are no bits left a whole zero byte is added, like older versions of the compressor did.
+
+        Returns:
+            bytes: The last byte followed by the number of padding bits as a digit.
+        """
+        rest_of_bits: int = self.__carry_bits
+        last_byte: bytes = bytes([(self.__carry_value << (8 - rest_of_bits)) & 255])
+        self.__carry_value = 0
+        self.__carry_bits = 0
+        return last_byte + str(8 - rest_of_bits).encode()
+
+
+class HuffmanDecoder:
+    """
+    Decodes packed Huffman codes a whole byte at a time with a lookup table.
+    For each pair of (tree node, next byte) the table keeps the characters that the 8 bits complete
+    and the node where the walk stops, so the tree is walked at most once for each pair.
+    """
+    def __init__(self, head_node: TreeNode) -> None:
+        """
+        A constructor for a HuffmanDecoder object.
+        :param head_node: The root node of the Huffman tree, its leaves hold the characters.
+        """
+        # Internal nodes get numbers from 0 (the root), a leaf child is kept as ~byte (a negative number)
+        self.__left: List[int] = []
+        self.__right: List[int] = []
+        nodes_to_add: List[Tuple[TreeNode, int]] = [(head_node, 0)]
+        self.__left.append(0)
+        self.__right.append(0)
+        while nodes_to_add:
+            node, node_number = nodes_to_add.pop()
+            self.__left[node_number] = self.__add_child(node.left, nodes_to_add)
+            self.__right[node_number] = self.__add_child(node.right, nodes_to_add)
+        self.__table: List[Optional[Tuple[bytes, int]]] = [None] * (len(self.__left) * 256)
+        self.__node: int = 0
+
+    def copy(self) -> "HuffmanDecoder":
+        """
+        Make a decoder of the same code that starts at the start of the data, it shares the lookup table with this
+        decoder, so the pairs that one of them already walked are not walked again by the other.
+
+        Returns:
+            HuffmanDecoder: The new decoder.
+        """
+        decoder: HuffmanDecoder = HuffmanDecoder.__new__(HuffmanDecoder)
+        decoder.__left = self.__left
+        decoder.__right = self.__right
+        decoder.__table = self.__table
+        decoder.__node = 0
+        return decoder
+
+    def __add_child(self, child: TreeNode, nodes_to_add: List[Tuple[TreeNode, int]]) -> int:
+        """
+        Give a number to a child node.
+
+        Args:
+            child (TreeNode): The child node.
+            nodes_to_add (List[Tuple[TreeNode, int]]): The internal nodes that still need their children numbered.
+
+        Returns:
+            int: The number of the internal node, or ~byte if the child is a leaf.
+        """
+        if child.left is None and child.right is None:
+            char: bytes = child.data[0] if isinstance(child.data, tuple) else child.data
+            return ~char[0]
+        self.__left.append(0)
+        self.__right.append(0)
+        nodes_to_add.append((child, len(self.__left) - 1))
+        return len(self.__left) - 1
+
+    def __walk(self, node: int, byte: int, bits_amount: int = 8) -> Tuple[bytes, int]:
+        """
+        Walk down the tree with the bits of one byte, starting from the most significant bit.
+
+        Args:
+            node (int): The number of the internal node to start from.
+            byte (int): The byte to read the bits from.
+            bits_amount (int, optional): How many bits of the byte to read. Defaults to 8.
+
+        Returns:
+            Tuple[bytes, int]: The characters the bits complete, and the node where the walk stops.
+        """
+        chars: bytearray = bytearray()
+        for shift in range(7, 7 - bits_amount, -1):
+            child: int = self.__right[node] if (byte >> shift) & 1 else self.__left[node]
+            if child < 0:
+                chars.append(~child)
+                node = 0
+            else:
+                node = child
+        return bytes(chars), node
+
+    def decode_into(self, chunk: bytes, output: bytearray, position: int) -> int:
+        """
+        Decode the next chunk of packed bytes into the output buffer.
+
+        Args:
+            chunk (bytes): The next whole bytes of the packed data.
+            output (bytearray): The buffer to write the characters into.
+            position (int): Where to start writing in the output buffer.
+
+        Returns:
+            int: The position after the last written character.
+        """
+        table: List[Optional[Tuple[bytes, int]]] = self.__table
+        node: int = self.__node
+        for byte in chunk:
+            key: int = node << 8 | byte
+            entry: Optional[Tuple[bytes, int]] = table[key]
+            if entry is None:
+                entry = self.__walk(node, byte)
+                table[key] = entry
+            chars, node = entry
+            output[position: position + len(chars)] = chars
+            position += len(chars)
+        self.__node = node
+        return position
+
+    def decode_last_bits(self, byte: int, bits_amount: int, output: bytearray, position: int) -> int:
+        """
+        Decode the first bits of the last byte, the rest of its bits are padding.
+
+        Args:
+            byte (int): The last byte of the packed data.
+            bits_amount (int): How many bits of the byte hold codes.
+            output (bytearray): The buffer to write the characters into.
+            position (int): Where to start writing in the output buffer.
+
+        Returns:
+            int: The position after the last written character.
+        """
+        chars, self.__node = self.__walk(self.__node, byte, bits_amount)
+        output[position: position + len(chars)] = chars
+        return position + len(chars)
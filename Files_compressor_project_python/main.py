@@ -1,8 +1,11 @@
 import extractor
+import archive
 import user_interface
-from compressor import Compressor
+from compressor import Compressor, AUTO_REPEAT_SIZE, COMPRESS_METHODS
 from typing import List, Tuple, Union
 import argparse
+import mmap
+import os
 
 DESCRIPTION = ("Hello and welcome to the file compressor!!! Here are some instructions for the program: "
                "While you run the main file there will be a message with 7 options that will appear. "
@@ -30,7 +33,7 @@ def is_compressed_file(data: bytes) -> str:
         return "file not in compressed format"
 
     # Check if the compression method identifier is valid
-    if data_split[0][:3] not in [b'HUF', b'RLE']:
+    if data_split[0][:3] not in extractor.FILE_METHODS:
         return "file not in compressed format"
 
     # Check if the compression method identifier is followed by a comma
@@ -50,11 +53,45 @@ def is_compressed_file(data: bytes) -> str:
                 except (ValueError, UnicodeDecodeError):
                     return "file not in compressed format"
         return ""
+    if data_split[0][:3] == b'RLV':
+        # The repeat size, the block size and the size of the runs table
+        try:
+            repeat_size, block_size, table_size = [int(size.decode()) for size in data_split[1].split(b',')]
+        except (ValueError, UnicodeDecodeError):
+            return "file not in compressed format"
+        if repeat_size < 1 or block_size < 1 or table_size < 0:
+            return "file not in compressed format"
+        return ""
     if data_split[0][:3] == b'HUF':
         head: List[bytes] = data_split[1].split(b',')
         if len(head) < 2:
             return "file not in compressed format"
         return ""
+    if data_split[0][:3] == b'HUC':
+        # The original size and the code lengths
+        try:
+            extractor.extract_head_huc(data_split[1])
+        except (ValueError, IndexError, UnicodeDecodeError):
+            return "file not in compressed format"
+        return ""
+    if data_split[0][:3] in [b'PKB', b'STO']:
+        # The original size
+        try:
+            original_size = int(data_split[1].decode())
+        except (ValueError, UnicodeDecodeError):
+            return "file not in compressed format"
+        if original_size < 0:
+            return "file not in compressed format"
+        return ""
+    if data_split[0][:3] == b'HUB':
+        # The original size and the size of the blocks
+        try:
+            original_size, block_size = [int(size.decode()) for size in data_split[1].split(b',')]
+        except (ValueError, UnicodeDecodeError):
+            return "file not in compressed format"
+        if original_size < 0 or block_size < 1:
+            return "file not in compressed format"
+        return ""
 
     return "file not in compressed format"
 
@@ -64,31 +101,58 @@ def is_compressed_folder(data: bytes) -> str:
     Check if the provided byte string represents a compressed folder.
 
     Args:
-        data (bytes): The byte string to be checked.
+        data (bytes): The byte string to be checked, or a compressed folder mapped to memory.
 
     Returns:
         bool: True if the byte string represents a compressed folder, False otherwise.
     """
-    # Split the byte string by the newline characters
-    data_split: List[bytes] = data.split(b"\r\n")
+    # A folder archive with a table of contents
+    if data[:len(archive.ARCHIVE_MAGIC)] == archive.ARCHIVE_MAGIC:
+        return archive.is_archive(data)
+
+    # Find the end of the header line, the data after it is not copied
+    header_end: int = data.find(b"\r\n")
+    if header_end == -1:
+        header_end = len(data)
 
     # Check if the header indicates a compressed folder and get the expected number of bytes
-    check, bytes_amount = is_compressed_folder_header(data_split[0])
+    check, bytes_amount = is_compressed_folder_header(data[:header_end])
 
     # If the header check fails, return False
     if not check:
         return "problem with the compressed file header"
 
-    # Extract the rest of the data (excluding the header)
-    rest_data: bytes = b"\r\n".join(data_split[1:])
-
-    # Check if the number of bytes matches the expected amount
-    if bytes_amount != len(rest_data):
+    # Check if the number of bytes matches the expected amount of the rest of the data (excluding the header)
+    if bytes_amount != max(len(data) - header_end - 2, 0):
         return "folder not in compressed format"
 
     return ""
 
 
+def is_compressed_folder_file(path: str) -> str:
+    """
+    Check if a file is a compressed folder, only the table of contents of a folder archive is read.
+
+    Args:
+        path (str): The path to the file to be checked.
+
+    Returns:
+        str: An error message if the file is not a compressed folder, otherwise an empty string.
+    """
+    with open(path, 'rb') as compressed_file:
+        if compressed_file.read(len(archive.ARCHIVE_START)) == archive.ARCHIVE_START:
+            try:
+                archive.read_toc(compressed_file)
+            except (ValueError, UnicodeDecodeError) as e:
+                return f"folder not in compressed format: {e}"
+            return ""
+        if os.path.getsize(path) == 0:
+            return "folder not in compressed format"
+        # The compressed folder is mapped to memory instead of read
+        with mmap.mmap(compressed_file.fileno(), 0, access=mmap.ACCESS_READ) as compressed_map:
+            return is_compressed_folder(compressed_map)
+
+
 def is_compressed_folder_header(data: bytes) -> Tuple[bool, int]:
     """
     Validate the header part of a compressed folder.
@@ -148,14 +212,14 @@ def add_file_to_exist(file_name_to_add: str, exist_compressed_file: str, comp_me
         file_name_to_add (str): The name of the file to be added.
         exist_compressed_file (str): The path to the existing compressed file.
         comp_method (str): The compression method to be used.
-        repeat_size (int, optional): The repeat size for RLE compression. Defaults to 1.
+        repeat_size (int, optional): The repeat size for RLE compression, AUTO_REPEAT_SIZE to choose it. Defaults to 1.
 
     Returns:
         Union[str, None]: A string describing any errors encountered during the operation, or None if successful.
     """
     # Check if the compression method is valid
     file_name_to_add = file_name_to_add.replace("\\", "/")
-    if comp_method not in ["RLE", "HUF"]:
+    if comp_method not in COMPRESS_METHODS:
         return "wrong compression method", 0
 
     # Validate the format of the existing compressed file
@@ -169,9 +233,10 @@ def add_file_to_exist(file_name_to_add: str, exist_compressed_file: str, comp_me
         return "file to add must be file", 0
     efficiency: int = 0
 
-    # Attempt to read the existing compressed file
+    # Attempt to read the start of the existing compressed file
     try:
-        exist_file_data: bytes = extractor.read_binary_file(exist_compressed_file)
+        with open(exist_compressed_file, 'rb') as exist_file:
+            exist_file_start: bytes = exist_file.read(len(archive.ARCHIVE_START))
     except Exception as e:
         return f"{e} problem reading the file", 0
     new_data: bytes = b''
@@ -179,7 +244,7 @@ def add_file_to_exist(file_name_to_add: str, exist_compressed_file: str, comp_me
     comp_new_file: Compressor = Compressor(file_name_to_add, comp_method)
     if comp_method == "RLE":
         # Validate the repeat size for RLE compression
-        if repeat_size < 1 or repeat_size % 1 != 0:
+        if repeat_size < AUTO_REPEAT_SIZE or repeat_size % 1 != 0:
             return "wrong repeat size", 0
         try:
             # Compress the new file
@@ -194,8 +259,31 @@ def add_file_to_exist(file_name_to_add: str, exist_compressed_file: str, comp_me
             efficiency = comp_new_file.get_efficiency()
         except Exception as e:
             return f"{e} problem compress {file_name_to_add}", 0
+    elif comp_method == "PKB":
+        try:
+            # Compress the new file
+            new_data = comp_new_file.compress_pkb()
+            efficiency = comp_new_file.get_efficiency()
+        except Exception as e:
+            return f"{e} problem compress {file_name_to_add}", 0
+    # A folder archive with a table of contents gets the new file at its end, the rest of it is not read
+    if exist_file_start == archive.ARCHIVE_START:
+        try:
+            add_data_to_archive(exist_compressed_file, new_data, file_name_to_add,
+                                os.path.getsize(file_name_to_add))
+        except (ValueError, UnicodeDecodeError) as e:
+            return f"given file not in compressed format: {e}", 0
+        except OSError as e:
+            return f"{e} problem adding {file_name_to_add}", 0
+        return None, efficiency
+
+    # Attempt to read the existing compressed file
+    try:
+        exist_file_data: bytes = extractor.read_binary_file(exist_compressed_file)
+    except Exception as e:
+        return f"{e} problem reading the file", 0
     # Check if the existing file is a compressed folder
-    if is_compressed_folder(exist_file_data):
+    if is_compressed_folder(exist_file_data) == "":
         # Add the new data to the existing folder data
         new_exist_file_data: bytes = add_data_to_folder_data(exist_file_data, new_data, file_name_to_add)
         # Write the updated folder data back to the existing compressed file
@@ -205,6 +293,33 @@ def add_file_to_exist(file_name_to_add: str, exist_compressed_file: str, comp_me
     return None, efficiency
 
 
+def add_data_to_archive(archive_path: str, file_to_add_data: bytes, file_name_to_add: str, original_size: int) \
+        -> None:
+    """
+    Add a compressed file to a folder archive. The new file is written at the end of the archive,
+    and the table of contents is written again after it, so the cost depends on the new file and not on the archive.
+    If the file can not be written, the archive is cut back to its old footer, so its old files are not lost.
+
+    Args:
+        archive_path (str): The path to the folder archive.
+        file_to_add_data (bytes): The compressed data of the file to be added.
+        file_name_to_add (str): The name of the file to be added, it is added to the top folder of the archive.
+        original_size (int): The size of the original file.
+    """
+    with open(archive_path, 'r+b') as archive_file:
+        writer: archive.ArchiveWriter = archive.ArchiveWriter.append_to(archive_file)
+        name: str = file_name_to_add.split("/")[-1]
+        # The first entry of an archive of a folder is the folder itself
+        if len(writer.entries) > 0 and writer.entries[0].is_folder:
+            name = f'{writer.entries[0].name}/{name}'
+        try:
+            writer.add_file(name, file_to_add_data, original_size)
+            writer.finish()
+        except Exception:
+            writer.discard()
+            raise
+
+
 def add_data_to_folder_data(exist_folder_data: bytes, file_to_add_data: bytes, file_name_to_add: str) -> bytes:
     """
     Add data of a file to the data of an existing folder in a compressed file.
@@ -272,50 +387,40 @@ def compress_files_to_one_file(files_lst: List[str]) -> Tuple[Union[str, None],
     if folder_name[-4:] != ".txt":
         folder_name = folder_name + ".txt"
 
-    # Extract the name without the file extension
-    folder_name_no_type: str = ".".join(folder_name.split(".")[:-1])
-
-    # Initialize the header with the folder name and an empty list
-    header: bytes = folder_name_no_type.encode() + b'[]'
-    data: bytes = b''
-
-    # Iterate through the arguments starting from the second one
-    for i in range(1, len(files_lst), 2):
-        # Extract the file name and compression method
-        file_name: str = files_lst[i].replace("\\", "/")
-        compress_method: str = files_lst[i + 1]
-
-        # Create a Compressor object for the file
-        try:
-            comp: Compressor = Compressor(file_name, compress_method[:3])
-        except Exception as e:
-            return f'{e}', 0
+    # The folder in the archive is named like the file without the path and the file extension
+    folder_name_no_type: str = ".".join(folder_name.replace("\\", "/").split("/")[-1].split(".")[:-1])
 
-        # Compress the file according to the specified method
-        if compress_method[:3] == "RLE":
-            new_file_data: bytes = comp.compress_rle(int(compress_method[3:]))
-            efficiency += comp.get_efficiency()
-            file_name = file_name.split('/')[-1]
-            add_header: bytes = b',' + file_name.encode() + b',' + str(len(new_file_data)).encode()
-            if i == 1:
-                add_header = add_header[1:]
-            header = header[:-1] + add_header + b']'
-            data += new_file_data
-        if compress_method[:3] == "HUF":
-            new_file_data = comp.compress_huf()
-            efficiency += comp.get_efficiency()
-            file_name = file_name.split('/')[-1]
-            add_header = b',' + file_name.encode() + b',' + str(len(new_file_data)).encode()
-            if i == 1:
-                add_header = add_header[1:]
-            header = header[:-1] + add_header + b']'
-            data += new_file_data
-
-    # Concatenate the header and data to form the final compressed file
-    all_data: bytes = header + b'\r\n' + data
-
-    # Write the compressed data to a file
-    extractor.write_binary_file(all_data, folder_name, "")
+    # Each file is written to the archive when it is compressed, the table of contents is written last
+    try:
+        with open(folder_name, 'w+b') as archive_file:
+            writer: archive.ArchiveWriter = archive.ArchiveWriter(archive_file)
+            writer.add_folder(folder_name_no_type)
+            # Iterate through the arguments starting from the second one
+            for i in range(1, len(files_lst), 2):
+                # Extract the file name and compression method
+                file_name: str = files_lst[i].replace("\\", "/")
+                compress_method: str = files_lst[i + 1]
+
+                # Create a Compressor object for the file
+                comp: Compressor = Compressor(file_name, compress_method[:3])
+                name_in_archive: str = f'{folder_name_no_type}/{file_name.split("/")[-1]}'
+                original_size: int = os.path.getsize(file_name)
+
+                # Compress the file according to the specified method
+                if compress_method[:3] == "RLE":
+                    writer.add_file(name_in_archive, comp.compress_rle(int(compress_method[3:])), original_size)
+                if compress_method[:3] == "HUF":
+                    # Huffman coding writes the compressed data to the archive while it is produced
+                    writer.write_file(name_in_archive, original_size, comp.compress_huf_to_file)
+                if compress_method[:3] == "PKB":
+                    writer.add_file(name_in_archive, comp.compress_pkb(), original_size)
+                efficiency += comp.get_efficiency()
+            writer.finish()
+    except Exception as e:
+        # Dont leave half of an archive behind
+        if os.path.exists(folder_name):
+            os.remove(folder_name)
+        return f'{e}', 0
     return None, efficiency
 
 
@@ -353,7 +458,7 @@ def check_args(args: List[str]) -> Union[str, None]:
 
         # Extract the compression method and validate it
         compress_method: str = args[i + 1]
-        if compress_method[:3] not in ["RLE", "HUF"]:
+        if compress_method[:3] not in COMPRESS_METHODS:
             return f"{file_name} wrong compress method"
 
         # If RLE compression is used, validate the repeat size
@@ -365,7 +470,7 @@ def check_args(args: List[str]) -> Union[str, None]:
             except ValueError:
                 return f"{file_name} wrong repeat size"
 
-            if int(compress_method[3:]) < 1 or int(compress_method[3:]) % 1 != 0:
+            if int(compress_method[3:]) < AUTO_REPEAT_SIZE or int(compress_method[3:]) % 1 != 0:
                 return f"{file_name} wrong repeat size"
     return None
 
@@ -373,8 +478,11 @@ def check_args(args: List[str]) -> Union[str, None]:
 def main() -> None:
     """ start the user interface """
     parser = argparse.ArgumentParser(description=DESCRIPTION)
-    parser.parse_args()
-    user_interface.user_interface_start()
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="number of processes for compressing and extracting folders and Huffman blocks, "
+                             "0 for one for each core, default 1")
+    args = parser.parse_args()
+    user_interface.user_interface_start(args.jobs)
     return None
 
 
@@ -0,0 +1,96 @@
+import json
+import os
+from typing import Any, Dict
+
+from archive import toc_digest
+
+# The manifest of a folder archive is a json file next to it with the size, the modification time and the hash of
+# each file that is in the archive, and the digest of the table of contents of the archive it was written for
+MANIFEST_VERSION = 1
+
+
+class FileRecord:
+    """
+    What the manifest knows about a file: its size, its modification time and the hash of its content.
+    """
+    def __init__(self, size: int, mtime_ns: int, content_hash: bytes) -> None:
+        """
+        A constructor for a FileRecord object.
+        :param size: The size of the file.
+        :param mtime_ns: The modification time of the file in nanoseconds.
+        :param content_hash: The sha256 digest of the content of the file.
+        """
+        self.__size: int = size
+        self.__mtime_ns: int = mtime_ns
+        self.__content_hash: bytes = content_hash
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    @property
+    def mtime_ns(self) -> int:
+        return self.__mtime_ns
+
+    @property
+    def content_hash(self) -> bytes:
+        return self.__content_hash
+
+
+def manifest_path(archive_path: str) -> str:
+    """
+    :param archive_path: the path of a folder archive
+    :return: the path of its manifest
+    """
+    return f'{os.path.splitext(archive_path)[0]}_manifest.json'
+
+
+def read_manifest(archive_path: str, settings: Dict[str, Any]) -> Dict[str, FileRecord]:
+    """
+    Read the manifest of a folder archive. A manifest that is missing, that was written with other settings
+    or for another version of the archive is not used, as if there was no manifest.
+
+    Args:
+        archive_path (str): The path of the folder archive.
+        settings (Dict[str, Any]): The settings the archive is compressed with, like the compression method.
+
+    Returns:
+        Dict[str, FileRecord]: The record of each file by its path inside the archive, empty if there is no
+            manifest that can be used.
+    """
+    try:
+        with open(manifest_path(archive_path), 'r') as manifest_file:
+            manifest: Dict[str, Any] = json.load(manifest_file)
+        with open(archive_path, 'rb') as archive_file:
+            digest: bytes = toc_digest(archive_file)
+        if (manifest["version"] != MANIFEST_VERSION or manifest["settings"] != settings
+                or manifest["toc"] != digest.hex()):
+            return dict()
+        return {name: FileRecord(size, mtime_ns, bytes.fromhex(content_hash))
+                for name, (size, mtime_ns, content_hash) in manifest["files"].items()}
+    except (OSError, ValueError, KeyError, TypeError):
+        return dict()
+
+
+def write_manifest(archive_path: str, settings: Dict[str, Any], records: Dict[str, FileRecord]) -> None:
+    """
+    Write the manifest of a folder archive, after the archive is written.
+
+    Args:
+        archive_path (str): The path of the folder archive.
+        settings (Dict[str, Any]): The settings the archive was compressed with, like the compression method.
+        records (Dict[str, FileRecord]): The record of each file by its path inside the archive.
+    """
+    with open(archive_path, 'rb') as archive_file:
+        digest: bytes = toc_digest(archive_file)
+    manifest: Dict[str, Any] = {
+        "version": MANIFEST_VERSION,
+        "settings": settings,
+        "toc": digest.hex(),
+        "files": {name: [record.size, record.mtime_ns, record.content_hash.hex()] for name, record in records.items()},
+    }
+    # A manifest that is cut in the middle is never read as a whole one
+    new_path: str = f'{manifest_path(archive_path)}.new'
+    with open(new_path, 'w') as manifest_file:
+        json.dump(manifest, manifest_file)
+    os.replace(new_path, manifest_path(archive_path))
@@ -0,0 +1,53 @@
+import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Deque, Iterable, Iterator
+
+
+def jobs_amount(jobs: int = 1) -> int:
+    """
+    Find how many processes to use.
+
+    Args:
+        jobs (int): The wanted number of processes, 0 for one process for each core.
+
+    Returns:
+        int: The number of processes, at least 1.
+    """
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    return max(jobs, 1)
+
+
+def ordered_map(function: Callable[..., Any], items: Iterable[Any], jobs: int = 1) -> Iterator[Any]:
+    """
+    Call a function on each item on a pool of processes and give back the results in the order of the items.
+    Only a few items for each process are sent at a time, so the items can come from a file bigger than the memory.
+
+    Args:
+        function (Callable[..., Any]): A module level function, it is sent to the processes.
+        items (Iterable[Any]): The items, each one is a tuple of the function arguments.
+        jobs (int): The number of processes, 0 for one process for each core.
+            With 1 process the function is called in this process.
+
+    Returns:
+        Iterator[Any]: The result of each item.
+
+    Example:
+        list(ordered_map(pow, [(2, 3), (3, 2)], 2)) -> [8, 9]
+    """
+    jobs = jobs_amount(jobs)
+    if jobs == 1:
+        for item in items:
+            yield function(*item)
+        return
+
+    with ProcessPoolExecutor(jobs) as pool:
+        waiting: Deque[Future] = deque()
+        for item in items:
+            waiting.append(pool.submit(function, *item))
+            # Keep every process busy, without reading all the items ahead
+            if len(waiting) >= 2 * jobs:
+                yield waiting.popleft().result()
+        while waiting:
+            yield waiting.popleft().result()
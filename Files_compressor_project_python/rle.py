@@ -0,0 +1,586 @@
+import io
+import re
+import time
+import warnings
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # numpy is optional, the runs are found with python slices and regular expressions instead
+    np = None
+
+# Every kilobyte of the original data is run-length encoded alone, the RLV format can use other block sizes
+KILO = 1000
+# How many bytes are encoded at a time, a whole number of blocks
+ENCODE_CHUNK_SIZE = KILO * 2 ** 10
+# A run never crosses a kilobyte, so in the RLE format it is never longer than a kilobyte
+SIZE_STRINGS: List[bytes] = [f'{size},'.encode() for size in range(KILO + 1)]
+# The high bit of a varint byte, set when the number goes on in the next byte
+VARINT_BIT = 0x80
+# How many bytes of original data numpy expands at a time
+DECODE_SIZE = 2 ** 20
+# A run of a single byte, for repeat size 1 without numpy
+BYTE_RUN = re.compile(rb'(.)\1*', re.DOTALL)
+# PackBits control bytes: n < 128 is followed by n + 1 literal bytes, n > 128 is followed by one byte that
+# is repeated 257 - n times, and 128 is skipped
+PACK_MAX_COUNT = 128
+PACK_SKIP = 128
+# The control byte of each literal span size and of each run size
+PACK_LITERAL_CONTROLS: List[bytes] = [bytes([(size - 1) % 256]) for size in range(PACK_MAX_COUNT + 1)]
+PACK_RUN_CONTROLS: List[bytes] = [bytes([(257 - size) % 256]) for size in range(PACK_MAX_COUNT + 1)]
+# A run of three or more of a single byte, shorter runs are cheaper as literals
+PACK_RUN = re.compile(rb'(.)\1{2,}', re.DOTALL)
+# The repeat sizes and block sizes that the automatic mode tries, the first ones are tried first
+AUTO_REPEAT_SIZES = [1, 2, 3, 4, 8, 16]
+AUTO_BLOCK_SIZES = [KILO, 2 ** 12, 2 ** 16]
+# The automatic mode tries the sizes on a few windows from all over the file
+AUTO_WINDOWS = 8
+AUTO_WINDOW_SIZE = 2 ** 13
+# The automatic mode stops trying sizes after this part of the time the compression should take,
+# or after AUTO_MIN_TIME seconds for small files
+AUTO_TIME_FRACTION = 0.05
+AUTO_MIN_TIME = 0.05
+
+
+def find_runs(chunk: bytes, repeat_size: int = 1, use_numpy: bool = True, block_size: int = KILO) \
+        -> Tuple[bytes, Sequence[int]]:
+    """
+    Find the runs of data, each block of it alone, in one pass.
+    Every block is cut into chunks of repeat_size bytes, the last chunk of a block may be shorter,
+    and equal chunks that come one after the other are one run.
+
+    Args:
+        chunk (bytes): The data, all the blocks but the last must be whole.
+        repeat_size (int, optional): The size of the repeated chunks. Defaults to 1.
+        use_numpy (bool, optional): Find the runs with numpy when it is installed. Defaults to True.
+        block_size (int, optional): The size of the blocks. Defaults to KILO.
+
+    Returns:
+        Tuple[bytes, Sequence[int]]: The first chunk of every run, and the number of repeats of every run.
+
+    Example:
+        find_runs(b'aaabcc') -> (b'abc', [3, 1, 2])
+        find_runs(b'ababc', 2) -> (b'abc', [2, 1])
+    """
+    if repeat_size < 1:
+        raise ValueError("wrong repeat size")
+    if block_size < 1:
+        raise ValueError("wrong block size")
+    use_numpy = use_numpy and np is not None
+    whole_size: int = len(chunk) - len(chunk) % block_size
+    data_parts: List[bytes] = []
+    sizes_parts: List[Sequence[int]] = []
+    for start, end in [(0, whole_size), (whole_size, len(chunk))]:
+        size: int = min(end - start, block_size)
+        if size == 0:
+            continue
+        if repeat_size >= size:
+            # Every block is one chunk that is not repeated
+            data_parts.append(chunk[start: end])
+            sizes_parts.append(np.ones((end - start) // size, dtype=np.int64) if use_numpy
+                               else [1] * ((end - start) // size))
+            continue
+        data, sizes = (find_runs_numpy if use_numpy else find_runs_python)(chunk[start: end], size, repeat_size)
+        data_parts.append(data)
+        sizes_parts.append(sizes)
+    if use_numpy:
+        return b''.join(data_parts), np.concatenate(sizes_parts) if sizes_parts else np.zeros(0, dtype=np.int64)
+    return b''.join(data_parts), [size for sizes in sizes_parts for size in sizes]
+
+
+def find_runs_python(chunk: bytes, block_size: int, repeat_size: int) -> Tuple[bytes, List[int]]:
+    """
+    Find the runs of blocks of the same size with python, see find_runs.
+
+    Args:
+        chunk (bytes): The data, a whole number of blocks.
+        block_size (int): The size of each block, bigger than repeat_size.
+        repeat_size (int): The size of the repeated chunks.
+
+    Returns:
+        Tuple[bytes, List[int]]: The first chunk of every run, and the number of repeats of every run.
+    """
+    data_parts: List[bytes] = []
+    sizes: List[int] = []
+    for block_start in range(0, len(chunk), block_size):
+        block: bytes = chunk[block_start: block_start + block_size]
+        if repeat_size == 1:
+            # A regular expression finds the runs of one byte in C
+            for run in BYTE_RUN.finditer(block):
+                data_parts.append(run.group(1))
+                sizes.append(run.end() - run.start())
+            continue
+        current_bytes: bytes = block[:repeat_size]
+        counter: int = 1
+        for position in range(repeat_size, block_size, repeat_size):
+            next_bytes: bytes = block[position: position + repeat_size]
+            if next_bytes == current_bytes:
+                counter += 1
+            else:
+                data_parts.append(current_bytes)
+                sizes.append(counter)
+                current_bytes = next_bytes
+                counter = 1
+        data_parts.append(current_bytes)
+        sizes.append(counter)
+    return b''.join(data_parts), sizes
+
+
+def find_runs_numpy(chunk: bytes, block_size: int, repeat_size: int) -> Tuple[bytes, Any]:
+    """
+    Find the runs of blocks of the same size with numpy, see find_runs.
+    All the blocks are compared at once: a chunk starts a new run when it is not equal to the chunk before it.
+
+    Args:
+        chunk (bytes): The data, a whole number of blocks.
+        block_size (int): The size of each block, bigger than repeat_size.
+        repeat_size (int): The size of the repeated chunks.
+
+    Returns:
+        Tuple[bytes, np.ndarray]: The first chunk of every run, and the number of repeats of every run.
+    """
+    blocks = np.frombuffer(chunk, dtype=np.uint8).reshape(-1, block_size)
+    whole_chunks, rest = divmod(block_size, repeat_size)
+    chunks = blocks[:, :whole_chunks * repeat_size].reshape(len(blocks), whole_chunks, repeat_size)
+    # The first chunk of a block always starts a run, and so does the short chunk at the end of a block
+    run_starts = np.ones((len(blocks), whole_chunks + (rest > 0)), dtype=bool)
+    run_starts[:, 1:whole_chunks] = np.any(chunks[:, 1:] != chunks[:, :-1], axis=2)
+
+    # Keep the bytes of the chunks that start a run
+    keep_bytes = np.ones(blocks.shape, dtype=bool)
+    keep_bytes[:, :whole_chunks * repeat_size] = np.repeat(run_starts[:, :whole_chunks], repeat_size, axis=1)
+    starts = np.flatnonzero(run_starts)
+    return blocks[keep_bytes].tobytes(), np.diff(starts, append=run_starts.size)
+
+
+def encode_blocks(chunk: bytes, repeat_size: int = 1, use_numpy: bool = True) -> Tuple[bytes, bytes]:
+    """
+    Run-length encode data for the RLE format, each kilobyte of it alone, in one pass.
+
+    Args:
+        chunk (bytes): The data, all the kilobytes but the last must be whole.
+        repeat_size (int, optional): The size of the repeated chunks. Defaults to 1.
+        use_numpy (bool, optional): Find the runs with numpy when it is installed. Defaults to True.
+
+    Returns:
+        Tuple[bytes, bytes]: The first chunk of every run, and the number of repeats of every run
+        each followed by a comma.
+
+    Example:
+        encode_blocks(b'aaabcc') -> (b'abc', b'3,1,2,')
+        encode_blocks(b'ababc', 2) -> (b'abc', b'2,1,')
+    """
+    data, sizes = find_runs(chunk, repeat_size, use_numpy)
+    sizes_list: List[int] = sizes.tolist() if np is not None and isinstance(sizes, np.ndarray) else list(sizes)
+    return data, b''.join([SIZE_STRINGS[size] for size in sizes_list])
+
+
+def encode_varints(numbers: Sequence[int], use_numpy: bool = True) -> bytes:
+    """
+    Write positive numbers as varints: 7 bits in every byte, lowest bits first,
+    and the high bit of a byte is set when the number goes on in the next byte.
+
+    Args:
+        numbers (Sequence[int]): The numbers.
+        use_numpy (bool, optional): Write the varints with numpy when it is installed. Defaults to True.
+
+    Returns:
+        bytes: The varints one after the other.
+
+    Example:
+        encode_varints([3, 300]) -> b'\\x03\\xac\\x02'
+    """
+    if use_numpy and np is not None:
+        numbers_array = np.asarray(numbers, dtype=np.uint64)
+        if len(numbers_array) == 0 or numbers_array.max() < VARINT_BIT:
+            # The common case, every number fits in one byte
+            return numbers_array.astype(np.uint8).tobytes()
+        # The number of bytes of every varint, and where it starts
+        sizes = np.ones(len(numbers_array), dtype=np.int64)
+        for bits in range(7, 64, 7):
+            sizes += numbers_array >= (1 << bits)
+        starts = np.cumsum(sizes) - sizes
+        varints = np.zeros(int(sizes.sum()), dtype=np.uint8)
+        for byte in range(int(sizes.max())):
+            has_byte = sizes > byte
+            varints[starts[has_byte] + byte] = (numbers_array[has_byte] >> np.uint64(7 * byte)) & (VARINT_BIT - 1)
+            # The high bit tells that the number goes on
+            varints[starts[sizes > byte + 1] + byte] |= VARINT_BIT
+        return varints.tobytes()
+
+    varints_parts: bytearray = bytearray()
+    for number in numbers:
+        while number >= VARINT_BIT:
+            varints_parts.append(number & (VARINT_BIT - 1) | VARINT_BIT)
+            number >>= 7
+        varints_parts.append(number)
+    return bytes(varints_parts)
+
+
+def decode_varints(varints: bytes, use_numpy: bool = True) -> Tuple[Sequence[int], int]:
+    """
+    Read the numbers of varints, see encode_varints. A varint that is cut at the end is left for the next read.
+
+    Args:
+        varints (bytes): The varints one after the other.
+        use_numpy (bool, optional): Read the varints with numpy when it is installed. Defaults to True.
+
+    Returns:
+        Tuple[Sequence[int], int]: The numbers, and how many bytes of whole varints were read.
+
+    Example:
+        decode_varints(b'\\x03\\xac\\x02\\x81') -> ([3, 300], 3)
+    """
+    if use_numpy and np is not None:
+        varints_array = np.frombuffer(varints, dtype=np.uint8)
+        # The last byte of every varint has the high bit clear
+        ends = np.flatnonzero(varints_array < VARINT_BIT)
+        used: int = int(ends[-1]) + 1 if len(ends) > 0 else 0
+        if len(ends) == used:
+            # The common case, every varint is one byte
+            return varints_array[:used].astype(np.int64), used
+        if len(ends) == 0:
+            return np.zeros(0, dtype=np.int64), 0
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        if np.max(ends - starts) >= 9:
+            raise ValueError("a varint is too long")
+        # Shift the 7 bits of every byte to their place in its number and add the bytes of every number
+        shifts = (np.arange(used) - np.repeat(starts, ends - starts + 1)) * 7
+        low_bits = (varints_array[:used] & (VARINT_BIT - 1)).astype(np.int64) << shifts
+        return np.add.reduceat(low_bits, starts), used
+
+    numbers: List[int] = []
+    number: int = 0
+    shift: int = 0
+    used = 0
+    for position, byte in enumerate(varints):
+        number |= (byte & (VARINT_BIT - 1)) << shift
+        shift += 7
+        if byte < VARINT_BIT:
+            numbers.append(number)
+            number, shift = 0, 0
+            used = position + 1
+    return numbers, used
+
+
+def parse_sizes(sizes_text: bytes, use_numpy: bool = True) -> Sequence[int]:
+    """
+    Parse the numbers of repeats from the sizes line of an RLE file.
+
+    Args:
+        sizes_text (bytes): Numbers separated by commas.
+        use_numpy (bool, optional): Parse the numbers with numpy when it is installed. Defaults to True.
+
+    Returns:
+        Sequence[int]: The numbers.
+
+    Example:
+        parse_sizes(b'3,1,2') -> [3, 1, 2]
+    """
+    if not use_numpy or np is None:
+        return [int(size) for size in sizes_text.split(b',')]
+    with warnings.catch_warnings():
+        # Older numpy only warns when the text has something that is not a number
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            sizes = np.fromstring(sizes_text, dtype=np.int64, sep=',')
+        except DeprecationWarning as e:
+            raise ValueError(str(e))
+    if len(sizes) != sizes_text.count(b',') + 1:
+        raise ValueError("the sizes are not numbers separated by commas")
+    return sizes
+
+
+class RleDecoder:
+    """
+    Decodes run-length encoded data one batch of runs at a time.
+    The chunk of a run is repeat_size bytes, but the last chunk of a block is shorter when repeat_size
+    does not divide it, so the decoder remembers where it is inside the block from one batch to the next.
+    """
+    def __init__(self, repeat_size: int, use_numpy: bool = True, block_size: int = KILO) -> None:
+        """
+        A constructor for a RleDecoder object.
+        :param repeat_size: The size of the repeated chunks.
+        :param use_numpy: Expand the runs with numpy when it is installed.
+        :param block_size: The size of the blocks that were encoded alone, a kilobyte in the RLE format.
+        """
+        if repeat_size < 1:
+            raise ValueError("wrong repeat size")
+        if block_size < 1:
+            raise ValueError("wrong block size")
+        self.__repeat_size: int = repeat_size
+        self.__use_numpy: bool = use_numpy and np is not None
+        # A block has whole chunks, and one short chunk at its end if there are bytes left
+        self.__whole_chunks, self.__rest = divmod(block_size, repeat_size)
+        self.__block_chunks: int = self.__whole_chunks + (self.__rest > 0)
+        self.__chunk_position: int = 0
+
+    def chunk_lengths(self, sizes: Sequence[int]) -> Sequence[int]:
+        """
+        Find the length of the chunk of every run, and move on to the chunk after the last run.
+
+        Args:
+            sizes (Sequence[int]): The number of repeats of every run.
+
+        Returns:
+            Sequence[int]: The length of the chunk of every run.
+
+        Example:
+            RleDecoder(3).chunk_lengths([333, 1, 2]) -> [3, 1, 3]
+        """
+        if self.__use_numpy:
+            sizes_array = np.asarray(sizes, dtype=np.int64)
+            ends = np.cumsum(sizes_array) + self.__chunk_position
+            positions = (ends - sizes_array) % self.__block_chunks
+            if len(sizes_array) == 0:
+                return sizes_array
+            # A run never goes on to the next block
+            if sizes_array.min() < 1 or np.any(positions + sizes_array > self.__block_chunks):
+                raise ValueError("the sizes dont match the repeat size")
+            self.__chunk_position = int(ends[-1] % self.__block_chunks)
+            return np.where(positions == self.__whole_chunks, self.__rest, self.__repeat_size)
+
+        lengths: List[int] = []
+        for size in sizes:
+            if size < 1 or self.__chunk_position + size > self.__block_chunks:
+                raise ValueError("the sizes dont match the repeat size")
+            lengths.append(self.__rest if self.__chunk_position == self.__whole_chunks else self.__repeat_size)
+            self.__chunk_position = (self.__chunk_position + size) % self.__block_chunks
+        return lengths
+
+    def decode(self, sizes: Sequence[int], read_chunks: Callable[[int], bytes]) -> bytes:
+        """
+        Expand a batch of runs.
+
+        Args:
+            sizes (Sequence[int]): The number of repeats of every run.
+            read_chunks (Callable[[int], bytes]): Gives the next chunks of the runs, like the read of a file.
+                The last chunk may be shorter than the repeat size when it is the end of the data.
+
+        Returns:
+            bytes: The original data of the runs.
+
+        Example:
+            RleDecoder(1).decode([3, 1, 2], io.BytesIO(b'abc').read) -> b'aaabcc'
+        """
+        if len(sizes) == 0:
+            return b''
+        if self.__use_numpy:
+            sizes = np.asarray(sizes, dtype=np.int64)
+        lengths: Any = self.chunk_lengths(sizes)
+        chunks_size: int = int(lengths.sum()) if self.__use_numpy else sum(lengths)
+        chunks: bytes = read_chunks(chunks_size)
+        missing: int = chunks_size - len(chunks)
+        if missing < 0 or (missing > 0 and missing >= lengths[-1]):
+            raise ValueError("the data doesnt match the sizes")
+        if self.__use_numpy:
+            lengths[-1] -= missing
+            return self.__decode_numpy(chunks, sizes, lengths)
+
+        original_parts: List[bytes] = []
+        position: int = 0
+        for size, length in zip(sizes, lengths):
+            original_parts.append(chunks[position: position + length] * size)
+            position += length
+        return b''.join(original_parts)
+
+    def __decode_numpy(self, chunks: bytes, sizes: Any, lengths: Any) -> bytes:
+        """
+        Expand a batch of runs with numpy, see decode.
+
+        Args:
+            chunks (bytes): The chunks of the runs one after the other.
+            sizes (np.ndarray): The number of repeats of every run.
+            lengths (np.ndarray): The length of the chunk of every run.
+
+        Returns:
+            bytes: The original data of the runs.
+        """
+        chunks_array = np.frombuffer(chunks, dtype=np.uint8)
+        if self.__repeat_size == 1:
+            # Every chunk is one byte, so every byte is just repeated
+            return np.repeat(chunks_array, sizes).tobytes()
+
+        # Every byte of the output is copied from its run's chunk, at its offset inside the run modulo the chunk length
+        original_sizes = sizes * lengths
+        original_ends = np.cumsum(original_sizes)
+        chunk_starts = np.cumsum(lengths) - lengths
+        original_parts: List[bytes] = []
+        first_run: int = 0
+        while first_run < len(sizes):
+            # Expand a few runs at a time, so the index arrays stay small
+            done: int = int(original_ends[first_run - 1]) if first_run > 0 else 0
+            last_run: int = max(int(np.searchsorted(original_ends, done + DECODE_SIZE, side='right')), first_run + 1)
+            runs = np.repeat(np.arange(first_run, last_run), original_sizes[first_run: last_run])
+            offsets = np.arange(done, int(original_ends[last_run - 1])) - (original_ends - original_sizes)[runs]
+            original_parts.append(chunks_array[chunk_starts[runs] + offsets % lengths[runs]].tobytes())
+            first_run = last_run
+        return b''.join(original_parts)
+
+
+def decode_blocks(chunks: bytes, sizes: Sequence[int], repeat_size: int = 1, use_numpy: bool = True,
+                  block_size: int = KILO) -> bytes:
+    """
+    Decode run-length encoded data, the opposite of find_runs and encode_blocks.
+
+    Args:
+        chunks (bytes): The first chunk of every run.
+        sizes (Sequence[int]): The number of repeats of every run.
+        repeat_size (int, optional): The size of the repeated chunks. Defaults to 1.
+        use_numpy (bool, optional): Expand the runs with numpy when it is installed. Defaults to True.
+        block_size (int, optional): The size of the blocks that were encoded alone. Defaults to KILO.
+
+    Returns:
+        bytes: The original data.
+
+    Example:
+        decode_blocks(b'abc', [2, 1], 2) -> b'ababc'
+    """
+    return RleDecoder(repeat_size, use_numpy, block_size).decode(sizes, io.BytesIO(chunks).read)
+
+
+def predicted_size(samples: List[bytes], repeat_size: int, block_size: int) -> int:
+    """
+    Find the size of the runs table and the chunks of samples of a file, in the RLV format.
+
+    Args:
+        samples (List[bytes]): Parts of the file.
+        repeat_size (int): The size of the repeated chunks.
+        block_size (int): The size of the blocks that are encoded alone.
+
+    Returns:
+        int: The size of the samples after compression.
+    """
+    compressed_size: int = 0
+    for sample in samples:
+        chunks, sizes = find_runs(sample, repeat_size, block_size=block_size)
+        compressed_size += len(chunks) + len(encode_varints(sizes))
+    return compressed_size
+
+
+def choose_parameters(samples: List[bytes], original_size: int, time_budget: Optional[float] = None) \
+        -> Tuple[int, int]:
+    """
+    Choose the repeat size and the block size that compress samples of a file the best.
+    The sizes are tried in order until the time budget runs out.
+
+    Args:
+        samples (List[bytes]): Parts of the file, see AUTO_WINDOWS.
+        original_size (int): The size of the whole file.
+        time_budget (Optional[float], optional): How many seconds to spend. Defaults to AUTO_TIME_FRACTION of
+            the time the whole file should take, which is measured on the first try.
+
+    Returns:
+        Tuple[int, int]: The repeat size and the block size.
+
+    Example:
+        choose_parameters([b'ab' * 5000], 10000) -> (2, 65536)
+    """
+    sample_size: int = sum(len(sample) for sample in samples)
+    if sample_size == 0:
+        return AUTO_REPEAT_SIZES[0], AUTO_BLOCK_SIZES[0]
+    start_time: float = time.perf_counter()
+    best: Tuple[int, int, int] = (predicted_size(samples, AUTO_REPEAT_SIZES[0], AUTO_BLOCK_SIZES[0]),
+                                  AUTO_REPEAT_SIZES[0], AUTO_BLOCK_SIZES[0])
+    if time_budget is None:
+        whole_file_time: float = (time.perf_counter() - start_time) * original_size / sample_size
+        time_budget = max(AUTO_MIN_TIME, AUTO_TIME_FRACTION * whole_file_time)
+
+    for repeat_size in AUTO_REPEAT_SIZES:
+        for block_size in AUTO_BLOCK_SIZES:
+            if time.perf_counter() - start_time > time_budget:
+                return best[1], best[2]
+            if (repeat_size, block_size) != (AUTO_REPEAT_SIZES[0], AUTO_BLOCK_SIZES[0]):
+                # Smaller sizes win a tie
+                best = min(best, (predicted_size(samples, repeat_size, block_size), repeat_size, block_size))
+    return best[1], best[2]
+
+
+def pack_bits(data: bytes) -> bytes:
+    """
+    PackBits encode data in one pass, the runs are found by a regular expression and the bytes between them
+    are copied as literal spans, so data without runs grows by only one byte in PACK_MAX_COUNT.
+
+    Args:
+        data (bytes): The data to encode.
+
+    Returns:
+        bytes: The control bytes, each followed by its literal span or by the repeated byte.
+
+    Example:
+        pack_bits(b'abcccccd') -> b'\\x01ab\\xfcc\\x00d'
+    """
+    parts: List[bytes] = []
+    literal_start: int = 0
+    for run in PACK_RUN.finditer(data):
+        run_start, run_end = run.span()
+        pack_literals(data, literal_start, run_start, parts)
+        run_size: int = run_end - run_start
+        if run_size <= PACK_MAX_COUNT:
+            parts.append(PACK_RUN_CONTROLS[run_size] + run.group(1))
+            literal_start = run_end
+            continue
+        full_runs, rest = divmod(run_size, PACK_MAX_COUNT)
+        parts.append((PACK_RUN_CONTROLS[PACK_MAX_COUNT] + run.group(1)) * full_runs)
+        if rest >= 3:
+            parts.append(PACK_RUN_CONTROLS[rest] + run.group(1))
+            rest = 0
+        # The last one or two bytes of a long run are cheaper as literals
+        literal_start = run_end - rest
+    pack_literals(data, literal_start, len(data), parts)
+    return b''.join(parts)
+
+
+def pack_literals(data: bytes, start: int, end: int, parts: List[bytes]) -> None:
+    """
+    Append a literal span of data to the PackBits parts, at most PACK_MAX_COUNT bytes after each control byte.
+
+    Args:
+        data (bytes): The data to encode.
+        start (int): Where the literal span starts.
+        end (int): Where the literal span ends.
+        parts (List[bytes]): The encoded parts to append to.
+    """
+    if end - start <= PACK_MAX_COUNT:
+        if end > start:
+            parts.append(PACK_LITERAL_CONTROLS[end - start])
+            parts.append(data[start: end])
+        return
+    for i in range(start, end, PACK_MAX_COUNT):
+        literals: bytes = data[i: min(i + PACK_MAX_COUNT, end)]
+        parts.append(PACK_LITERAL_CONTROLS[len(literals)])
+        parts.append(literals)
+
+
+def unpack_bits(packed: bytes) -> Tuple[bytes, int]:
+    """
+    PackBits decode data in one pass, a control byte whose span is cut at the end of packed is left for the next read.
+
+    Args:
+        packed (bytes): The encoded data.
+
+    Returns:
+        Tuple[bytes, int]: The decoded data, and how many bytes of packed were used.
+
+    Example:
+        unpack_bits(b'\\x01ab\\xfcc\\x00') -> (b'abccccc', 5)
+    """
+    parts: List[bytes] = []
+    position: int = 0
+    packed_size: int = len(packed)
+    while position < packed_size:
+        control: int = packed[position]
+        if control < PACK_SKIP:
+            end: int = position + control + 2
+            if end > packed_size:
+                break
+            parts.append(packed[position + 1: end])
+        elif control > PACK_SKIP:
+            end = position + 2
+            if end > packed_size:
+                break
+            parts.append(packed[position + 1: end] * (257 - control))
+        else:
+            end = position + 1
+        position = end
+    return b''.join(parts), position
@@ -1,6 +1,16 @@
 import compressor
+from bytecounter import ByteCounter
+from huffman import HuffmanEncoder
+from rle import encode_blocks, decode_blocks, parse_sizes, encode_varints, decode_varints, pack_bits, unpack_bits
 import extractor
 import main
+import archive
+import shutil
+import os
+import io
+import random
+import chunking
+from parallel import jobs_amount
 
 
 def test_simple():
@@ -48,3 +58,488 @@ def test_simple():
     except Exception as e:
         print(e)
     assert main.is_compressed_file(data) == ""  # Ensure is_compressed_file correctly identifies Huffman format
+
+
+def test_huf_tree_tie_breaking():
+    # Equal frequencies are merged from left to right, so the tree matches the one older versions wrote
+    chars_lst = [(b'A', 1), (b'B', 1), (b'C', 1), (b'D', 2), (b'E', 3)]
+    assert compressor.Compressor.huf_tree(chars_lst)[0].tree_str() == b'8,5,3,2,Al,Bl,Cl,Dl,El,'
+
+
+def test_byte_counter_chunks():
+    # Counting in chunks gives the same histogram and order as counting everything at once
+    data: bytes = b'hello world, ' * 50 + bytes(range(256))
+    whole, chunked = ByteCounter(), ByteCounter()
+    whole.update(data)
+    for i in range(0, len(data), 7):
+        chunked.update(data[i: i + 7])
+    assert whole.histogram == chunked.histogram
+    assert whole.sorted_chars() == chunked.sorted_chars()
+    assert compressor.Compressor.sorted_chars_repeats(b'AABBBCCCC') == [(b'A', 2), (b'B', 3), (b'C', 4)]
+
+
+def test_huffman_encoder_chunks():
+    # The packed bits are the same no matter how the data is split into chunks
+    codes = [""] * 256
+    codes[ord("a")], codes[ord("b")], codes[ord("c")] = "0", "10", "11"
+    data: bytes = b'abcabcaab' * 7
+    for use_numpy in [False, True]:
+        encoder = HuffmanEncoder(codes, use_numpy)
+        chunked: bytes = b''.join(encoder.encode(data[i: i + 5]) for i in range(0, len(data), 5)) + encoder.flush()
+        bits: str = "".join(codes[byte] for byte in data)
+        padding: int = 8 - len(bits) % 8
+        bits += "0" * padding
+        assert chunked == int(bits, 2).to_bytes(len(bits) // 8, "big") + str(padding).encode()
+
+
+def test_huffman_round_trip(tmp_path):
+    # Fibonacci frequencies give the deepest possible tree, every code length from 1 to 19
+    fib_lst = [1, 1]
+    while len(fib_lst) < 20:
+        fib_lst.append(fib_lst[-1] + fib_lst[-2])
+    data: bytes = b''.join(bytes([65 + i]) * count for i, count in enumerate(fib_lst))
+    file_path = tmp_path / "deep.txt"
+    file_path.write_bytes(data)
+    compressed: bytes = compressor.Compressor(str(file_path), "HUF").compress_huf()
+    assert extractor.extractor(compressed) == data
+
+
+def test_canonical_huffman_header(tmp_path):
+    # Files are written with canonical code lengths, files with the whole tree can still be extracted
+    with open(r"final_project_tests/already_compressed/fake_HUF.txt", 'rb') as f:
+        old_format: bytes = f.read()
+    assert extractor.extractor(old_format)[:11] == b'hello world'
+    for data in [b'a' * 10, b'abracadabra' * 20, bytes(range(256))]:
+        file_path = tmp_path / "canonical.txt"
+        file_path.write_bytes(data)
+        compressed: bytes = compressor.Compressor(str(file_path), "HUF").compress_huf()
+        assert compressed.startswith(b'HUC,txt\r\n' + str(len(data)).encode() + b',')
+        assert main.is_compressed_file(compressed) == ""
+        assert extractor.extractor(compressed) == data
+
+
+def test_streaming_extraction(tmp_path):
+    # The extracted file is written one chunk at a time, blocks of 1000 bytes that dont split evenly included
+    data: bytes = b'aaabbbbbbc' * 30000
+    file_path = tmp_path / "stream.txt"
+    file_path.write_bytes(data)
+    for method, repeat_size in [("RLE", 3), ("RLE", 1), ("HUF", 1)]:
+        assert compressor.main_compressor(str(file_path), method, repeat_size)[0] is None
+        compressed_path = tmp_path / "stream" / f"stream_{method}.txt"
+        assert extractor.main_extractor(str(compressed_path), "extracted") is None
+        assert (tmp_path / "stream" / "extracted.txt").read_bytes() == data
+    compressed_path.write_bytes(compressed_path.read_bytes()[:-3] + b'8')
+    assert extractor.main_extractor(str(compressed_path), "broken").startswith("file is not in a compressed format")
+    assert not (tmp_path / "stream" / "broken.txt").exists()
+
+
+def test_huffman_blocks(tmp_path):
+    # Every block has its own code, the second half of the data uses other chars than the first
+    data: bytes = b'abracadabra' * 300 + bytes(range(100, 200)) * 30
+    file_path = tmp_path / "blocks.txt"
+    file_path.write_bytes(data)
+    for jobs in [1, 2]:
+        assert compressor.main_compressor(str(file_path), "HUF", block_size=1000, jobs=jobs)[0] is None
+        compressed_path = tmp_path / "blocks" / "blocks_HUF.txt"
+        compressed: bytes = compressed_path.read_bytes()
+        assert compressed.startswith(b'HUB,txt\r\n' + str(len(data)).encode() + b',1000\r\n')
+        assert main.is_compressed_file(compressed) == ""
+        assert extractor.extractor(compressed) == data
+        assert extractor.main_extractor(str(compressed_path), "extracted", jobs=jobs) is None
+        assert (tmp_path / "blocks" / "extracted.txt").read_bytes() == data
+
+
+def test_rle_encoder():
+    # Each kilobyte is encoded alone, its last chunk may be shorter than the repeat size
+    assert encode_blocks(b'aaabcc') == (b'abc', b'3,1,2,')
+    assert encode_blocks(b'ab' * 1000, 2) == (b'abab', b'500,500,')
+    assert encode_blocks(b'abc' * 500, 3) == (b'abcabcabc', b'333,1,166,1,')
+    data: bytes = b'aaaaabbbcd' * 300 + bytes(range(256)) * 3
+    for repeat_size in [1, 2, 3, 7, 1000, 2000]:
+        assert encode_blocks(data, repeat_size, True) == encode_blocks(data, repeat_size, False)
+    # A kilobyte that is not longer than the repeat size is one chunk
+    assert encode_blocks(b'x' * 2500, 1000) == (b'x' * 2500, b'1,1,1,')
+
+
+def test_rle_decoder():
+    # The decoder follows the kilobytes of the encoder, so any repeat size works
+    data: bytes = b'aaaaabbbcd' * 300 + bytes(range(256)) * 3 + b'z' * 1234
+    for repeat_size in [1, 2, 3, 7, 1000, 2000]:
+        chunks, sizes = encode_blocks(data, repeat_size)
+        for use_numpy in [True, False]:
+            assert decode_blocks(chunks, parse_sizes(sizes[:-1], use_numpy), repeat_size, use_numpy) == data
+        compressed: bytes = b'RLE,txt\r\n' + str(repeat_size).encode() + b'\r\n' + sizes[:-1] + b'\r\n' + chunks
+        assert extractor.extractor(compressed) == data
+        assert extractor.extractor(compressed[:-10]).startswith("file is not in a compressed format")
+
+
+def test_rle_varints(tmp_path):
+    # The numbers of repeats are varints, a number cut at the end is left for the next read
+    for use_numpy in [True, False]:
+        assert encode_varints([3, 300, 1], use_numpy) == b'\x03\xac\x02\x01'
+        assert list(decode_varints(b'\x03\xac\x02\x01\x81', use_numpy)[0]) == [3, 300, 1]
+        assert decode_varints(b'\x03\xac\x02\x01\x81', use_numpy)[1] == 4
+    data: bytes = b'aaaaabbbcd' * 300 + bytes(range(256)) * 3
+    file_path = tmp_path / "varints.txt"
+    file_path.write_bytes(data)
+    for repeat_size, block_size in [(1, 1000), (3, 1000), (2, 77), (5, 4096)]:
+        compressed: bytes = compressor.Compressor(str(file_path), "RLE").compress_rle(repeat_size, block_size)
+        assert compressed.startswith(f'RLV,txt\r\n{repeat_size},{block_size},'.encode())
+        assert main.is_compressed_file(compressed) == ""
+        assert extractor.extractor(compressed) == data
+
+
+def test_rle_auto_parameters(tmp_path):
+    # The repeat size and the block size that were chosen are written in the header
+    data: bytes = b'ab' * 40000 + b'xyz' * 10000
+    file_path = tmp_path / "auto.txt"
+    file_path.write_bytes(data)
+    samples = compressor.Compressor(str(file_path), "RLE").read_samples(4, 1000)
+    assert len(samples) == 4 and samples[0] == data[:1000] and samples[-1] == data[-1000:]
+    assert compressor.main_compressor(str(file_path), "RLE", compressor.AUTO_REPEAT_SIZE)[0] is None
+    compressed: bytes = (tmp_path / "auto" / "auto_RLE.txt").read_bytes()
+    assert compressed.startswith(b'RLV,txt\r\n') and not compressed.startswith(b'RLV,txt\r\n1,')
+    assert len(compressed) < len(compressor.Compressor(str(file_path), "RLE").compress_rle(1))
+    assert extractor.extractor(compressed) == data
+    assert main.check_args([str(tmp_path / "folder.txt"), str(file_path), "RLE0"]) is None
+
+
+def test_packbits(tmp_path):
+    # Runs are a count and a byte, the bytes between them are literal spans, a span cut at the end is left
+    assert pack_bits(b'abcccccd') == b'\x01ab\xfcc\x00d'
+    assert pack_bits(b'a' * 300) == b'\x81a\x81a\xd5a'
+    assert unpack_bits(b'\x01ab\xfcc\x00') == (b'abccccc', 5)
+    data: bytes = bytes(range(256)) * 40 + b'a' * 5000 + b'xy' * 300
+    assert len(pack_bits(bytes(range(256)) * 40)) == 10240 + 80
+    file_path = tmp_path / "packbits.txt"
+    file_path.write_bytes(data)
+    assert compressor.main_compressor(str(file_path), "PKB")[0] is None
+    compressed_path = tmp_path / "packbits" / "packbits_PKB.txt"
+    compressed: bytes = compressed_path.read_bytes()
+    assert compressed.startswith(b'PKB,txt\r\n' + str(len(data)).encode() + b'\r\n')
+    assert main.is_compressed_file(compressed) == ""
+    assert extractor.extractor(compressed) == data
+    assert extractor.main_extractor(str(compressed_path), "extracted") is None
+    assert (tmp_path / "packbits" / "extracted.txt").read_bytes() == data
+
+
+def test_folder_archive(tmp_path):
+    # Every entry is found in the table of contents at the end of the archive and extracted alone
+    folder = tmp_path / "tree"
+    (folder / "sub" / "empty_folder").mkdir(parents=True)
+    (folder / "a.txt").write_bytes(b'aaabbbbbbc' * 3000)
+    (folder / "empty.txt").write_bytes(b'')
+    (folder / "sub" / "b.bin").write_bytes(bytes(range(256)) * 20)
+    for method in ["RLE", "HUF", "PKB"]:
+        assert compressor.main_compressor(str(folder), method, 2)[0] is None
+        archive_path = tmp_path / f"tree_{method}.txt"
+        assert main.is_compressed_folder(archive_path.read_bytes()) == ""
+        with open(archive_path, 'rb') as archive_file:
+            entries = archive.read_toc(archive_file)
+        assert [entry.name for entry in entries] == ["tree", "tree/a.txt", "tree/empty.txt", "tree/sub",
+                                                     "tree/sub/b.bin", "tree/sub/empty_folder"]
+        assert entries[1].original_size == 30000 and entries[4].method == archive_path.read_bytes()[
+            entries[4].offset: entries[4].offset + 3]
+        assert extractor.extract_archive(str(archive_path), str(tmp_path / method)) is None
+        for name in ["a.txt", "empty.txt", "sub/b.bin"]:
+            assert (tmp_path / method / "tree" / name).read_bytes() == (folder / name).read_bytes()
+        assert (tmp_path / method / "tree" / "sub" / "empty_folder").is_dir()
+    assert archive.is_archive(archive_path.read_bytes()[:-1]) != ""
+    bad_entry = archive.ArchiveEntry("../a.txt", b'PKB', 7).pack()
+    try:
+        archive.unpack_toc(bad_entry, 1, 7)
+        assert False
+    except ValueError:
+        pass
+
+
+def test_archive_reader(tmp_path):
+    # Only the entries that are asked for are extracted, two entries can be read at the same time
+    folder = tmp_path / "configs"
+    (folder / "sub").mkdir(parents=True)
+    (folder / "big.txt").write_bytes(b'abracadabra' * 20000)
+    (folder / "sub" / "config.ini").write_bytes(b'[main]\njobs=4\n')
+    assert compressor.main_compressor(str(folder), "HUF")[0] is None
+    with extractor.ArchiveReader(str(tmp_path / "configs_HUF.txt")) as reader:
+        assert reader.names() == ["configs", "configs/big.txt", "configs/sub", "configs/sub/config.ini"]
+        assert reader.entry("configs/sub/config.ini").original_size == 14
+        assert reader.read("configs/sub/config.ini") == b'[main]\njobs=4\n'
+        big_chunks = reader.iter_read("configs/big.txt")
+        first_chunk: bytes = next(big_chunks)
+        assert reader.read("configs/sub/config.ini") == b'[main]\njobs=4\n'
+        assert first_chunk + b''.join(big_chunks) == b'abracadabra' * 20000
+        for name, error in [("configs/missing.txt", KeyError), ("configs/sub", IsADirectoryError)]:
+            try:
+                reader.read(name)
+                assert False
+            except error:
+                pass
+
+
+def test_add_file_to_archive(tmp_path, monkeypatch):
+    # The new file is written after the footer, nothing of the archive is written over
+    folder = tmp_path / "tree"
+    folder.mkdir()
+    (folder / "a.txt").write_bytes(b'aaabbbbbbc' * 3000)
+    (tmp_path / "new.txt").write_bytes(b'new file ' * 100)
+    assert compressor.main_compressor(str(folder), "HUF")[0] is None
+    archive_path = tmp_path / "tree_HUF.txt"
+    old_archive: bytes = archive_path.read_bytes()
+    assert main.is_compressed_folder_file(str(archive_path)) == ""
+    # A failure after the new file is written, before the new footer, leaves the archive as it was
+    add_file = archive.ArchiveWriter.add_file
+
+    def add_file_and_fail(self, *args):
+        add_file(self, *args)
+        raise OSError("no space left on device")
+    monkeypatch.setattr(archive.ArchiveWriter, "add_file", add_file_and_fail)
+    assert main.add_file_to_exist(str(tmp_path / "new.txt"), str(archive_path), "PKB")[0] is not None
+    assert archive_path.read_bytes() == old_archive
+    monkeypatch.undo()
+    for _ in range(2):
+        assert main.add_file_to_exist(str(tmp_path / "new.txt"), str(archive_path), "PKB")[0] is None
+    assert archive_path.read_bytes()[:len(old_archive)] == old_archive
+    with extractor.ArchiveReader(str(archive_path)) as reader:
+        # Adding the same name again replaces the entry
+        assert reader.names() == ["tree", "tree/a.txt", "tree/new.txt"]
+        assert reader.entry("tree/new.txt").method == b'PKB'
+    assert extractor.extract_archive(str(archive_path), str(tmp_path / "out")) is None
+    assert (tmp_path / "out" / "tree" / "new.txt").read_bytes() == b'new file ' * 100
+    assert (tmp_path / "out" / "tree" / "a.txt").read_bytes() == b'aaabbbbbbc' * 3000
+
+
+def test_parallel_folder_compression(tmp_path):
+    # The biggest files are compressed first, the archive is the same for any number of processes
+    folder = tmp_path / "tree"
+    (folder / "sub").mkdir(parents=True)
+    for i in range(6):
+        (folder / f"file{i}.txt").write_bytes(b'abcabd' * 1000 * i)
+        (folder / "sub" / f"file{i}.txt").write_bytes(bytes(range(i * 40)))
+    # One process unless more are asked for, 0 is one for each core
+    assert jobs_amount() == 1
+    assert jobs_amount(0) == (os.cpu_count() or 1)
+    archives = []
+    for jobs in [1, 3]:
+        assert compressor.main_compressor(str(folder), "HUF", jobs=jobs)[0] is None
+        archives.append((tmp_path / "tree_HUF.txt").read_bytes())
+    assert archives[0] == archives[1]
+    with extractor.ArchiveReader(str(tmp_path / "tree_HUF.txt")) as reader:
+        assert reader.names()[:3] == ["tree", "tree/file0.txt", "tree/file1.txt"]
+        assert reader.entry("tree/file5.txt").offset < reader.entry("tree/file4.txt").offset
+        assert reader.read("tree/sub/file3.txt") == bytes(range(120))
+
+
+def test_parallel_folder_extraction(tmp_path):
+    # The files are extracted on a pool of processes, the output is the same as with one process
+    folder = tmp_path / "tree"
+    (folder / "sub" / "deeper").mkdir(parents=True)
+    for i in range(5):
+        (folder / f"file{i}.txt").write_bytes(b'xyzzy' * 2000 * i)
+        (folder / "sub" / "deeper" / f"file{i}.bin").write_bytes(bytes(range(i * 50)))
+    assert compressor.main_compressor(str(folder), "RLE", 2)[0] is None
+    for jobs in [1, 3]:
+        assert extractor.extract_archive(str(tmp_path / "tree_RLE.txt"), str(tmp_path / f"out{jobs}"), jobs) is None
+        for i in range(5):
+            for name in [f"file{i}.txt", f"sub/deeper/file{i}.bin"]:
+                assert (tmp_path / f"out{jobs}" / "tree" / name).read_bytes() == (folder / name).read_bytes()
+
+
+def test_text_header_folder_extraction(tmp_path):
+    # The header line gives where each compressed file is, the files after a sub folder are found too
+    files = {"a.txt": b'aaabbbbbbc' * 100, "s1/b.txt": b'hello world ' * 50, "s2/c.txt": bytes(range(256))}
+    for name, data in files.items():
+        (tmp_path / "original" / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / "original" / name).write_bytes(data)
+    compressed = {name: compressor.compress_file(str(tmp_path / "original" / name), "HUF")[0] for name in files}
+    root: str = str(tmp_path / "tree")
+    header: str = (f'{root}[a.txt,{len(compressed["a.txt"])},{root}/s1[b.txt,{len(compressed["s1/b.txt"])}],'
+                   f'{root}/s2[c.txt,{len(compressed["s2/c.txt"])}]]')
+    (tmp_path / "tree.txt").write_bytes(header.encode() + b'\r\n' + b''.join(compressed.values()))
+    assert main.is_compressed_folder((tmp_path / "tree.txt").read_bytes()) == ""
+    assert extractor.parse_folder_header("a[x,3,a/b[y,4]]") == (['a', 'a/b'], [('x', 'a', 3), ('y', 'a/b', 4)])
+    for jobs in [1, 2]:
+        assert extractor.main_extractor(str(tmp_path / "tree.txt"), jobs=jobs) is None
+        for name, data in files.items():
+            assert (tmp_path / "tree" / name).read_bytes() == data
+    (tmp_path / "cut.txt").write_bytes((tmp_path / "tree.txt").read_bytes()[:-10])
+    assert extractor.main_extractor(str(tmp_path / "cut.txt")) is not None
+
+
+def test_files_to_one_archive(tmp_path):
+    # The chosen files are written one after another into an archive, huffman entries without keeping them in memory
+    files = {"a.txt": b'aaabbbbbbc' * 1000, "b.txt": b'hello world ' * 500, "c.bin": bytes(range(256)) * 4}
+    for name, data in files.items():
+        (tmp_path / name).write_bytes(data)
+    assert main.compress_files_to_one_file([str(tmp_path / "joined"), str(tmp_path / "a.txt"), "HUF",
+                                            str(tmp_path / "b.txt"), "RLE2", str(tmp_path / "c.bin"), "PKB"])[0] is None
+    with open(tmp_path / "joined.txt", 'rb') as archive_file:
+        entries = archive.read_toc(archive_file)
+    assert [(entry.name, entry.method) for entry in entries] == [
+        ("joined", archive.FOLDER_METHOD), ("joined/a.txt", b'HUC'), ("joined/b.txt", b'RLV'), ("joined/c.bin", b'PKB')]
+    (tmp_path / "joined").mkdir()
+    assert extractor.main_extractor(str(tmp_path / "joined.txt")) is None
+    for name, data in files.items():
+        assert (tmp_path / "joined" / name).read_bytes() == data
+    assert main.compress_files_to_one_file([str(tmp_path / "bad"), str(tmp_path / "missing.txt"), "HUF"])[0] is not None
+    assert not (tmp_path / "bad.txt").exists()
+
+
+def test_folder_deduplication(tmp_path):
+    # Files with the same content are stored once and the copies point to the same data
+    data: bytes = b'vendored copy ' * 2000
+    for name in ["tree/a.txt", "tree/lib/a.txt", "tree/lib2/a.txt", "tree/b.txt"]:
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data if "a.txt" in name else data[:-1] + b'!')
+    assert compressor.main_compressor(str(tmp_path / "tree"), "HUF")[0] is None
+    with open(tmp_path / "tree_HUF.txt", 'rb') as archive_file:
+        entries = {entry.name: entry for entry in archive.read_toc(archive_file)}
+    copies = [entries[name] for name in ["tree/a.txt", "tree/lib/a.txt", "tree/lib2/a.txt"]]
+    assert len({(entry.offset, entry.compressed_size) for entry in copies}) == 1
+    assert entries["tree/b.txt"].offset != copies[0].offset
+    assert compressor.find_duplicates([("x", str(tmp_path / "tree/a.txt"), len(data)),
+                                       ("y", str(tmp_path / "tree/b.txt"), len(data))], 1) == {}
+    shutil.rmtree(tmp_path / "tree")
+    assert extractor.main_extractor(str(tmp_path / "tree_HUF.txt")) is None
+    assert (tmp_path / "tree/lib2/a.txt").read_bytes() == data
+    assert (tmp_path / "tree/b.txt").read_bytes() == data[:-1] + b'!'
+
+
+def test_chunked_folder(tmp_path):
+    # Versions of a dump share most of their chunks, each distinct chunk is stored once
+    rand = random.Random(0)
+    dump: bytes = bytes(rand.choice(b'abcdefgh \n') for _ in range(300000))
+    assert chunking.find_cuts(dump, True, True) == chunking.find_cuts(dump, True, False)
+    assert b''.join(chunking.iter_chunks(io.BytesIO(dump), 50000)) == dump
+    (tmp_path / "dumps").mkdir()
+    for version in range(4):
+        (tmp_path / "dumps" / f"v{version}.log").write_bytes(dump[:1000 * version] + b'edit' + dump[1000 * version:])
+    (tmp_path / "dumps" / "empty.log").write_bytes(b'')
+    for method in ["HUF", "RLE", "PKB"]:
+        assert compressor.main_compressor(str(tmp_path / "dumps"), method)[0] is None
+        archive_path = tmp_path / f"dumps_{method}.txt"
+        whole_files_size: int = archive_path.stat().st_size
+        chunking_stats = chunking.ChunkingStats()
+        assert compressor.main_compressor(str(tmp_path / "dumps"), method, chunking=True,
+                                          chunking_stats=chunking_stats)[0] is None
+        assert archive_path.stat().st_size < whole_files_size / 2
+        # The 4 versions share most of their chunks
+        assert chunking_stats.total_size == 4 * (len(dump) + 4)
+        assert 2 < chunking_stats.dedup_ratio() <= 4
+        assert chunking_stats.throughput() > 0
+        with extractor.ArchiveReader(str(archive_path)) as reader:
+            assert reader.entry("dumps/v2.log").method == archive.CHUNKED_METHOD
+            assert reader.read("dumps/v3.log") == dump[:3000] + b'edit' + dump[3000:]
+            assert reader.read("dumps/empty.log") == b''
+        assert extractor.extract_archive(str(archive_path), str(tmp_path / method)) is None
+        assert (tmp_path / method / "dumps" / "v1.log").read_bytes() == dump[:1000] + b'edit' + dump[1000:]
+
+
+def test_incremental_folder(tmp_path, monkeypatch):
+    # Only the files that changed since the last archive are compressed again, the others are copied
+    (tmp_path / "tree" / "sub").mkdir(parents=True)
+    for i in range(4):
+        (tmp_path / "tree" / "sub" / f"f{i}.txt").write_bytes(f'file {i} '.encode() * 3000)
+    compressed = []
+    compress_file = compressor.compress_file
+    monkeypatch.setattr(compressor, "compress_file", lambda *args: compressed.append(args[0]) or compress_file(*args))
+    for chunking_on in [False, True]:
+        compressed.clear()
+        assert compressor.main_compressor(str(tmp_path / "tree"), "HUF", jobs=1, chunking=chunking_on,
+                                          incremental=True)[0] is None
+        assert (tmp_path / "tree_HUF_manifest.json").is_file()
+        first_run: int = len(compressed)
+        compressed.clear()
+        (tmp_path / "tree" / "sub" / "f1.txt").write_bytes(f'changed {chunking_on} '.encode() * 3000)
+        os.utime(tmp_path / "tree" / "sub" / "f2.txt")
+        assert compressor.main_compressor(str(tmp_path / "tree"), "HUF", jobs=1, chunking=chunking_on,
+                                          incremental=True)[0] is None
+        assert 0 < len(compressed) < first_run
+        assert all(path.endswith("f1.txt") for path in compressed)
+        with extractor.ArchiveReader(str(tmp_path / "tree_HUF.txt")) as reader:
+            assert reader.read("tree/sub/f1.txt") == f'changed {chunking_on} '.encode() * 3000
+            assert reader.read("tree/sub/f2.txt") == b'file 2 ' * 3000
+    # A manifest of another archive is not used
+    assert compressor.main_compressor(str(tmp_path / "tree"), "HUF", jobs=1)[0] is None
+    compressed.clear()
+    assert compressor.main_compressor(str(tmp_path / "tree"), "HUF", jobs=1, incremental=True)[0] is None
+    assert len(compressed) == 4
+
+
+def test_solid_folder(tmp_path):
+    # The small files of each type share one huffman code, its code lengths are written once
+    rand = random.Random(0)
+    words = [bytes(rand.choice(b'abcdefghij') for _ in range(rand.randint(2, 8))) for _ in range(100)]
+    files = {f"tree/notes/n{i}.txt": b' '.join(rand.choice(words) for _ in range(rand.randint(5, 50)))
+             for i in range(60)}
+    files.update({"tree/one.bin": b'zzzz', "tree/empty.bin": b'', "tree/big.txt": b' '.join(words) * 1000})
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    assert compressor.main_compressor(str(tmp_path / "tree"), "HUF", jobs=1)[0] is None
+    own_codes_size: int = (tmp_path / "tree_HUF.txt").stat().st_size
+    assert compressor.main_compressor(str(tmp_path / "tree"), "HUF", jobs=1, solid=True)[0] is None
+    assert (tmp_path / "tree_HUF.txt").stat().st_size < own_codes_size
+    with extractor.ArchiveReader(str(tmp_path / "tree_HUF.txt")) as reader:
+        assert reader.entry("tree/notes/n3.txt").method == archive.SOLID_METHOD
+        assert reader.entry("tree/big.txt").method == b'HUC'
+        # Two files with the same code can be read at the same time
+        both = list(zip(reader.iter_read("tree/notes/n1.txt"), reader.iter_read("tree/notes/n2.txt")))
+        assert b''.join(first for first, _ in both) == files["tree/notes/n1.txt"]
+        assert b''.join(second for _, second in both) == files["tree/notes/n2.txt"]
+        for name, data in files.items():
+            assert reader.read(name) == data
+    assert compressor.main_compressor(str(tmp_path / "tree"), "RLE", solid=True)[0] is not None
+    # A file with a shared code is copied with its code table
+    assert compressor.main_compressor(str(tmp_path / "tree"), "HUF", jobs=1, solid=True, incremental=True)[0] is None
+    (tmp_path / "tree" / "notes" / "n0.txt").write_bytes(b'changed')
+    assert compressor.main_compressor(str(tmp_path / "tree"), "HUF", jobs=1, solid=True, incremental=True)[0] is None
+    shutil.rmtree(tmp_path / "tree")
+    assert extractor.main_extractor(str(tmp_path / "tree_HUF.txt")) is None
+    assert (tmp_path / "tree" / "notes" / "n0.txt").read_bytes() == b'changed'
+    assert (tmp_path / "tree" / "notes" / "n9.txt").read_bytes() == files["tree/notes/n9.txt"]
+    # Two types of files with the same code share one code table, it is counted once in the efficiency
+    (tmp_path / "same").mkdir()
+    (tmp_path / "same" / "a.txt").write_bytes(b'aabc' * 100)
+    (tmp_path / "same" / "b.log").write_bytes(b'caab' * 100)
+    problem, efficiency = compressor.main_compressor(str(tmp_path / "same"), "HUF", solid=True)
+    assert problem is None
+    with extractor.ArchiveReader(str(tmp_path / "same_HUF.txt")) as reader:
+        data_size: int = sum(reader.entry(name).compressed_size for name in ["same/a.txt", "same/b.log"])
+    # A code length for each byte value up to b'c', and b'\r\n'
+    code_table_size: int = ord('c') + 1 + 2
+    assert efficiency == 800 - data_size - code_table_size
+
+
+def test_auto_method_folder(tmp_path):
+    # Each file gets the method that is predicted to compress it the best, recorded in its entry
+    rand = random.Random(0)
+    files = {"tree/text.txt": b' '.join(bytes(rand.choice(b'abcdefghij') for _ in range(rand.randint(2, 8)))
+                                        for _ in range(20000)),
+             "tree/runs.bmp": b''.join(bytes([rand.randrange(256)]) * rand.randint(50, 300) for _ in range(500)),
+             "tree/media/photo.jpg": rand.randbytes(50000), "tree/empty.txt": b''}
+    for name, data in files.items():
+        (tmp_path / name).parent.mkdir(parents=True, exist_ok=True)
+        (tmp_path / name).write_bytes(data)
+    assert compressor.choose_method([files["tree/text.txt"]], len(files["tree/text.txt"])) == "HUF"
+    assert compressor.choose_method([files["tree/runs.bmp"]], len(files["tree/runs.bmp"])) == "RLE"
+    assert compressor.choose_method([files["tree/media/photo.jpg"]], 50000) == compressor.STORE_METHOD
+    assert compressor.main_compressor(str(tmp_path / "tree"), compressor.AUTO_METHOD, compressor.AUTO_REPEAT_SIZE,
+                                      jobs=1)[0] is None
+    with extractor.ArchiveReader(str(tmp_path / "tree_AUTO.txt")) as reader:
+        assert reader.entry("tree/text.txt").method == b'HUC'
+        assert reader.entry("tree/runs.bmp").method == b'RLV'
+        assert reader.entry("tree/media/photo.jpg").method == b'STO'
+        # A stored file grows only by its header
+        assert reader.entry("tree/media/photo.jpg").compressed_size < 50000 + 20
+        for name, data in files.items():
+            assert reader.read(name) == data
+    for method in ["RLE", "HUF"]:
+        assert compressor.main_compressor(str(tmp_path / "tree"), method, jobs=1)[0] is None
+        assert (tmp_path / "tree_AUTO.txt").stat().st_size < (tmp_path / f"tree_{method}.txt").stat().st_size
+    assert compressor.main_compressor(str(tmp_path / "tree"), compressor.AUTO_METHOD, solid=True)[0] is not None
+    # A single file is written in the format of the method that is chosen for it
+    assert compressor.main_compressor(str(tmp_path / "tree" / "media" / "photo.jpg"), compressor.AUTO_METHOD)[0] is None
+    compressed_path = tmp_path / "tree" / "media" / "photo" / "photo_STO.txt"
+    assert main.is_compressed_file(compressed_path.read_bytes()) == ""
+    assert extractor.main_extractor(str(compressed_path), "extracted") is None
+    assert (tmp_path / "tree" / "media" / "photo" / "extracted.jpg").read_bytes() == files["tree/media/photo.jpg"]
@@ -3,6 +3,7 @@ import main
 import extractor
 import os
 import time
+from chunking import ChunkingStats
 from typing import List, Union
 
 
@@ -55,27 +56,100 @@ def get_repeat_size() -> int:
 
     The function prompts the user to enter a repeat size until a valid one is provided.
     Validity criteria:
-    - The repeat size must be a positive integer.
+    - The repeat size must be a positive integer, or 0 to choose it automatically.
 
     :return: The repeat size provided by the user.
     """
     user_input: int = -1  # Initialize user input variable
     while True:  # Continue loop until break
-        input1: str = input("What repeat size would you like?\n! - exit\n---> ")  # Prompt user for repeat size
+        input1: str = input("What repeat size would you like?\n0 - choose automatically"
+                            "\n! - exit\n---> ")  # Prompt user for repeat size
         if input1 == "!":  # Check if user wants to exit
             break
         try:
             user_input = int(input1)  # Convert input to integer
         except ValueError:  # Handle the case where input is not a valid integer
-            print("Repeat size must be a positive integer.")  # Print error message
+            print("Repeat size must be a positive integer or 0.")  # Print error message
             continue  # Continue loop to prompt user again
-        if user_input < 1 or user_input % 1 != 0:  # Check if input is not a positive integer
-            print("Repeat size must be a positive integer.")  # Print error message
+        # Check if input is not a positive integer or the automatic choice
+        if user_input < compressor.AUTO_REPEAT_SIZE or user_input % 1 != 0:
+            print("Repeat size must be a positive integer or 0.")  # Print error message
             continue  # Continue loop to prompt user again
         break  # Exit loop
     return user_input  # Return repeat size provided by the user
 
 
+def get_huf_block_size() -> int:
+    """
+    Ask the user if the Huffman coding should be done in blocks, every block with its own code.
+    The blocks are compressed on all the cores, so big files are compressed faster.
+
+    :return: The block size, 0 for one code for the whole file, -1 if the user wants to exit.
+    """
+    while True:  # Continue loop until break
+        user_input: str = input("Compress in blocks on all the cores?\n1 - yes   2 - no\n! - exit\n---> ")
+        if user_input == "!":  # Check if user wants to exit
+            return -1
+        if user_input == "1":  # Check if user chose blocks
+            return compressor.HUF_BLOCK_SIZE
+        if user_input == "2":  # Check if user chose one code
+            return 0
+
+
+def get_chunking() -> int:
+    """
+    Ask the user if the files of a folder should be cut into chunks, so the parts that are the same in a few files
+    are stored once.
+
+    :return: 1 to cut the files into chunks, 0 to compress each file whole, -1 if the user wants to exit.
+    """
+    while True:  # Continue loop until break
+        user_input: str = input("Store the parts that are the same in a few files once?\n1 - yes   2 - no\n"
+                                "! - exit\n---> ")
+        if user_input == "!":  # Check if user wants to exit
+            return -1
+        if user_input == "1":  # Check if user chose chunks
+            return 1
+        if user_input == "2":  # Check if user chose whole files
+            return 0
+
+
+def get_solid() -> int:
+    """
+    Ask the user if the small files of a folder should share one Huffman code for each type of file,
+    so each small file does not need a code of its own.
+
+    :return: 1 for a shared code, 0 for a code for each file, -1 if the user wants to exit.
+    """
+    while True:  # Continue loop until break
+        user_input: str = input("Use one code for all the small files of the same type?\n1 - yes   2 - no\n"
+                                "! - exit\n---> ")
+        if user_input == "!":  # Check if user wants to exit
+            return -1
+        if user_input == "1":  # Check if user chose a shared code
+            return 1
+        if user_input == "2":  # Check if user chose a code for each file
+            return 0
+
+
+def get_incremental() -> int:
+    """
+    Ask the user if only the files that changed since the last compression of the folder should be compressed,
+    the other files are copied from the archive of the last time.
+
+    :return: 1 to compress only the files that changed, 0 to compress all the files, -1 if the user wants to exit.
+    """
+    while True:  # Continue loop until break
+        user_input: str = input("The folder was compressed before, compress only the files that changed?\n"
+                                "1 - yes   2 - no\n! - exit\n---> ")
+        if user_input == "!":  # Check if user wants to exit
+            return -1
+        if user_input == "1":  # Check if user chose only the changed files
+            return 1
+        if user_input == "2":  # Check if user chose all the files
+            return 0
+
+
 def get_file_to_compress(file_kind: str) -> str:
     """
     Gets an existing file name from the user and returns it.
@@ -108,7 +182,7 @@ def get_file_to_compress(file_kind: str) -> str:
     return file_name  # Return file name provided by the user
 
 
-def get_compress_method() -> str:
+def get_compress_method(allow_auto: bool = False) -> str:
     """
     Gets a compress method from the user and returns it.
 
@@ -116,14 +190,18 @@ def get_compress_method() -> str:
     Valid options:
     - '1' for run-length encoding (RLE)
     - '2' for Huffman coding (HUF)
+    - '3' for run-length encoding of runs and literal spans (PKB)
+    - '4' for a method chosen for each file (AUTO), only if allow_auto is True
 
+    :param allow_auto: If the method can be chosen for each file, for a folder.
     :return: The compression method chosen by the user.
     """
     method_input: str = ""  # Initialize user input variable
     compress_method: str = ""  # Initialize compression method variable
+    auto_option: str = "   4 - Automatic for each file" if allow_auto else ""
     while method_input != '!':  # Continue loop until user enters "!"
-        method_input = input("What compression method do you want?\n1 - Run-length encoding   2 - Huffman coding\n"
-                             "! - exit\n---> ")  # Prompt user for compression method choice
+        method_input = input("What compression method do you want?\n1 - Run-length encoding   2 - Huffman coding"
+                             f"   3 - PackBits{auto_option}\n! - exit\n---> ")  # Prompt user for compression method
         if method_input == '!':  # Check if user wants to exit
             break
         if method_input == '1':  # Check if user chose RLE
@@ -132,22 +210,30 @@ def get_compress_method() -> str:
         elif method_input == '2':  # Check if user chose Huffman coding
             compress_method = "HUF"  # Set compression method to HUF
             break  # Exit loop
+        elif method_input == '3':  # Check if user chose PackBits
+            compress_method = "PKB"  # Set compression method to PKB
+            break  # Exit loop
+        elif method_input == '4' and allow_auto:  # Check if user chose a method for each file
+            compress_method = compressor.AUTO_METHOD  # Set compression method to AUTO
+            break  # Exit loop
     return compress_method  # Return compression method chosen by the user
 
 
-def chose_one() -> None:
+def chose_one(jobs: int = 1) -> None:
     """
     Gets a file name and compresses it.
 
     Prompts the user to provide a file name, then chooses a compression method and applies it.
     Prints the efficiency of compression and the time taken.
+
+    :param jobs: The number of processes for Huffman blocks, 0 for one for each core.
     """
     file: str = get_file_to_compress("compress")  # Get file name from user
     if file == "":
         return None
     if os.path.getsize(file) == 0:
         print("There is nothing to compress.")
-        chose_one()
+        chose_one(jobs)
         return None
 
     method: str = get_compress_method()  # Get compression method from user
@@ -158,29 +244,22 @@ def chose_one() -> None:
         repeat_size = get_repeat_size()  # Get repeat size for RLE compression
     if repeat_size == -1:
         return None
-
-    if method == "RLE":
-        stop: float = os.path.getsize(file) / repeat_size
-        if stop > 4 * 10 ** 5:
-            print(f"File is too big for run-length encoding with repeat size {repeat_size}.")
-            chose_one()
-            return None
+    block_size: int = 0
     if method == "HUF":
-        if os.path.getsize(file) > 3 * 10 ** 6:
-            print("File is too big for Huffman coding.")
-            chose_one()
-            return None
+        block_size = get_huf_block_size()  # Get block size for Huffman coding
+    if block_size == -1:
+        return None
 
     start_time: float = time.time()  # Record start time for compression
     if method == "RLE":
         problem, efficiency = compressor.main_compressor(file, method, repeat_size=repeat_size)  # Compress file
     else:
-        problem, efficiency = compressor.main_compressor(file, method)  # Compress file
+        problem, efficiency = compressor.main_compressor(file, method, block_size=block_size, jobs=jobs)
     end_time: float = time.time()  # Record end time for compression
     if problem is not None:
         print(problem)
         time.sleep(3)
-        chose_one()
+        chose_one(jobs)
         return None
     print(f"The efficiency of the compression is {efficiency} bytes.")
     print(f"This compression took {end_time - start_time} seconds.")
@@ -188,43 +267,19 @@ def chose_one() -> None:
     return None
 
 
-def check_all_files_in_folder(folder: str, method: str, repeat_size: int) -> None:
-    """
-    Prints all the files that will not be compressed.
-
-    :param folder: The folder path.
-    :param method: The compression method.
-    :param repeat_size: The repeat size for the RLE compression.
-    :return: None
-    """
-    files_lst: List[str] = [str(f.name) for f in os.scandir(folder) if f.is_file()]  # List of files in folder
-    for file in files_lst:
-        file_path = os.path.join(folder, file)
-        if os.path.getsize(file_path) > 3 * 10 ** 6 and method == "HUF":
-            print(f'{file} is too big and will not compress')  # Print message for files too big for HUF
-            time.sleep(2)
-        if os.path.getsize(file_path) > 4 * 10 ** 5 / repeat_size and method == "RLE":
-            print(f'{file} is too big and will not compress')  # Print message for files too big for RLE
-            time.sleep(2)
-        if os.path.getsize(file_path) == 0 and method == "HUF":
-            print(f'{file} is empty and will not compress')  # Print message for empty files for HUF
-            time.sleep(2)
-    folders_lst: List[str] = [str(f.name) for f in os.scandir(folder) if f.is_dir()]  # List of subfolders
-    for fol in folders_lst:
-        check_all_files_in_folder(os.path.join(folder, fol), method, repeat_size)  # Recursively check subfolders
-
-
-def chose_two() -> None:
+def chose_two(jobs: int = 1) -> None:
     """
     Gets a folder name and compresses everything inside.
 
     Prompts the user to provide a folder name, then chooses a compression method and applies it to all files
     within the folder. Prints the efficiency of compression and the time taken.
+
+    :param jobs: The number of processes that compress the files, 0 for one for each core.
     """
     folder: str = get_folder_to_compress()  # Get folder name from user
     if folder == "":
         return None
-    method: str = get_compress_method()  # Get compression method from user
+    method: str = get_compress_method(allow_auto=True)  # Get compression method from user
     if method == "":
         return None
 
@@ -233,22 +288,46 @@ def chose_two() -> None:
         repeat_size = get_repeat_size()  # Get repeat size for RLE compression
     if repeat_size == -1:
         return None
+    chunking: int = get_chunking()  # Get if the files are cut into chunks
+    if chunking == -1:
+        return None
+    solid: int = 0
+    if method == "HUF" and chunking == 0:
+        solid = get_solid()  # Get if the small files share a huffman code
+    if solid == -1:
+        return None
+    incremental: int = 0
+    if os.path.isfile(f'{folder}_{method}.txt'):
+        incremental = get_incremental()  # Get if only the changed files are compressed
+    if incremental == -1:
+        return None
 
-    check_all_files_in_folder(folder, method, repeat_size)  # Check which files will not be compressed
-
+    chunking_stats: ChunkingStats = ChunkingStats()  # Counts the chunks of the files
     start_time: float = time.time()  # Record start time for compression
     if method == "RLE":
-        problem, efficiency = compressor.main_compressor(folder, method, repeat_size)  # Compress folder
+        problem, efficiency = compressor.main_compressor(folder, method, repeat_size, jobs=jobs, chunking=chunking == 1,
+                                                         incremental=incremental == 1,
+                                                         chunking_stats=chunking_stats)  # Compress folder
+    elif method == compressor.AUTO_METHOD:
+        # The files that get run-length encoding choose their repeat size too
+        problem, efficiency = compressor.main_compressor(folder, method, compressor.AUTO_REPEAT_SIZE, jobs=jobs,
+                                                         chunking=chunking == 1, incremental=incremental == 1,
+                                                         chunking_stats=chunking_stats)  # Compress folder
     else:
-        problem, efficiency = compressor.main_compressor(folder, method)  # Compress folder
+        problem, efficiency = compressor.main_compressor(folder, method, jobs=jobs, chunking=chunking == 1,
+                                                         incremental=incremental == 1, solid=solid == 1,
+                                                         chunking_stats=chunking_stats)  # Compress folder
     end_time: float = time.time()  # Record end time for compression
     if problem is not None:
         print(problem)
         time.sleep(3)
-        chose_two()
+        chose_two(jobs)
         return None
     print(f"The efficiency of the compression is {efficiency} bytes.")
     print(f"This compression took {end_time - start_time} seconds.")
+    if chunking_stats.total_size > 0:  # Print the chunks stats only if files were cut into chunks
+        print(f"The files are {chunking_stats.dedup_ratio():.2f} times the size of their distinct chunks, "
+              f"they were cut into chunks at {chunking_stats.throughput():.1f} MB per second.")
     time.sleep(3)
     return None
 
@@ -270,19 +349,19 @@ def chose_three() -> None:
     if exist_compressed_file == "":
         return None
 
+    if os.path.getsize(exist_compressed_file) == 0:
+        print(f'{exist_compressed_file} is empty')
+        time.sleep(4)
+        return None
+
     try:
-        with open(exist_compressed_file, "rb") as f:
-            data: bytes = f.read()  # Read compressed folder data
+        # Check the compressed folder, only the table of contents of a folder archive is read
+        folder_problem: str = main.is_compressed_folder_file(exist_compressed_file)
     except Exception as e:
         print(f'Problem {e} reading {exist_compressed_file}')
         time.sleep(4)
         return None
-    if data == b'':
-        print(f'{exist_compressed_file} is empty')
-        time.sleep(4)
-        return None
-
-    if not main.is_compressed_folder(data):
+    if folder_problem != "":
         print(f'{exist_compressed_file} must be in a compressed folder format')
         time.sleep(4)
         return None
@@ -355,10 +434,11 @@ def chose_four() -> None:
     return None
 
 
-def chose_five() -> None:
+def chose_five(jobs: int = 1) -> None:
     """
     Extracts a compressed file.
 
+    :param jobs: The number of processes that extract the files of a folder, 0 for one for each core.
     :return: None
     """
     file: str = get_file_to_compress("to extract")  # Get file to extract from user
@@ -381,7 +461,7 @@ def chose_five() -> None:
         return None
     print("")
     start_time: float = time.time()  # Record start time for extraction
-    problem: Union[str, None] = extractor.main_extractor(file)  # Extract file
+    problem: Union[str, None] = extractor.main_extractor(file, jobs=jobs)  # Extract file
     end_time: float = time.time()  # Record end time for extraction
     if isinstance(problem, str):
         print(f'{problem}')
@@ -424,13 +504,14 @@ def chose_six() -> None:
     return None
 
 
-def user_interface_start() -> None:
+def user_interface_start(jobs: int = 1) -> None:
     """
     Initiates the user interface for the file compressor.
 
     Provides a menu for the user to choose various operations such as compressing files,
     extracting compressed files, checking file formats, etc.
 
+    :param jobs: The number of processes for folders and Huffman blocks, 0 for one for each core.
     :return: None
     """
     print("Hello and welcome to the file compressor!!")
@@ -446,15 +527,15 @@ def user_interface_start() -> None:
         if user_input == "0":
             break
         if user_input == '1':
-            chose_one()
+            chose_one(jobs)
         elif user_input == '2':
-            chose_two()
+            chose_two(jobs)
         elif user_input == '3':
             chose_three()
         elif user_input == '4':
             chose_four()
         elif user_input == '5':
-            chose_five()
+            chose_five(jobs)
         elif user_input == '6':
             chose_six()
         input("press ENTER to continue \n")